@@ -0,0 +1,115 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""\
+Benchmark the extraction of top-level fields from large Galaxy workflows.
+
+For each number of steps, a .ga file is generated with the top-level fields
+either before the steps (sorted keys, as written by Galaxy) or after them,
+and the time and peak (traced) memory of ``json.load`` and
+``jsonscan.load_keys`` are reported, as JSON.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# benchmark the working tree, not an installed copy
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from repo2rocrate.galaxy import WF_KEYS  # noqa: E402
+from repo2rocrate.jsonscan import load_keys  # noqa: E402
+
+HEAD = {
+    "a_galaxy_workflow": "true",
+    "creator": [{"class": "Person", "name": "Jane Doe", "identifier": "https://orcid.org/0000-0000-0000-0000"}],
+    "format-version": "0.1",
+    "license": "MIT",
+    "name": "bench",
+    "release": "0.1.0",
+}
+
+
+def gen_step(i):
+    return {
+        "id": i,
+        "tool_id": f"toolshed.g2.bx.psu.edu/repos/iuc/tool_{i}/tool_{i}/1.0",
+        "tool_state": json.dumps({"input": {"__class__": "ConnectedValue"}, "threads": "${GALAXY_SLOTS}"}),
+        "input_connections": {"input": {"id": max(0, i - 1), "output_name": "output"}},
+        "position": {"left": 100.0 * i, "top": 200.0},
+        "outputs": [{"name": "output", "type": "input"}],
+        "workflow_outputs": [{"label": f"out_{i}", "output_name": "output"}],
+    }
+
+
+def gen_workflow(path, n_steps, steps_first):
+    steps = {str(i): gen_step(i) for i in range(n_steps)}
+    doc = {"steps": steps, **HEAD} if steps_first else {**HEAD, "steps": steps}
+    with open(path, "w") as f:
+        json.dump(doc, f, indent=4)
+
+
+def measure(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(times), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--steps", nargs="+", type=int, default=[10, 1000, 10000])
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    args = parser.parse_args()
+    results = []
+    with tempfile.TemporaryDirectory() as d:
+        for n_steps in args.steps:
+            for steps_first in False, True:
+                path = Path(d) / "workflow.ga"
+                gen_workflow(path, n_steps, steps_first)
+
+                def full():
+                    with open(path) as f:
+                        wf_code = json.load(f)
+                    return {k: wf_code[k] for k in WF_KEYS}
+
+                def scan():
+                    with open(path) as f:
+                        return load_keys(f, WF_KEYS)
+
+                assert full() == scan()
+                r = {"steps": n_steps, "steps_first": steps_first, "bytes": path.stat().st_size}
+                for name, fn in ("json_load", full), ("load_keys", scan):
+                    r[f"{name}_seconds"], r[f"{name}_peak_bytes"] = measure(fn, args.repeat)
+                results.append(r)
+                print(f"{n_steps:>7} steps {'last' if not steps_first else 'first':<6}"
+                      f"json.load {r['json_load_seconds']:8.4f} s {r['json_load_peak_bytes'] / 2**20:8.2f} MiB  "
+                      f"load_keys {r['load_keys_seconds']:8.4f} s {r['load_keys_peak_bytes'] / 2**20:8.2f} MiB",
+                      file=sys.stderr)
+    print(json.dumps(results, indent=4))
+
+
+if __name__ == "__main__":
+    main()
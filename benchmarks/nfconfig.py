@@ -0,0 +1,119 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""\
+Benchmark the Nextflow config reader on large generated configs.
+
+A main config with a manifest at the end includes a number of config files
+(process selectors, profiles, parameters); each size is the total number of
+lines across all files. Reports the time for a cold read (parsing all files)
+and a warm one (all parse results cached), as JSON.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# benchmark the working tree, not an installed copy
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from repo2rocrate import nfconfig  # noqa: E402
+from repo2rocrate.cache import clear_memory_cache  # noqa: E402
+
+N_INCLUDES = 8
+
+
+def gen_config(root, n_lines):
+    root = Path(root)
+    (root / "conf").mkdir(parents=True, exist_ok=True)
+    per_file = max(1, n_lines // (N_INCLUDES + 1))
+    main = ["params {"]
+    main += [f"    param_{i} = 'value {i}'  // parameter {i}" for i in range(per_file - 16)]
+    main += ["}"]
+    for i in range(N_INCLUDES):
+        main.append(f"includeConfig 'conf/part_{i}.config'")
+        lines = ["process {"]
+        j = 0
+        while len(lines) < per_file - 6:
+            lines += [
+                f"    withName: 'TOOL_{i}_{j}' {{",
+                f"        ext.args = {{ \"--threads ${{task.cpus}} --id {j}\" }}",
+                f"        ext.prefix = 'tool_{j}'",
+                "        cpus = { check_max(2 * task.attempt, 'cpus') }",
+                "    }",
+            ]
+            j += 1
+        lines += ["}", "profiles {", f"    p{i} {{ params.input = 'p{i}.csv' }}", "}"]
+        (root / "conf" / f"part_{i}.config").write_text("\n".join(lines) + "\n")
+    main += [
+        "manifest {",
+        "    name            = 'nf-core/bench'",
+        "    author          = 'Jane Doe'",
+        "    homePage        = 'https://github.com/nf-core/bench'",
+        "    description     = 'Benchmark pipeline'",
+        "    mainScript      = 'main.nf'",
+        "    nextflowVersion = '!>=23.04.0'",
+        "    version         = '1.0.0'",
+        "}",
+    ]
+    config = root / "nextflow.config"
+    config.write_text("\n".join(main) + "\n")
+    total = sum(len(p.read_text().splitlines()) for p in [config] + sorted((root / "conf").iterdir()))
+    return config, total
+
+
+def time_it(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--lines", nargs="+", type=int, default=[1000, 10000, 50000, 100000])
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    args = parser.parse_args()
+    results = []
+    for n_lines in args.lines:
+        with tempfile.TemporaryDirectory() as d:
+            config, total = gen_config(d, n_lines)
+
+            def cold():
+                clear_memory_cache()
+                nfconfig.load_config(config)
+
+            cold_seconds = time_it(cold, args.repeat)
+            warm_seconds = time_it(lambda: nfconfig.load_config(config), args.repeat)
+            settings, files = nfconfig.load_config(config)
+            assert settings["manifest.name"] == "nf-core/bench"
+            results.append({
+                "lines": total,
+                "files": len(files),
+                "cold_seconds": cold_seconds,
+                "warm_seconds": warm_seconds,
+                "lines_per_second": total / cold_seconds,
+            })
+            print(f"{total:>9} lines  cold {cold_seconds:8.4f} s  warm {warm_seconds:8.5f} s", file=sys.stderr)
+    print(json.dumps(results, indent=4))
+
+
+if __name__ == "__main__":
+    main()
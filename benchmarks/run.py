@@ -0,0 +1,258 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""\
+Benchmark crate generation on synthetic repositories.
+
+For each combination of language and repository size, a synthetic repository
+is generated (see ``synth.py``) and reused across runs if found in the work
+directory. Each case then runs in a fresh interpreter with an empty digest
+cache and times the following, reporting the median of the repeats:
+
+  make_crate          metadata generation only
+  write_dir           directory output
+  write_zip           zip output
+  write_zip_rocrate   zip output through ``ROCrate.write_zip`` (baseline)
+
+Besides time, each case records the peak RSS of its process and the peak
+disk use of its run directory's file system during output, which includes
+any staging copy made by the writer (``TMPDIR`` points to the run directory;
+some ro-crate-py versions write the whole crate to a temporary directory
+before zipping it). Disk use is sampled from the file system's free space,
+so writes by other processes show up too.
+
+Results are written as JSON. With ``--baseline``, they are compared to a
+previous results file and the script exits with a nonzero status if any case
+got slower by more than the given tolerance.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from pathlib import Path
+
+import synth
+
+# benchmark the working tree, not an installed copy
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+OUTPUTS = ("make_crate", "write_dir", "write_zip", "write_zip_rocrate")
+MIN_SECONDS = 0.05  # don't flag regressions on cases shorter than this
+DISK_POLL_INTERVAL = 0.005
+
+
+def dir_size(path):
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        total += sum(os.lstat(os.path.join(dirpath, _)).st_size for _ in filenames)
+    return total
+
+
+class DiskUsageMonitor:
+    """\
+    Track the peak disk use of the file system that holds ``path`` while in
+    the context, relative to its start, by sampling the free space every
+    ``interval`` seconds on a background thread.
+    """
+
+    def __init__(self, path, interval=DISK_POLL_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.peak_bytes = 0
+        self.__stop = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+
+    def __used(self):
+        st = os.statvfs(self.path)
+        return self.__total - st.f_bavail * st.f_frsize
+
+    def __sample(self):
+        self.peak_bytes = max(self.peak_bytes, self.__used() - self.__start)
+
+    def __run(self):
+        while not self.__stop.wait(self.interval):
+            self.__sample()
+
+    def __enter__(self):
+        st = os.statvfs(self.path)
+        self.__total = st.f_blocks * st.f_frsize
+        self.__start = self.__used()
+        self.__thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.__stop.set()
+        self.__thread.join()
+        self.__sample()
+
+
+def run_case(case):
+    """\
+    Run a single case in the current process and return its measurements.
+    """
+    from repo2rocrate import LANG_MODULES
+    from rocrate.rocrate import ROCrate
+    start = time.perf_counter()
+    crate = LANG_MODULES[case["lang"]].make_crate(Path(case["root"]), workflow=Path(case["workflow"]))
+    make_crate_seconds = time.perf_counter() - start
+    result = {
+        "make_crate_seconds": make_crate_seconds, "seconds": make_crate_seconds, "output_bytes": 0, "peak_disk_bytes": 0,
+    }
+    output = case["output"]
+    if output != "make_crate":
+        out_path = Path(case["out_path"])
+        start = time.perf_counter()
+        with DiskUsageMonitor(out_path.parent) as disk:
+            if output == "write_dir":
+                crate.write(out_path)
+            elif output == "write_zip":
+                crate.write_zip(out_path)
+            else:
+                with warnings.catch_warnings():  # duplicate members from nested datasets
+                    warnings.simplefilter("ignore")
+                    ROCrate.write_zip(crate, out_path)
+        result["seconds"] = time.perf_counter() - start
+        result["peak_disk_bytes"] = disk.peak_bytes
+        result["output_bytes"] = dir_size(out_path) if out_path.is_dir() else out_path.stat().st_size
+    result["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return result
+
+
+def measure(case, repeat, tmp_dir):
+    env = dict(os.environ)
+    runs = []
+    for _ in range(repeat):
+        run_dir = Path(tempfile.mkdtemp(dir=tmp_dir))
+        env["REPO2ROCRATE_CACHE_DIR"] = str(run_dir / "cache")
+        # staging directories go to the same file system as the output
+        env["TMPDIR"] = str(run_dir / "tmp")
+        (run_dir / "tmp").mkdir()
+        suffix = ".zip" if case["output"].startswith("write_zip") else ""
+        case = dict(case, out_path=str(run_dir / f"crate{suffix}"))
+        try:
+            out = subprocess.check_output(
+                [sys.executable, __file__, "--case", json.dumps(case)], env=env, text=True
+            )
+        finally:
+            shutil.rmtree(run_dir)
+        runs.append(json.loads(out))
+    result = {k: statistics.median(_[k] for _ in runs) for k in runs[0]}
+    result["runs"] = [_["seconds"] for _ in runs]
+    return result
+
+
+def get_repo(work_dir, lang, n_files, data_bytes):
+    name = f"{lang}-{n_files}-{data_bytes}"
+    root = work_dir / "repos" / name
+    info_path = work_dir / "repos" / f"{name}.json"
+    if info_path.is_file() and root.is_dir():
+        return json.loads(info_path.read_text())
+    if root.exists():
+        shutil.rmtree(root)
+    start = time.perf_counter()
+    info = synth.generate(root, lang, n_files=n_files, data_bytes=data_bytes)
+    info["generate_seconds"] = time.perf_counter() - start
+    info_path.write_text(json.dumps(info))
+    return info
+
+
+def compare(results, baseline, tolerance):
+    """\
+    Return a list of descriptions of the cases in ``results`` that are slower
+    than in ``baseline`` by more than ``tolerance`` (a fraction).
+    """
+    def key(r):
+        return r["lang"], r["files"], r["data_bytes"], r["output"]
+    old = {key(_): _ for _ in baseline["results"]}
+    regressions = []
+    for r in results["results"]:
+        o = old.get(key(r))
+        if not o or max(r["seconds"], o["seconds"]) < MIN_SECONDS:
+            continue
+        ratio = r["seconds"] / o["seconds"] if o["seconds"] > 0 else float("inf")
+        if ratio > 1 + tolerance:
+            regressions.append(f"{'/'.join(map(str, key(r)))}: {o['seconds']:.3f} s -> {r['seconds']:.3f} s ({ratio:.2f}x)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    parser.add_argument("-l", "--langs", nargs="+", choices=synth.LANGS, default=list(synth.LANGS))
+    parser.add_argument("-n", "--files", nargs="+", type=int, default=[10, 1000, 10000], help="repository sizes (number of files)")
+    parser.add_argument("--data-size", nargs="+", type=synth.parse_size, default=[0], help="test data sizes (e.g., 0 1G)")
+    parser.add_argument("--outputs", nargs="+", choices=OUTPUTS, default=list(OUTPUTS))
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument("-w", "--work-dir", type=Path, help="where to keep generated repositories (default: temporary)")
+    parser.add_argument("-o", "--output", type=Path, help="results file (default: stdout)")
+    parser.add_argument("--baseline", type=Path, help="previous results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown w.r.t. the baseline")
+    args = parser.parse_args()
+    if args.case:
+        print(json.dumps(run_case(json.loads(args.case))))
+        return
+    from repo2rocrate import __version__
+    work_dir = args.work_dir or Path(tempfile.mkdtemp(prefix="repo2rocrate-bench-"))
+    (work_dir / "repos").mkdir(parents=True, exist_ok=True)
+    tmp_dir = work_dir / "tmp"
+    tmp_dir.mkdir(exist_ok=True)
+    results = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "results": [],
+    }
+    try:
+        for lang in args.langs:
+            for n_files in args.files:
+                for data_bytes in args.data_size:
+                    repo = get_repo(work_dir, lang, n_files, data_bytes)
+                    for output in args.outputs:
+                        case = {"lang": lang, "root": repo["root"], "workflow": repo["workflow"], "output": output}
+                        r = measure(case, args.repeat, tmp_dir)
+                        r.update(lang=lang, files=n_files, data_bytes=data_bytes, output=output,
+                                 repo_files=repo["files"], repo_bytes=repo["bytes"])
+                        results["results"].append(r)
+                        print(f"{lang:<10}{n_files:>9}{data_bytes:>14}  {output:<18}{r['seconds']:9.3f} s"
+                              f"{r['max_rss_kb'] / 1024:9.1f} MiB RSS{r['peak_disk_bytes'] / 2**20:9.1f} MiB disk",
+                              file=sys.stderr)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir)
+    dump = json.dumps(results, indent=4)
+    if args.output:
+        args.output.write_text(dump + "\n")
+    else:
+        print(dump)
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
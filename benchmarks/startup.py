@@ -0,0 +1,62 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""\
+Measure the startup time of the command line interface.
+
+Each command is run repeatedly in a fresh interpreter and the median wall
+clock time is reported, along with the overhead with respect to starting a
+bare interpreter. Exits with a nonzero status if the overhead of
+``repo2rocrate --version`` exceeds the given budget.
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+COMMANDS = [
+    ("python", ["-c", "pass"]),
+    ("import click", ["-c", "import click"]),
+    ("repo2rocrate --version", ["-m", "repo2rocrate.cli", "--version"]),
+    ("import repo2rocrate.cli", ["-c", "import repo2rocrate.cli"]),
+]
+
+
+def time_command(args, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--runs", type=int, default=20, help="runs per command")
+    parser.add_argument("--budget", type=float, default=50.0, help="max overhead (ms) over a bare interpreter")
+    args = parser.parse_args()
+    results = {name: 1000 * time_command(cmd, args.runs) for name, cmd in COMMANDS}
+    base = results["python"]
+    for name, ms in results.items():
+        print(f"{name:<28}{ms:8.1f} ms  (+{ms - base:.1f} ms)")
+    overhead = results["repo2rocrate --version"] - base
+    if overhead > args.budget:
+        sys.exit(f"startup overhead {overhead:.1f} ms exceeds budget of {args.budget:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""\
+Generate synthetic workflow repositories for benchmarking.
+
+Repositories follow the layouts of nf-core pipelines (``nextflow``),
+snakemake-workflows (``snakemake``) and IWC workflows (``galaxy``). The total
+number of files is set by ``n_files``: a fixed skeleton is created first and
+the rest is made up of small source files in deep directory trees (e.g.,
+``modules/nf-core/<tool>/<subtool>/tests``). In addition, ``data_bytes`` of
+test data are split into ``data_files`` large files. Output is deterministic
+for a given set of parameters.
+"""
+
+import argparse
+import json
+import random
+from pathlib import Path
+
+BLOCK_SIZE = 1 << 20
+LANGS = ("nextflow", "snakemake", "galaxy")
+# max entries per generated directory level, to keep directories realistic
+FANOUT = 256
+
+
+def _data_block(seed=0):
+    # half random, half text: deflates to roughly 60% of the input
+    rng = random.Random(seed)
+    half = BLOCK_SIZE // 2
+    text = b"".join(b"@read%d\nACGTTGCA%s\n+\n%s\n" % (i, b"ACGT" * 8, b"I" * 40) for i in range(half // 60))
+    return rng.randbytes(half) + text.ljust(half, b"N")[:half]
+
+
+class RepoWriter:
+
+    def __init__(self, root, seed=0):
+        self.root = Path(root)
+        self.rng = random.Random(seed)
+        self.n_files = 0
+        self.n_bytes = 0
+        self._block = None
+        self._dirs = set()
+
+    def write(self, relpath, content):
+        path = self.root / relpath
+        parent = path.parent
+        if parent not in self._dirs:
+            parent.mkdir(parents=True, exist_ok=True)
+            self._dirs.add(parent)
+        data = content.encode() if isinstance(content, str) else content
+        with open(path, "wb") as f:
+            f.write(data)
+        self.n_files += 1
+        self.n_bytes += len(data)
+
+    def write_data(self, relpath, size):
+        if self._block is None:
+            self._block = _data_block()
+        path = self.root / relpath
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            written = 0
+            while written < size:
+                n = min(BLOCK_SIZE, size - written)
+                f.write(self._block[:n])
+                written += n
+        self.n_files += 1
+        self.n_bytes += size
+
+    def source(self, n_lines=40):
+        words = ["input", "output", "process", "val", "path", "tuple", "script", "meta", "args", "prefix"]
+        return "".join(
+            " ".join(self.rng.choice(words) for _ in range(8)) + "\n" for _ in range(n_lines)
+        )
+
+    def data(self, prefix, n_files, n_bytes):
+        for i in range(n_files):
+            size = n_bytes // n_files + (1 if i < n_bytes % n_files else 0)
+            self.write_data(f"{prefix}/sample_{i:04d}.fastq", size)
+
+
+def _nested(i, *levels):
+    # split index i into a path of directories with at most FANOUT entries each
+    parts = []
+    for name in reversed(levels):
+        parts.append(f"{name}{i % FANOUT:03d}")
+        i //= FANOUT
+    return "/".join(reversed(parts))
+
+
+def gen_nextflow(w, n_files, data_bytes, data_files):
+    name = w.root.name
+    w.write("main.nf", f"#!/usr/bin/env nextflow\nnextflow.enable.dsl = 2\ninclude {{ {name.upper()} }} from './workflows/{name}'\n")
+    w.write("nextflow.config", (
+        "params {\n    input = null\n    outdir = null\n}\n\n"
+        "includeConfig 'conf/base.config'\n\n"
+        "manifest {\n"
+        f"    name            = 'nf-core/{name}'\n"
+        "    author          = 'The nf-core community'\n"
+        f"    homePage        = 'https://github.com/nf-core/{name}'\n"
+        "    description     = 'Synthetic pipeline'\n"
+        "    mainScript      = 'main.nf'\n"
+        "    nextflowVersion = '!>=23.04.0'\n"
+        "    version         = '1.0.0'\n"
+        "}\n"
+    ))
+    for relpath in (
+        "README.md", "CHANGELOG.md", "LICENSE", "CODE_OF_CONDUCT.md", "CITATIONS.md", ".nf-core.yml",
+        ".prettierignore", ".prettierrc", ".pre-commit-config.yaml", "docs/usage.md", "docs/output.md",
+        "docs/images/metro.svg", "assets/samplesheet.csv", "assets/schema_input.json", "bin/check.py",
+        "lib/WorkflowMain.groovy", "conf/base.config", "conf/test.config", "conf/modules.config",
+        f"workflows/{name}.nf", "subworkflows/local/input_check.nf", "modules/local/samplesheet_check.nf",
+        ".github/workflows/ci.yml",
+    ):
+        w.write(relpath, w.source(10))
+    w.write("nextflow_schema.json", json.dumps({"title": name, "type": "object"}))
+    module_files = ("main.nf", "meta.yml", "environment.yml", "tests/main.nf.test", "tests/main.nf.test.snap", "tests/tags.yml")
+    n_modules = max(0, n_files - w.n_files - data_files) // len(module_files)
+    modules = {}
+    for i in range(n_modules):
+        tool = _nested(i, "tool", "sub")
+        modules[tool.replace("/", "_")] = {"git_sha": f"{i:040x}"}
+        for f in module_files:
+            w.write(f"modules/nf-core/{tool}/{f}", w.source(20))
+    w.write("modules.json", json.dumps({"name": f"nf-core/{name}", "repos": {"nf-core/modules": modules}}, indent=4))
+    while w.n_files < n_files - data_files:
+        w.write(f"assets/extra/{_nested(w.n_files, 'd', 'f')}.txt", w.source(5))
+    w.data("assets/test-data", data_files, data_bytes)
+    return w.root / "main.nf"
+
+
+def gen_snakemake(w, n_files, data_bytes, data_files):
+    w.write("workflow/Snakefile", (
+        "from snakemake.utils import min_version\n"
+        "min_version(\"7.18\")\n\n"
+        "configfile: \"config/config.yaml\"\n\n"
+        "include: \"rules/common.smk\"\n\n"
+        "rule all:\n    input: \"results/done\"\n"
+    ))
+    for relpath in (
+        "README.md", "LICENSE", "config/config.yaml", "config/README.md", "workflow/rules/common.smk",
+        "workflow/envs/base.yaml", "workflow/schemas/config.schema.yaml", "workflow/report/workflow.rst",
+        ".tests/integration/config/config.yaml", ".github/workflows/main.yml", "images/rulegraph.svg",
+    ):
+        w.write(relpath, w.source(10))
+    kinds = [("workflow/rules", "smk"), ("workflow/scripts", "py"), ("workflow/envs", "yaml"), (".tests/unit", "py")]
+    i = 0
+    while w.n_files < n_files - data_files:
+        d, ext = kinds[i % len(kinds)]
+        w.write(f"{d}/{_nested(i // len(kinds), 'group', 'rule')}.{ext}", w.source(30))
+        i += 1
+    w.data(".tests/integration/data", data_files, data_bytes)
+    return w.root / "workflow" / "Snakefile"
+
+
+def gen_galaxy(w, n_files, data_bytes, data_files):
+    name = w.root.name
+    w.write(f"{name}.ga", json.dumps({
+        "a_galaxy_workflow": "true",
+        "format-version": "0.1",
+        "name": name,
+        "release": "0.1.0",
+        "license": "MIT",
+        "creator": [{"class": "Person", "identifier": "https://orcid.org/0000-0000-0000-0000", "name": "Jane Doe"}],
+        "steps": {str(i): {"id": i, "tool_id": f"tool_{i}", "annotation": w.source(2)} for i in range(50)},
+    }, indent=4))
+    w.write(f"{name}-tests.yml", "- doc: Test\n  job:\n    input:\n      class: File\n      path: test-data/sample_0000.fastq\n")
+    w.write(".dockstore.yml", (
+        "version: 1.2\nworkflows:\n- name: main\n"
+        f"  primaryDescriptorPath: /{name}.ga\n  subclass: Galaxy\n"
+        f"  testParameterFiles:\n  - /{name}-tests.yml\n"
+    ))
+    for relpath in ("README.md", "CHANGELOG.md", ".github/workflows/wftest.yml"):
+        w.write(relpath, w.source(10))
+    while w.n_files < n_files - data_files:
+        w.write(f"test-data/{_nested(w.n_files, 'set', 'expected')}.txt", w.source(5))
+    w.data("test-data", data_files, data_bytes)
+    return w.root / f"{name}.ga"
+
+
+GENERATORS = {"nextflow": gen_nextflow, "snakemake": gen_snakemake, "galaxy": gen_galaxy}
+
+
+def generate(root, lang, n_files=100, data_bytes=0, data_files=None, seed=0):
+    """\
+    Generate a synthetic ``lang`` repository at ``root`` (which must not
+    exist) with about ``n_files`` files, ``data_bytes`` of which are test
+    data split into ``data_files`` files (default: one per 256 MiB, at least
+    one if ``data_bytes`` is nonzero). Return a dictionary describing the
+    repository.
+    """
+    root = Path(root)
+    root.mkdir(parents=True)
+    if data_files is None:
+        data_files = max(1, -(-data_bytes // (256 << 20))) if data_bytes else 0
+    w = RepoWriter(root, seed=seed)
+    workflow = GENERATORS[lang](w, n_files, data_bytes, data_files)
+    return {
+        "root": str(root),
+        "lang": lang,
+        "workflow": str(workflow),
+        "files": w.n_files,
+        "bytes": w.n_bytes,
+    }
+
+
+def parse_size(s):
+    units = {"k": 1 << 10, "m": 1 << 20, "g": 1 << 30}
+    s = s.strip().lower().rstrip("b")
+    if s and s[-1] in units:
+        return int(float(s[:-1]) * units[s[-1]])
+    return int(s)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root", help="output directory (must not exist)")
+    parser.add_argument("-l", "--lang", choices=LANGS, default="nextflow")
+    parser.add_argument("-n", "--files", type=int, default=100, help="total number of files")
+    parser.add_argument("--data-size", type=parse_size, default=0, help="test data size (e.g., 2G)")
+    parser.add_argument("--data-files", type=int, help="number of test data files")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    info = generate(args.root, args.lang, args.files, args.data_size, args.data_files, args.seed)
+    print(json.dumps(info, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -12,22 +12,59 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+from collections.abc import Mapping
+from importlib import import_module
+from pathlib import Path
+
 from .version import VERSION
-from . import nextflow, snakemake, galaxy
+from .fs import FSSnapshot
+from .profile import phase
 
 __version__ = VERSION
 
-LANG_MODULES = {
-    "nextflow": nextflow,
-    "snakemake": snakemake,
-    "galaxy": galaxy,
-}
+LANG_NAMES = ("nextflow", "snakemake", "galaxy")
+
+
+class LangModules(Mapping):
+    """\
+    Read-only mapping from language names to language modules. Modules are
+    imported on first access, so that startup does not pay for the RO-Crate
+    library and language-specific dependencies until they are needed.
+    """
+
+    def __getitem__(self, name):
+        if name not in LANG_NAMES:
+            raise KeyError(name)
+        return import_module(f".{name}", __name__)
+
+    def __iter__(self):
+        return iter(LANG_NAMES)
+
+    def __len__(self):
+        return len(LANG_NAMES)
+
+
+LANG_MODULES = LangModules()
+
+
+def __getattr__(name):
+    if name in LANG_NAMES:
+        return LANG_MODULES[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-def find_workflow(root_dir):
-    for name, module in LANG_MODULES.items():
-        try:
-            return name, module.find_workflow(root_dir)
-        except RuntimeError:
-            pass
+def find_workflow(root_dir, fs=None):
+    """\
+    Return the language and path of the best workflow candidate in
+    ``root_dir`` (see ``detect.detect``). Raise ``RuntimeError`` if none is
+    found.
+    """
+    from .detect import detect
+    if fs is None:
+        fs = FSSnapshot(root_dir)
+    with phase("detection") as p:
+        candidates = detect(Path(root_dir), fs=fs)
+        if candidates:
+            p.add(files=1)
+            return candidates[0].lang, candidates[0].workflow
     raise RuntimeError(f"Workflow file not found in {root_dir}")
@@ -0,0 +1,119 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""\
+Generate crates for many workflow repositories (or for all the workflows in
+a Galaxy monorepo) in a single invocation, using a pool of worker processes.
+"""
+
+import os
+import traceback
+from collections import namedtuple
+from pathlib import Path
+
+from . import find_workflow, LANG_MODULES
+from .output import write_crate
+
+
+BatchResult = namedtuple("BatchResult", "root lang output error")
+
+
+def get_output_path(root, out_dir=None, to_zip=False):
+    if not out_dir:
+        return None
+    name = Path(root).name
+    return Path(out_dir) / (f"{name}.crate.zip" if to_zip else name)
+
+
+def build_and_write(root, output=None, lang=None, workflow=None, **kwargs):
+    root = Path(root)
+    try:
+        if not lang:
+            lang, workflow = find_workflow(root)
+        crate = LANG_MODULES[lang].make_crate(root, workflow=workflow, **kwargs)
+        write_crate(crate, root, output)
+        output = output or root
+    except Exception as e:
+        error = "".join(traceback.format_exception_only(type(e), e)).strip()
+        return BatchResult(root, lang, output, error)
+    return BatchResult(root, lang, output, None)
+
+
+def _build_and_write(args):
+    root, output, lang, kwargs = args
+    return build_and_write(root, output=output, lang=lang, **kwargs)
+
+
+def run_batch(roots, out_dir=None, to_zip=False, lang=None, jobs=None, **kwargs):
+    """\
+    Generate a crate for each of the repositories in ``roots``, running up to
+    ``jobs`` worker processes (default: number of CPUs). If ``out_dir`` is
+    given, each crate is written to a directory (or, if ``to_zip`` is true, to
+    a zip file) named after the repository; otherwise, only the metadata file
+    is written to each repository root. Additional keyword arguments are
+    passed to each language's ``make_crate``.
+
+    Return a list of ``BatchResult`` (one per root, in the same order), where
+    ``error`` is ``None`` for successful runs.
+    """
+    roots = [Path(_) for _ in roots]
+    outputs = [get_output_path(_, out_dir, to_zip) for _ in roots]
+    if out_dir:
+        seen = set()
+        for root, output in zip(roots, outputs):
+            if output in seen:
+                raise ValueError(f"duplicate output path {output} (for {root})")
+            seen.add(output)
+        Path(out_dir).mkdir(parents=True, exist_ok=True)
+    tasks = [(root, output, lang, kwargs) for root, output in zip(roots, outputs)]
+    return _run(tasks, jobs)
+
+
+def run_monorepo(root, out_dir, to_zip=False, jobs=None, **kwargs):
+    """\
+    Generate a crate for each Galaxy workflow in monorepo ``root`` (e.g., a
+    clone of https://github.com/galaxyproject/iwc), running up to ``jobs``
+    worker processes. The tree is indexed once (see
+    ``galaxy.index_workflows``) and each crate is built from its index
+    entry. Each crate is written to ``out_dir``, at the workflow's relative
+    path without the .ga extension (plus .crate.zip if ``to_zip`` is true).
+    Additional keyword arguments are passed to ``galaxy.make_crate``.
+
+    Return a list of ``BatchResult``, sorted by workflow path.
+    """
+    from .dockstore import get_record_name
+    from .galaxy import index_workflows
+    root = Path(root)
+    tasks = []
+    for info in index_workflows(root):
+        relpath = info.workflow.relative_to(root).with_suffix("")
+        output = Path(out_dir) / (f"{relpath}.crate.zip" if to_zip else relpath)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        task_kwargs = dict(kwargs, workflow=info.workflow, fs=info.fs)
+        if info.dockstore_record is not None and not kwargs.get("wf_name"):
+            task_kwargs["wf_name"] = get_record_name(info.root, info.dockstore_record)
+        tasks.append((info.root, output, "galaxy", task_kwargs))
+    return _run(tasks, jobs)
+
+
+def _run(tasks, jobs=None):
+    if not jobs:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(tasks))
+    if jobs <= 1:
+        return [_build_and_write(_) for _ in tasks]
+    from concurrent.futures import ProcessPoolExecutor  # pulls in multiprocessing
+    chunksize = max(1, len(tasks) // (4 * jobs))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(_build_and_write, tasks, chunksize=chunksize))
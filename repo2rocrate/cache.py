@@ -0,0 +1,307 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""\
+Persistent caches, stored in an SQLite database under the cache directory.
+
+The cache directory is taken from the ``REPO2ROCRATE_CACHE_DIR`` environment
+variable if set, otherwise it is ``repo2rocrate`` under ``XDG_CACHE_HOME``
+(``~/.cache`` by default). Setting ``REPO2ROCRATE_NO_CACHE`` to a non-empty
+value disables all caches. Environment variables are used (rather than
+arguments) so that settings are inherited by worker processes.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from .version import VERSION
+
+DB_BASENAME = "cache.sqlite"
+# entries for files modified this recently are not stored, since a further
+# change within the file system's timestamp granularity would go unnoticed
+RACY_INTERVAL_NS = 2 * 10**9
+METADATA_MAX_BYTES = 64 << 20
+
+_metadata_cache = None
+_metadata_cache_lock = threading.Lock()
+_memory_cache = {}
+_memory_cache_lock = threading.Lock()
+
+
+def is_enabled():
+    return not os.getenv("REPO2ROCRATE_NO_CACHE")
+
+
+def get_cache_dir():
+    cache_dir = os.getenv("REPO2ROCRATE_CACHE_DIR")
+    if cache_dir:
+        return Path(cache_dir)
+    xdg_cache_home = os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(xdg_cache_home) / "repo2rocrate"
+
+
+def connect(cache_dir=None):
+    """\
+    Open the cache database, creating it if necessary. Return ``None`` if
+    caching is disabled or the database is not available (e.g., the cache
+    directory is not writable).
+    """
+    if not is_enabled():
+        return None
+    cache_dir = Path(cache_dir) if cache_dir else get_cache_dir()
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(cache_dir / DB_BASENAME, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+    except (OSError, sqlite3.Error):
+        return None
+    return conn
+
+
+class DigestCache:
+    """\
+    Cache of file digests, keyed by device and inode number and validated
+    against modification time and size.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.conn = connect(cache_dir)
+        if self.conn:
+            try:
+                with self.conn:
+                    self.conn.execute(
+                        "CREATE TABLE IF NOT EXISTS digests ("
+                        " dev INTEGER, ino INTEGER, mtime_ns INTEGER, size INTEGER, sha256 TEXT,"
+                        " PRIMARY KEY (dev, ino))"
+                    )
+            except sqlite3.Error:
+                self.close()
+
+    def get(self, st):
+        if not self.conn:
+            return None
+        try:
+            row = self.conn.execute(
+                "SELECT sha256 FROM digests WHERE dev = ? AND ino = ? AND mtime_ns = ? AND size = ?",
+                (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size),
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        return row[0] if row else None
+
+    def put_many(self, items):
+        """\
+        Store ``(stat_result, sha256)`` pairs.
+        """
+        if not self.conn:
+            return
+        now = time.time_ns()
+        rows = [
+            (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size, digest) for st, digest in items
+            if now - st.st_mtime_ns > RACY_INTERVAL_NS
+        ]
+        try:
+            with self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?, ?)", rows)
+        except sqlite3.Error:
+            pass
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+
+def get_max_bytes():
+    try:
+        return int(os.getenv("REPO2ROCRATE_CACHE_MAX_SIZE", METADATA_MAX_BYTES))
+    except ValueError:
+        return METADATA_MAX_BYTES
+
+
+class MetadataCache:
+    """\
+    Cache of metadata extracted from workflow files, stored as JSON. The
+    total size of the stored values is kept below ``max_bytes`` (default:
+    ``REPO2ROCRATE_CACHE_MAX_SIZE`` or ``METADATA_MAX_BYTES``) by evicting
+    the least recently used entries.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.max_bytes = get_max_bytes() if max_bytes is None else max_bytes
+        self.lock = threading.Lock()
+        self.conn = connect(cache_dir)
+        if self.conn:
+            try:
+                with self.conn:
+                    self.conn.execute(
+                        "CREATE TABLE IF NOT EXISTS metadata ("
+                        " key TEXT PRIMARY KEY, value TEXT, size INTEGER, atime INTEGER)"
+                    )
+                    self.conn.execute("CREATE INDEX IF NOT EXISTS metadata_atime ON metadata (atime)")
+            except sqlite3.Error:
+                self.close()
+
+    def get(self, key):
+        """\
+        Return the value stored for ``key``, or ``None``.
+        """
+        if not self.conn:
+            return None
+        with self.lock:
+            try:
+                row = self.conn.execute("SELECT value FROM metadata WHERE key = ?", (key,)).fetchone()
+                if not row:
+                    return None
+                with self.conn:
+                    self.conn.execute("UPDATE metadata SET atime = ? WHERE key = ?", (time.time_ns(), key))
+            except sqlite3.Error:
+                return None
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        if not self.conn:
+            return
+        data = json.dumps(value, default=str)
+        if len(data) > self.max_bytes:
+            return
+        with self.lock:
+            try:
+                with self.conn:
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?)",
+                        (key, data, len(data), time.time_ns()),
+                    )
+                    self.__evict()
+            except sqlite3.Error:
+                pass
+
+    def __evict(self):
+        excess = self.total_size() - self.max_bytes
+        if excess <= 0:
+            return
+        evicted = []
+        for key, size in self.conn.execute("SELECT key, size FROM metadata ORDER BY atime"):
+            evicted.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self.conn.executemany("DELETE FROM metadata WHERE key = ?", evicted)
+
+    def total_size(self):
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM metadata").fetchone()[0]
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+
+def get_metadata_cache():
+    """\
+    Return the metadata cache for the current process and cache directory
+    (opened on first use), or ``None`` if caching is disabled.
+    """
+    global _metadata_cache
+    if not is_enabled():
+        return None
+    tag = (os.getpid(), get_cache_dir())
+    with _metadata_cache_lock:
+        if _metadata_cache is None or _metadata_cache[0] != tag:
+            _metadata_cache = (tag, MetadataCache(tag[1]))
+        return _metadata_cache[1]
+
+
+def _dep_sha256(path):
+    from .digest import sha256_file  # the digest module imports this one
+    # None for missing files, so that their later creation invalidates entries
+    try:
+        return sha256_file(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+
+def memoize(kind, path, compute, extra=None):
+    """\
+    Return the value computed by ``compute()`` from the file at ``path``,
+    using the metadata cache. ``compute`` must return a ``(value, deps)``
+    tuple, where ``value`` is JSON-serializable and ``deps`` lists any
+    other files it was computed from, including the ones it looked for but
+    did not find (e.g., missing includes). Entries are keyed by ``kind``,
+    ``extra`` (any JSON-serializable data the value depends on) and the
+    SHA-256 of the contents of ``path``; they are used only if the contents
+    of ``deps`` have not changed either, and missing ``deps`` still don't
+    exist. Since equal files can be found in
+    different places, ``value`` should not contain paths other than
+    relative to the parent of ``path``, which is how ``deps`` are stored.
+    """
+    cache = get_metadata_cache()
+    if cache is None or not cache.conn:
+        return compute()[0]
+    from .digest import sha256_file
+    parent = os.path.dirname(path)
+    try:
+        digest = sha256_file(path)
+    except OSError:
+        return compute()[0]
+    key = hashlib.sha256(json.dumps([VERSION, kind, extra, digest]).encode()).hexdigest()
+    entry = cache.get(key)
+    if entry is not None:
+        try:
+            if all(_dep_sha256(os.path.join(parent, p)) == h for p, h in entry["deps"]):
+                return entry["value"]
+        except OSError:
+            pass
+    value, deps = compute()
+    try:
+        deps = [(os.path.relpath(p, parent or os.curdir), _dep_sha256(p)) for p in deps]
+    except (OSError, ValueError):
+        return value
+    cache.put(key, {"value": value, "deps": deps})
+    return value
+
+
+def memoize_in_memory(kind, path, compute):
+    """\
+    Return ``compute(path)`` for the file at ``path``, reusing the value
+    computed by this process for the same ``kind`` if the file has not
+    changed since (same modification time and size). Unlike ``memoize``,
+    values can be any object, and are not affected by ``is_enabled``. Raise
+    ``OSError`` if ``path`` cannot be accessed.
+    """
+    key = (kind, os.path.abspath(path))
+    st = os.stat(key[1])
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _memory_cache_lock:
+        entry = _memory_cache.get(key)
+    if entry and entry[0] == stamp:
+        return entry[1]
+    value = compute(key[1])
+    with _memory_cache_lock:
+        _memory_cache[key] = (stamp, value)
+    return value
+
+
+def clear_memory_cache():
+    """\
+    Discard all the values stored by ``memoize_in_memory``.
+    """
+    with _memory_cache_lock:
+        _memory_cache.clear()
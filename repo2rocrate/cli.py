@@ -12,10 +12,49 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import os
+import time
+from functools import partial
 from pathlib import Path
 
 import click
 from . import find_workflow, LANG_MODULES, __version__
+from .fs import FSSnapshot
+from .gitindex import GitIndexError, find_git_dir
+from .profile import Profiler, subscribe, unsubscribe
+from .utils import MATERIALIZE_MODES, parse_size
+
+
+def configure_cache(no_cache, cache_dir):
+    """\
+    Apply cache settings through the environment, so that they are
+    inherited by worker processes. Previous values are restored when the
+    command exits.
+    """
+    settings = {}
+    if no_cache:
+        settings["REPO2ROCRATE_NO_CACHE"] = "1"
+    if cache_dir:
+        settings["REPO2ROCRATE_CACHE_DIR"] = str(cache_dir)
+    saved = {k: os.environ.get(k) for k in settings}
+    os.environ.update(settings)
+
+    def restore():
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+    click.get_current_context().call_on_close(restore)
+
+
+def size_option(ctx, param, value):
+    if value is None:
+        return None
+    try:
+        return parse_size(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
 
 
 @click.command()
@@ -54,6 +93,98 @@ from . import find_workflow, LANG_MODULES, __version__
     help="filename (basename) of the GitHub Actions workflow that runs the tests for the workflow",
 )
 @click.option("--diagram", help="relative path of the workflow diagram")
+@click.option(
+    "--materialize",
+    type=click.Choice(MATERIALIZE_MODES),
+    default="copy",
+    show_default=True,
+    help=(
+        "how files are placed in directory outputs. Links that cannot be created (e.g., across"
+        " file systems) fall back to copies"
+    ),
+)
+@click.option(
+    "--tracked-only",
+    is_flag=True,
+    help=(
+        "include only files tracked by git (read from the git index) in directories, skipping"
+        " untracked content such as work directories and results (if the index cannot be read,"
+        " e.g., a split or sparse index, all files are included, with a warning)"
+    ),
+)
+@click.option(
+    "--no-ignore",
+    is_flag=True,
+    help=(
+        "don't leave out of directories the files that match the patterns in .gitignore files (at any"
+        " level), .git/info/exclude and .repo2rocrateignore"
+    ),
+)
+@click.option(
+    "--max-file-size",
+    callback=size_option,
+    help=(
+        "size (e.g., 100M) above which files are described in the metadata, with their size and"
+        " digest, but not included in the crate"
+    ),
+)
+@click.option(
+    "--max-total-size",
+    callback=size_option,
+    help="maximum total size of the files included in the crate (e.g., 1G); files that don't fit are treated as above",
+)
+@click.option(
+    "--reference-only",
+    is_flag=True,
+    help=(
+        "don't include any file in the crate: refer to the workflow, diagram and data files by the"
+        " URLs of their contents at the current commit (GitHub repositories) or by their relative paths"
+    ),
+)
+@click.option(
+    "--store",
+    type=click.Path(file_okay=False, path_type=Path),
+    help=(
+        "content-addressed store directory: file contents are stored there once and directory"
+        " outputs are made of hard links to them (overrides --materialize)"
+    ),
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help=(
+        "skip the build if none of its inputs has changed since the last run (in-place output only)."
+        " Input fingerprints are saved to a state file in the repository root"
+    ),
+)
+@click.option(
+    "--hash-inputs",
+    is_flag=True,
+    help="with --incremental, also record input file hashes, so that files touched without changes don't trigger a rebuild",
+)
+@click.option(
+    "--watch",
+    is_flag=True,
+    help=(
+        "keep running and update the metadata whenever the repository changes (in-place output"
+        " only). Stop with Ctrl-C"
+    ),
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="print the time spent in each phase, with the number of files and bytes handled",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="don't use the persistent caches of file digests and extracted metadata",
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False, path_type=Path),
+    help="cache directory (default: $REPO2ROCRATE_CACHE_DIR or ~/.cache/repo2rocrate)",
+)
 @click.option("--version", help="print version and exit", is_flag=True)
 def cli(
     root,
@@ -67,40 +198,359 @@ def cli(
     license,
     ci_workflow,
     diagram,
+    materialize,
+    tracked_only,
+    no_ignore,
+    max_file_size,
+    max_total_size,
+    reference_only,
+    store,
+    incremental,
+    hash_inputs,
+    watch,
+    profile,
+    no_cache,
+    cache_dir,
     version,
 ):
     if version:
         print(__version__)
         return
-    auto_workflow = None
-    if not lang:
-        lang, auto_workflow = find_workflow(root)
-    if not workflow:
-        workflow = auto_workflow
-    make_crate = LANG_MODULES[lang].make_crate
-    crate = make_crate(
-        root,
-        workflow=workflow,
-        repo_url=repo_url,
-        wf_name=wf_name,
-        wf_version=wf_version,
-        lang_version=lang_version,
-        license=license,
-        ci_workflow=ci_workflow,
-        diagram=diagram,
-    )
+    configure_cache(no_cache, cache_dir)
+    # deferred imports keep startup fast for --version and --help
+    from .incremental import get_fingerprint, is_up_to_date, save_state
+    from .output import is_in_place, write_crate
+    if profile:
+        profiler = subscribe(Profiler())
+
+        def print_profile():
+            unsubscribe(profiler)
+            click.echo(profiler.report(), err=True)
+        click.get_current_context().call_on_close(print_profile)
     if not output:
         output = root
-    try:
-        in_place = output.samefile(root)
-    except OSError:
-        in_place = False
-    if in_place:
-        crate.metadata.write(output)
-    elif output.suffix == ".zip":
-        crate.write_zip(output)
+    in_place = is_in_place(root, output)
+    if tracked_only and not find_git_dir(root):
+        raise click.UsageError(f"--tracked-only requires {root} to be in a git working tree")
+    if watch and not in_place:
+        raise click.UsageError("--watch requires the output to be the repository root")
+    if incremental:
+        if not in_place:
+            raise click.UsageError("--incremental requires the output to be the repository root")
+        options = {
+            "lang": lang,
+            "workflow": str(workflow) if workflow else None,
+            "repo_url": repo_url,
+            "wf_name": wf_name,
+            "wf_version": wf_version,
+            "lang_version": lang_version,
+            "license": license,
+            "ci_workflow": ci_workflow,
+            "diagram": diagram,
+            "tracked_only": tracked_only,
+            "no_ignore": no_ignore,
+            "max_file_size": max_file_size,
+            "max_total_size": max_total_size,
+            "reference_only": reference_only,
+        }
+        if is_up_to_date(root, options) and not watch:
+            click.echo("metadata is up to date", err=True)
+            return
+
+    def build(fs):
+        wf_lang, wf_path = lang, workflow
+        if not wf_lang:
+            wf_lang, auto_workflow = find_workflow(root, fs=fs)
+            wf_path = wf_path or auto_workflow
+        make_crate = partial(
+            LANG_MODULES[wf_lang].make_crate,
+            root,
+            workflow=wf_path,
+            repo_url=repo_url,
+            wf_name=wf_name,
+            wf_version=wf_version,
+            lang_version=lang_version,
+            license=license,
+            ci_workflow=ci_workflow,
+            diagram=diagram,
+            fs=fs,
+            materialize=materialize,
+            honor_ignore=not no_ignore,
+            max_file_size=max_file_size,
+            max_total_size=max_total_size,
+            reference_only=reference_only,
+            store=store,
+        )
+        try:
+            return make_crate(tracked_only=tracked_only)
+        except GitIndexError as e:
+            click.echo(f"warning: {e}: including untracked files", err=True)
+            return make_crate(tracked_only=False)
+
+    def write(crate, fs):
+        stats = write_crate(crate, root, output)
+        if stats:
+            click.echo(f"copied {stats}", err=True)
+        if incremental:
+            # URLs of references and detached files point to the current commit
+            pinned = reference_only or max_file_size is not None or max_total_size is not None
+            save_state(root, options, get_fingerprint(crate, fs, hash=hash_inputs, head=pinned))
+
+    if watch:
+        from .watch import WatchSession
+        session = WatchSession(root, build, write)
+        session.rebuild()
+        click.echo(f"watching {root}", err=True)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    result = session.step()
+                except Exception as e:
+                    click.echo(f"update failed (will retry on the next change): {e}", err=True)
+                    continue
+                if result:
+                    click.echo(f"metadata updated ({result}, {time.perf_counter() - start:.3f}s)", err=True)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            session.close()
+        return
+    fs = FSSnapshot(root)
+    write(build(fs), fs)
+
+
+@click.command()
+@click.argument(
+    "roots",
+    nargs=-1,
+    required=True,
+    type=click.Path(exists=True, file_okay=False, readable=True, path_type=Path),
+)
+@click.option(
+    "-o",
+    "--out-dir",
+    type=click.Path(file_okay=False, path_type=Path),
+    help=(
+        "output directory: each crate is written to a subdirectory (or zip file) named after"
+        " the repository. The default is to write only the metadata file to each repository root"
+    ),
+)
+@click.option("--zip", "to_zip", is_flag=True, help="write crates as zip files (requires -o)")
+@click.option(
+    "--monorepo",
+    is_flag=True,
+    help=(
+        "treat each root as a Galaxy monorepo such as IWC and generate a crate for every .ga file"
+        " in it, at the workflow's relative path under the output directory (requires -o)"
+    ),
+)
+@click.option(
+    "-l",
+    "--lang",
+    type=click.Choice(list(LANG_MODULES)),
+    help="workflow language for all repositories (default: auto-detect for each one)",
+)
+@click.option(
+    "-j", "--jobs", type=click.IntRange(min=1), help="number of worker processes (default: number of CPUs)"
+)
+@click.option("--license", help="license URL")
+@click.option(
+    "--ci-workflow",
+    help="filename (basename) of the GitHub Actions workflow that runs the tests for the workflows",
+)
+@click.option(
+    "--materialize",
+    type=click.Choice(MATERIALIZE_MODES),
+    default="copy",
+    show_default=True,
+    help=(
+        "how files are placed in directory outputs. Links that cannot be created (e.g., across"
+        " file systems) fall back to copies"
+    ),
+)
+@click.option(
+    "--tracked-only",
+    is_flag=True,
+    help=(
+        "include only files tracked by git (read from the git index) in directories, skipping"
+        " untracked content such as work directories and results"
+    ),
+)
+@click.option(
+    "--no-ignore",
+    is_flag=True,
+    help=(
+        "don't leave out of directories the files that match the patterns in .gitignore files (at any"
+        " level), .git/info/exclude and .repo2rocrateignore"
+    ),
+)
+@click.option(
+    "--max-file-size",
+    callback=size_option,
+    help=(
+        "size (e.g., 100M) above which files are described in the metadata, with their size and"
+        " digest, but not included in the crate"
+    ),
+)
+@click.option(
+    "--max-total-size",
+    callback=size_option,
+    help="maximum total size of the files included in the crate (e.g., 1G); files that don't fit are treated as above",
+)
+@click.option(
+    "--reference-only",
+    is_flag=True,
+    help=(
+        "don't include any file in the crate: refer to the workflow, diagram and data files by the"
+        " URLs of their contents at the current commit (GitHub repositories) or by their relative paths"
+    ),
+)
+@click.option(
+    "--store",
+    type=click.Path(file_okay=False, path_type=Path),
+    help=(
+        "content-addressed store directory: file contents are stored there once and directory"
+        " outputs are made of hard links to them (overrides --materialize)"
+    ),
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="don't use the persistent caches of file digests and extracted metadata",
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False, path_type=Path),
+    help="cache directory (default: $REPO2ROCRATE_CACHE_DIR or ~/.cache/repo2rocrate)",
+)
+def batch(
+    roots,
+    out_dir,
+    to_zip,
+    monorepo,
+    lang,
+    jobs,
+    license,
+    ci_workflow,
+    materialize,
+    tracked_only,
+    no_ignore,
+    max_file_size,
+    max_total_size,
+    reference_only,
+    store,
+    no_cache,
+    cache_dir,
+):
+    """\
+    Generate crates for multiple workflow repositories in parallel.
+    """
+    configure_cache(no_cache, cache_dir)
+    if to_zip and not out_dir:
+        raise click.UsageError("--zip requires an output directory (-o)")
+    if out_dir and (not monorepo or len(roots) > 1):
+        # each crate (or monorepo output tree) is named after its root
+        names = {}
+        for root in roots:
+            names.setdefault(root.name, []).append(str(root))
+        clashes = [" and ".join(_) for _ in names.values() if len(_) > 1]
+        if clashes:
+            raise click.UsageError(f"roots with the same name would have the same output: {'; '.join(clashes)}")
+    if tracked_only:
+        outside = [str(_) for _ in roots if not find_git_dir(_)]
+        if outside:
+            raise click.UsageError(f"--tracked-only requires git working trees (not: {', '.join(outside)})")
+    kwargs = {
+        "jobs": jobs,
+        "license": license,
+        "ci_workflow": ci_workflow,
+        "materialize": materialize,
+        "tracked_only": tracked_only,
+        "honor_ignore": not no_ignore,
+        "max_file_size": max_file_size,
+        "max_total_size": max_total_size,
+        "reference_only": reference_only,
+        "store": store,
+    }
+    if monorepo:
+        if not out_dir:
+            raise click.UsageError("--monorepo requires an output directory (-o)")
+        if lang and lang != "galaxy":
+            raise click.UsageError("--monorepo is only supported for Galaxy workflows")
+        from .batch import run_monorepo
+        results = []
+        for root in roots:
+            out = out_dir / root.name if len(roots) > 1 else out_dir
+            results.extend(run_monorepo(root, out, to_zip=to_zip, **kwargs))
     else:
-        crate.write(output)
+        from .batch import run_batch
+        results = run_batch(roots, out_dir=out_dir, to_zip=to_zip, lang=lang, **kwargs)
+    n_failed = 0
+    for r in results:
+        if r.error:
+            n_failed += 1
+            click.echo(f"FAILED {r.root}: {r.error}", err=True)
+        else:
+            click.echo(f"OK {r.root} ({r.lang}) -> {r.output}")
+    click.echo(f"{len(results) - n_failed} succeeded, {n_failed} failed", err=True)
+    if n_failed:
+        raise SystemExit(1)
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1", show_default=True, help="address to listen on")
+@click.option("-p", "--port", type=click.IntRange(min=0), default=8000, show_default=True, help="TCP port to listen on")
+@click.option(
+    "-s",
+    "--socket",
+    "socket_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="listen on this Unix socket instead of a TCP port",
+)
+@click.option(
+    "-j", "--jobs", type=click.IntRange(min=1), help="number of worker processes (default: number of CPUs)"
+)
+@click.option(
+    "--max-queue",
+    type=click.IntRange(min=0),
+    default=64,
+    show_default=True,
+    help="maximum number of requests waiting for a worker; further requests are rejected",
+)
+@click.option("-q", "--quiet", is_flag=True, help="don't log requests")
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="don't use the persistent caches of file digests and extracted metadata",
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False, path_type=Path),
+    help="cache directory (default: $REPO2ROCRATE_CACHE_DIR or ~/.cache/repo2rocrate)",
+)
+def serve(host, port, socket_path, jobs, max_queue, quiet, no_cache, cache_dir):
+    """\
+    Run a crate generation service. POST a JSON object with the repository
+    root and make_crate options to /crate to get the metadata (or, with
+    "format": "zip", the crate as a zip file).
+    """
+    configure_cache(no_cache, cache_dir)
+    from .service import CrateService, make_server
+    with CrateService(jobs=jobs, max_queue=max_queue) as service:
+        server = make_server(service, host=host, port=port, socket_path=socket_path, quiet=quiet)
+        if socket_path:
+            click.echo(f"listening on {socket_path} ({service.jobs} workers)", err=True)
+        else:
+            click.echo(f"listening on http://{host}:{server.server_port} ({service.jobs} workers)", err=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            if socket_path:
+                socket_path.unlink(missing_ok=True)
 
 
 if __name__ == "__main__":
@@ -14,10 +14,17 @@
 
 from abc import ABCMeta, abstractmethod
 from pathlib import Path
+from urllib.parse import unquote
 
-from rocrate.rocrate import ROCrate
-from rocrate.utils import as_list
-from .utils import get_ci_wf_endpoint
+from .digest import add_digests
+from .dockstore import get_record, get_record_name
+from .fs import FSSnapshot
+from .gitindex import TrackedFiles, get_head_location
+from .ignore import IgnoreRules
+from .output import COPY, get_local_source, walk_dataset
+from .profile import is_enabled, phase
+from .sizepolicy import apply_size_policy
+from .utils import as_list, get_ci_wf_endpoint, get_raw_url, get_tree_url, parse_github_url
 
 GH_API_URL = "https://api.github.com"
 
@@ -28,10 +35,35 @@ class CrateBuilder(metaclass=ABCMeta):
     DATA_ENTITIES = []
     DIAGRAM = None
 
-    def __init__(self, root, repo_url=None):
+    def __init__(
+        self,
+        root,
+        repo_url=None,
+        fs=None,
+        materialize=None,
+        tracked_only=False,
+        honor_ignore=True,
+        max_file_size=None,
+        max_total_size=None,
+        reference_only=False,
+        store=None,
+    ):
         self.root = Path(root)
         self.repo_url = repo_url
-        self.crate = ROCrate(gen_preview=False)
+        self.reference_only = reference_only
+        self.max_file_size = max_file_size
+        self.max_total_size = max_total_size
+        self.fs = fs or FSSnapshot(self.root)
+        self.tracked = TrackedFiles(self.root, fs=self.fs) if tracked_only else None
+        self.ignore_rules = IgnoreRules.load(self.root, fs=self.fs) if honor_ignore else None
+        from .crate import RepoCrate  # deferred: the RO-Crate library is slow to import
+        self.crate = RepoCrate(
+            gen_preview=False,
+            materialize=materialize or COPY,
+            tracked=self.tracked,
+            ignore_rules=self.ignore_rules,
+            store=store,
+        )
 
     @property
     @abstractmethod
@@ -48,18 +80,124 @@ class CrateBuilder(metaclass=ABCMeta):
         ci_workflow=None,
         diagram=None,
     ):
-        workflow = self.add_workflow(
-            wf_source,
-            wf_name=wf_name,
-            wf_version=wf_version,
-            lang_version=lang_version,
-            license=license,
-            diagram=diagram,
-        )
-        self.add_test_suite(workflow=workflow, ci_workflow=ci_workflow)
-        self.add_data_entities()
+        with phase("add_workflow") as p:
+            n = len(self.crate.data_entities)
+            workflow = self.add_workflow(
+                wf_source,
+                wf_name=wf_name,
+                wf_version=wf_version,
+                lang_version=lang_version,
+                license=license,
+                diagram=diagram,
+            )
+            self.__count_entities(p, n)
+        with phase("add_test_suite") as p:
+            n = len(self.crate.data_entities)
+            self.add_test_suite(workflow=workflow, ci_workflow=ci_workflow)
+            self.__count_entities(p, n)
+        with phase("add_data_entities") as p:
+            n = len(self.crate.data_entities)
+            self.add_data_entities()
+            self.__count_entities(p, n)
+        if self.reference_only:
+            with phase("make_references") as p:
+                p.add(entities=self.make_references())
+            return self.crate
+        if self.max_file_size is not None or self.max_total_size is not None:
+            with phase("size_policy") as p:
+                detached = apply_size_policy(
+                    self.crate,
+                    max_file_size=self.max_file_size,
+                    max_total_size=self.max_total_size,
+                    repo_url=self.repo_url,
+                    location=self.get_head_location(),
+                    keep=[unquote(workflow.id)],
+                )
+                p.add(files=len(detached), bytes=sum(size for _, size in detached))
+        with phase("add_digests") as p:
+            digests = add_digests(self.crate, fs=self.fs)
+            p.add(files=len(digests), bytes=sum(size for _, size in digests.values()))
         return self.crate
 
+    def __count_entities(self, record, start=0):
+        """\
+        Add to ``record`` the number of data entities added to the crate
+        since there were ``start``, along with the number and size of those
+        that are local files.
+        """
+        if not is_enabled():
+            return
+        entities = self.crate.data_entities[start:]
+        record.add(entities=len(entities), files=0, bytes=0)
+        for e in entities:
+            relpath = unquote(e.id)
+            if get_local_source(e) is not None and self.fs.is_file(relpath):
+                record.add(files=1, bytes=self.fs.stat(relpath).st_size)
+
+    def __has_contents(self, relpath):
+        """\
+        Return false if directory ``relpath`` has no files left to include
+        after filtering out untracked and ignored ones (an empty directory
+        is kept, unless it is itself ignored).
+        """
+        source = self.root / relpath
+        if self.tracked is not None and not self.tracked.has_files(source):
+            return False
+        if self.ignore_rules is None:
+            return True
+        if self.ignore_rules.is_ignored(Path(relpath).as_posix(), is_dir=True):
+            return False
+        if next(iter(walk_dataset(self.crate, source)), None) is not None:
+            return True
+        return self.tracked is None and not self.fs.listdir(relpath)
+
+    def get_head_location(self):
+        """\
+        Return the current commit and the path of the root relative to the
+        git working tree (see ``gitindex.get_head_location``), or ``None`` if
+        not known or the repository is not on GitHub.
+        """
+        if not (self.repo_url and parse_github_url(self.repo_url)):
+            return None
+        return get_head_location(self.root)
+
+    def make_references(self):
+        """\
+        Turn all data entities with a local source into references, so that
+        no file is written to the crate. For a GitHub repository, they are
+        replaced by entities identified by the URLs of their contents at the
+        current commit, read from the local git directory; otherwise (or if
+        the commit is not known), they keep their relative paths. Return the
+        number of entities converted.
+        """
+        from rocrate.model.dataset import Dataset
+        from rocrate.utils import is_url
+        entities = [_ for _ in self.crate.data_entities if get_local_source(_) is not None and not is_url(_.id)]
+        location = self.get_head_location()
+        if not location:
+            self.crate.detached.update(unquote(_.id).rstrip("/") for _ in entities)
+            return len(entities)
+        commit, prefix = location
+        sources = {}
+        for e in entities:
+            relpath = (prefix / unquote(e.id).rstrip("/")).as_posix()
+            get_url = get_tree_url if isinstance(e, Dataset) else get_raw_url
+            sources[e] = get_url(self.repo_url, relpath, ref=commit)
+        self.crate.relocate_all(sources)
+        return len(entities)
+
+    def get_dockstore_name(self, *relpaths):
+        """\
+        Return the name of the first workflow among ``relpaths`` that has a
+        named record in the repository's Dockstore configuration, or
+        ``None``.
+        """
+        for relpath in relpaths:
+            record = get_record(self.root, relpath, fs=self.fs)
+            if record and record.get("name"):
+                return get_record_name(self.root, record)
+        return None
+
     def add_workflow(
         self,
         wf_source,
@@ -71,6 +209,7 @@ class CrateBuilder(metaclass=ABCMeta):
     ):
         if not diagram:
             diagram = self.DIAGRAM
+        self.fs.track(wf_source)
         workflow = self.crate.add_workflow(
             wf_source,
             wf_source.relative_to(self.root),
@@ -89,7 +228,7 @@ class CrateBuilder(metaclass=ABCMeta):
             workflow["url"] = self.crate.root_dataset["isBasedOn"] = self.repo_url
         if diagram:
             diag_source = self.root / diagram
-            if diag_source.is_file():
+            if self.fs.is_file(diagram):
                 diag = self.crate.add_file(
                     diag_source,
                     diagram,
@@ -106,8 +245,7 @@ class CrateBuilder(metaclass=ABCMeta):
             return None
         if not ci_workflow:
             ci_workflow = self.CI_WORKFLOW
-        ci_wf_source = self.root / ".github" / "workflows" / ci_workflow
-        if not ci_wf_source.is_file():
+        if not self.fs.is_file(Path(".github", "workflows", ci_workflow)):
             return None
         wf_name = workflow["name"] if workflow else self.crate.mainEntity["name"]
         suite = self.crate.add_test_suite(name=f"Test suite for {wf_name}", main_entity=workflow)
@@ -132,10 +270,10 @@ class CrateBuilder(metaclass=ABCMeta):
             if description:
                 properties["description"] = description
             if "File" in as_list(type_):
-                if source.is_file():
+                if self.fs.is_file(relpath):
                     self.crate.add_file(source, relpath, properties=properties)
             elif "Dataset" in as_list(type_):
-                if source.is_dir():
+                if self.fs.is_dir(relpath) and self.__has_contents(relpath):
                     self.crate.add_dataset(source, relpath, properties=properties)
             else:
                 raise ValueError(f"Unexpected type: {type_!r}")
@@ -0,0 +1,106 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from rocrate.model.metadata import Metadata
+from rocrate.rocrate import ROCrate
+from .jsonld import StreamingMetadata
+from .output import write_dir, write_zip, COPY, MATERIALIZE_MODES
+from .zipwriter import DEFAULT_MEMORY
+
+
+class RepoCrate(ROCrate):
+    """\
+    RO-Crate generated from a workflow repository.
+
+    Adds repo2rocrate's own output engines to ``ROCrate``. ``materialize``
+    sets how files are placed in directory outputs (one of
+    ``MATERIALIZE_MODES``). If ``tracked`` (a ``gitindex.TrackedFiles``) is
+    given, only tracked files are written as ``Dataset`` contents; if
+    ``ignore_rules`` (an ``ignore.IgnoreRules``) is given, files it matches
+    are left out. ``detached`` holds the destination paths of local files
+    that are described in the metadata but not written to the payload. If
+    ``store`` (a ``store.ContentStore`` or the path of its directory) is
+    given, directory outputs are made of links into it.
+
+    New crates get a ``jsonld.StreamingMetadata`` metadata entity, which
+    writes the metadata entity by entity.
+    """
+
+    def __init__(self, *args, materialize=COPY, tracked=None, ignore_rules=None, store=None, **kwargs):
+        if materialize not in MATERIALIZE_MODES:
+            raise ValueError(f"unknown materialization mode: {materialize!r}")
+        self.materialize = materialize
+        self.store = store
+        self.tracked = tracked
+        self.ignore_rules = ignore_rules
+        self.detached = set()
+        super().__init__(*args, **kwargs)
+        if type(self.metadata) is Metadata and not self.source:
+            self.add(StreamingMetadata(self, properties={"about": self.root_dataset}, version=self.metadata.version))
+
+    def relocate(self, entity, source):
+        """\
+        Replace data entity ``entity`` with one of the same type and
+        properties whose source and identifier is URL ``source``, updating
+        all references to it. Return the new entity.
+        """
+        return self.relocate_all({entity: source})[0]
+
+    def relocate_all(self, sources):
+        """\
+        Like ``relocate``, for all the entities in dictionary ``sources``
+        (which maps entities to URLs) at once. Return the list of the new
+        entities.
+        """
+        ids, new_entities = {}, []
+        has_part = self.root_dataset.properties().get("hasPart", [])
+        for entity, source in sources.items():
+            properties = {k: v for k, v in entity.properties().items() if k != "@id"}
+            new = type(entity)(self, source=source, properties=properties)
+            self.delete(entity)
+            self.add(new)
+            ids[entity.id] = new.id
+            new_entities.append(new)
+        for e in [self.root_dataset, self.metadata, *self.get_entities()]:
+            _replace_refs(e.properties(), ids)
+        if has_part:
+            self.root_dataset.properties()["hasPart"] = has_part  # keep the original order
+            _replace_refs(has_part, ids)
+        return new_entities
+
+    def write(self, base_path, jobs=None, materialize=None, store=None):
+        """\
+        Write the crate to directory ``base_path``, returning a
+        ``WriteStats`` instance.
+        """
+        return write_dir(
+            self,
+            base_path,
+            jobs=jobs,
+            materialize=materialize or self.materialize,
+            store=store or self.store,
+        )
+
+    def write_zip(self, out_path, jobs=None, memory=DEFAULT_MEMORY):
+        return write_zip(self, out_path, jobs=jobs, memory=memory)
+
+
+def _replace_refs(value, ids):
+    # replace {"@id": old_id} references in place, at any depth, according to ids (old_id -> new_id)
+    items = value.items() if isinstance(value, dict) else enumerate(value) if isinstance(value, list) else ()
+    for k, v in items:
+        if isinstance(v, dict) and k != "@id" and v.get("@id") in ids:
+            v["@id"] = ids[v["@id"]]
+        elif isinstance(v, (dict, list)):
+            _replace_refs(v, ids)
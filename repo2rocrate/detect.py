@@ -0,0 +1,111 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""\
+Workflow language detection.
+
+All languages are scored from the same file system snapshot: only the
+repository root and, for Snakemake, the ``workflow`` directory are listed.
+A language is a candidate if its workflow file is found; its score (between
+0 and 1) is the sum of the weights of the signals found for it, so that,
+e.g., a Snakemake repository that also contains a .ga file is still
+detected as Snakemake.
+"""
+
+import os
+from collections import namedtuple
+
+from .fs import DIR, FILE, FSSnapshot
+from .galaxy import PLANEMO_TEST_EXTENSIONS, PLANEMO_TEST_SUFFIXES, select_workflow
+
+
+Candidate = namedtuple("Candidate", "lang workflow score signals")
+Candidate.__doc__ = """\
+A detected workflow: ``lang`` is the language name, ``workflow`` the path of
+the workflow file, ``score`` the detection confidence and ``signals`` the
+list of relative paths that contributed to it.
+"""
+
+# workflow files (relative paths, in order of preference) and their weights
+WORKFLOW_SIGNALS = {
+    "nextflow": [("main.nf", 0.5)],
+    "snakemake": [("workflow/Snakefile", 0.6), ("Snakefile", 0.5)],
+    "galaxy": [("*.ga", 0.4)],
+}
+# additional signals: (relative path, kind, weight)
+SIGNALS = {
+    "nextflow": [
+        ("nextflow.config", FILE, 0.3),
+        ("nextflow_schema.json", FILE, 0.1),
+        ("modules.json", FILE, 0.05),
+        (".nf-core.yml", FILE, 0.05),
+    ],
+    "snakemake": [
+        ("workflow/rules", DIR, 0.1),
+        ("workflow/envs", DIR, 0.05),
+        ("config", DIR, 0.05),
+        (".tests", DIR, 0.1),
+    ],
+    "galaxy": [
+        (".dockstore.yml", FILE, 0.2),
+        ("test-data", DIR, 0.1),
+    ],
+}
+PLANEMO_TEST_WEIGHT = 0.2
+LANG_ORDER = {lang: i for i, lang in enumerate(WORKFLOW_SIGNALS)}  # breaks ties
+
+
+def _find_ga(fs):
+    # .ga file in the root directory (as chosen by the Galaxy module) and its Planemo test file
+    wf_name = select_workflow(fs)
+    if not wf_name:
+        return None, None
+    names = set(fs.listdir())
+    tag = os.path.splitext(wf_name)[0]
+    for suffix in PLANEMO_TEST_SUFFIXES:
+        for ext in PLANEMO_TEST_EXTENSIONS:
+            if f"{tag}{suffix}{ext}" in names and fs.kind(f"{tag}{suffix}{ext}") == FILE:
+                return wf_name, f"{tag}{suffix}{ext}"
+    return wf_name, None
+
+
+def detect(root_dir, fs=None):
+    """\
+    Return the list of workflow candidates (``Candidate``) found in
+    ``root_dir``, sorted by decreasing score.
+    """
+    if fs is None:
+        fs = FSSnapshot(root_dir)
+    candidates = []
+    for lang, wf_signals in WORKFLOW_SIGNALS.items():
+        signals, score = [], 0.0
+        for relpath, weight in wf_signals:
+            if relpath == "*.ga":
+                relpath, test_def = _find_ga(fs)
+                if relpath and test_def:
+                    signals.append(test_def)
+                    score += PLANEMO_TEST_WEIGHT
+            if relpath and fs.kind(relpath) == FILE:
+                signals.insert(0, relpath)
+                score += weight
+                break
+        if not signals:
+            continue
+        for relpath, kind, weight in SIGNALS[lang]:
+            if fs.kind(relpath) == kind:
+                signals.append(relpath)
+                score += weight
+        candidates.append(Candidate(lang, root_dir / signals[0], round(min(score, 1.0), 3), signals))
+    candidates.sort(key=lambda _: (-_.score, LANG_ORDER[_.lang]))
+    return candidates
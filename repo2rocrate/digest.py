@@ -0,0 +1,98 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""\
+Parallel computation of file content digests.
+"""
+
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import DigestCache
+from .output import get_local_source
+
+CHUNK_SIZE = 1 << 20
+
+
+def sha256_file(path, chunk_size=CHUNK_SIZE):
+    """\
+    Return the SHA-256 hex digest of the contents of ``path``, read in
+    chunks of ``chunk_size`` bytes into a single buffer, so that memory use
+    does not depend on the size of the file.
+    """
+    h = hashlib.sha256()
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        while n := f.readinto(buf):
+            h.update(view[:n])
+    return h.hexdigest()
+
+
+def compute_digests(paths, jobs=None, cache=None, stats=None):
+    """\
+    Return a dictionary that maps each of ``paths`` to a ``(sha256, size)``
+    tuple, hashing files on ``jobs`` threads (default: number of CPUs).
+    Digests are looked up in and saved to ``cache`` (a ``DigestCache``), if
+    given. ``stats`` can map paths to their already known ``os.stat``
+    results.
+    """
+    results, todo = {}, []
+    stats = stats or {}
+    for p in dict.fromkeys(paths):
+        st = stats.get(p) or os.stat(p)
+        digest = cache.get(st) if cache else None
+        if digest:
+            results[p] = (digest, st.st_size)
+        else:
+            todo.append((p, st))
+    if todo:
+        jobs = min(jobs or os.cpu_count() or 1, len(todo))
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            digests = list(executor.map(sha256_file, [p for p, _ in todo]))
+        for (p, st), digest in zip(todo, digests):
+            results[p] = (digest, st.st_size)
+        if cache:
+            cache.put_many((st, digest) for (_, st), digest in zip(todo, digests))
+    return results
+
+
+def add_digests(crate, jobs=None, cache=True, fs=None):
+    """\
+    Set ``sha256`` and ``contentSize`` on each ``File`` entity of ``crate``
+    whose source is a local file. If ``cache`` is true, use the persistent
+    digest cache (it can also be a ``DigestCache`` instance). Sources are
+    looked up in ``fs`` (an ``FSSnapshot``), if given.
+    """
+    from rocrate.model.file import File
+    is_file = fs.is_file if fs is not None else os.path.isfile
+    entities = {}
+    for e in crate.data_entities:
+        source = get_local_source(e)
+        if isinstance(e, File) and source is not None and is_file(os.path.abspath(source)):
+            entities.setdefault(source, []).append(e)
+    own_cache = cache is True
+    if own_cache:
+        cache = DigestCache()
+    try:
+        digests = compute_digests(entities, jobs=jobs, cache=cache or None)
+    finally:
+        if own_cache:
+            cache.close()
+    for source, (digest, size) in digests.items():
+        for e in entities[source]:
+            e["sha256"] = digest
+            e["contentSize"] = str(size)
+    return digests
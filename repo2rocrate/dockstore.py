@@ -0,0 +1,121 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""\
+Access to Dockstore configuration files (.dockstore.yml).
+
+https://docs.dockstore.org/en/stable/assets/templates/workflows/workflows.html
+
+Each file is parsed once into a dictionary that maps the
+``primaryDescriptorPath`` of each workflow to its record, so that lookups
+take constant time. Parse results are cached per file until its modification
+time or size changes, so they are shared by all the workflows in a monorepo
+or batch run.
+"""
+
+import os
+from pathlib import Path
+
+from .cache import memoize, memoize_in_memory
+from .fs import FSSnapshot
+
+DOCKSTORE_CONF_BASENAME = ".dockstore.yml"
+# where the file is looked for, relative to the repository root
+DOCKSTORE_CONF_RELPATHS = (DOCKSTORE_CONF_BASENAME, f".github/{DOCKSTORE_CONF_BASENAME}")
+
+
+def read_records(path):
+    """\
+    Parse the .dockstore.yml file at ``path``. Return a dictionary that maps
+    each workflow's ``primaryDescriptorPath`` (as a ``Path`` relative to the
+    repository root) to its record, or ``None`` if the file is not valid
+    YAML. Raise ``OSError`` if it cannot be read.
+    """
+    import yaml
+    try:
+        from yaml import CLoader as Loader
+    except ImportError:
+        from yaml import Loader
+    with open(path) as f:
+        try:
+            conf = yaml.load(f, Loader=Loader)
+        except yaml.error.YAMLError:
+            return None
+    if not isinstance(conf, dict):
+        return None
+    records = {}
+    for record in conf.get("workflows") or []:
+        relpath = str(record.get("primaryDescriptorPath", "")).strip().lstrip("/")
+        records.setdefault(Path(relpath), record)
+    return records
+
+
+def _dump_records(records):
+    return None if records is None else [[k.as_posix(), v] for k, v in records.items()]
+
+
+def _load_records(path):
+    records = memoize("dockstore.records", path, lambda: (_dump_records(read_records(path)), []))
+    return None if records is None else {Path(k): v for k, v in records}
+
+
+def load_records(path):
+    """\
+    Like ``read_records``, but return ``None`` if the file cannot be read
+    and use the cached result if the file has not changed since it was last
+    parsed (in this process or, by contents, in the metadata cache).
+    """
+    try:
+        return memoize_in_memory("dockstore.records", path, _load_records)
+    except OSError:
+        return None
+
+
+def find_config(root_dir, fs=None):
+    """\
+    Return the relative path of the Dockstore configuration file in
+    ``root_dir``, or ``None`` if there is none.
+    """
+    if fs is None:
+        fs = FSSnapshot(root_dir)
+    for relpath in DOCKSTORE_CONF_RELPATHS:
+        if fs.is_file(relpath):
+            return relpath
+    return None
+
+
+def get_record(root_dir, workflow_relpath, fs=None):
+    """\
+    Return the record of the workflow at ``workflow_relpath`` in the
+    Dockstore configuration file of repository ``root_dir``, or ``None`` if
+    not found.
+    """
+    if fs is None:
+        fs = FSSnapshot(root_dir)
+    relpath = find_config(root_dir, fs=fs)
+    if not relpath:
+        return None
+    fs.track(Path(root_dir) / relpath)
+    records = load_records(Path(root_dir) / relpath)
+    if not records:
+        return None
+    return records.get(Path(os.path.normpath(workflow_relpath)))
+
+
+def get_record_name(root_dir, record):
+    """\
+    Return the name of the workflow described by ``record`` as listed by
+    Dockstore, i.e., qualified by the repository name.
+    """
+    return f"{Path(root_dir).name}/{record.get('name')}"
@@ -0,0 +1,169 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""\
+In-memory snapshot of a repository tree, used to answer existence and type
+queries without issuing a separate system call for each of them.
+"""
+
+import os
+from pathlib import Path
+
+FILE = "file"
+DIR = "dir"
+OTHER = "other"
+
+
+class FSSnapshot:
+    """\
+    Snapshot of the file system tree under ``root``.
+
+    Directories are scanned (once, with ``os.scandir``) the first time a
+    query involves them, so only the parts of the tree that are actually
+    looked at are loaded. All paths are relative to ``root``; absolute paths
+    under ``root`` are accepted too. The ``syscalls`` attribute counts the
+    directory scans and stats performed so far.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.__abs_root = Path(os.path.abspath(root))
+        self.syscalls = 0
+        self.__dirs = {}
+        self.__stats = {}
+        self.__tracked = {}
+
+    def __parts(self, path):
+        path = Path(path)
+        if path.is_absolute():
+            try:
+                path = path.relative_to(self.__abs_root)
+            except ValueError:
+                return None
+        parts = tuple(_ for _ in os.path.normpath(path).split(os.sep) if _ not in ("", "."))
+        if ".." in parts:
+            return None
+        return parts
+
+    def __scan(self, parts):
+        try:
+            return self.__dirs[parts]
+        except KeyError:
+            pass
+        entries = None
+        if not parts or self.__kind(parts) == DIR:
+            self.syscalls += 1
+            try:
+                with os.scandir(self.root.joinpath(*parts)) as it:
+                    entries = {}
+                    for e in it:
+                        if e.is_symlink():
+                            self.syscalls += 1
+                        try:
+                            kind = DIR if e.is_dir() else FILE if e.is_file() else OTHER
+                        except OSError:
+                            kind = OTHER
+                        entries[e.name] = kind
+            except OSError:
+                entries = None
+        self.__dirs[parts] = entries
+        return entries
+
+    def __kind(self, parts):
+        if not parts:
+            return DIR
+        entries = self.__scan(parts[:-1])
+        if entries is None:
+            return None
+        return entries.get(parts[-1])
+
+    def kind(self, path):
+        """\
+        Return ``FILE``, ``DIR`` or ``OTHER`` according to the type of
+        ``path`` (symlinks are followed), or ``None`` if it does not exist.
+        """
+        parts = self.__parts(path)
+        if parts is None:
+            # outside of the snapshot
+            self.syscalls += 1
+            p = self.root / path
+            return DIR if p.is_dir() else FILE if p.is_file() else OTHER if p.exists() else None
+        return self.__kind(parts)
+
+    def is_file(self, path):
+        return self.kind(path) == FILE
+
+    def is_dir(self, path):
+        return self.kind(path) == DIR
+
+    def exists(self, path):
+        return self.kind(path) is not None
+
+    def listdir(self, path=""):
+        """\
+        Return the names of the entries in directory ``path``. Raise
+        ``NotADirectoryError`` if ``path`` is not a directory.
+        """
+        parts = self.__parts(path)
+        entries = None if parts is None else self.__scan(parts)
+        if entries is None:
+            raise NotADirectoryError(f"{self.root / path} is not a directory")
+        return list(entries)
+
+    def stat(self, path):
+        parts = self.__parts(path)
+        try:
+            return self.__stats[parts]
+        except KeyError:
+            pass
+        self.syscalls += 1
+        st = (self.root / path).stat()
+        if parts is not None:
+            self.__stats[parts] = st
+        return st
+
+    def subtree(self, path):
+        """\
+        Return a snapshot rooted at directory ``path``, containing the
+        directory scans and stats already performed under it (so that they
+        are not repeated). The two snapshots are independent from then on.
+        """
+        parts = self.__parts(path)
+        if parts is None:
+            raise ValueError(f"{path} is outside of {self.root}")
+        sub = self.__class__(self.root.joinpath(*parts))
+        n = len(parts)
+        for cache, sub_cache in (self.__dirs, sub.__dirs), (self.__stats, sub.__stats):
+            for k, v in cache.items():
+                if k[:n] == parts:
+                    sub_cache[k[n:]] = v
+        return sub
+
+    def track(self, path):
+        """\
+        Record that the contents of ``path`` have been used (e.g., parsed to
+        extract metadata).
+        """
+        self.__tracked[Path(path)] = None
+
+    @property
+    def tracked(self):
+        return list(self.__tracked)
+
+    @property
+    def scanned_dirs(self):
+        """\
+        Relative paths of the directories scanned so far.
+        """
+        return [Path(*_) for _, entries in self.__dirs.items() if entries is not None]
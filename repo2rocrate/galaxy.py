@@ -22,57 +22,127 @@ https://github.com/galaxyproject/iwc/blob/main/workflows/README.md
 import json
 import os
 import warnings
+from collections import namedtuple
 from pathlib import Path
 
-import yaml
-from rocrate.model.entity import Entity
-
-try:
-    from yaml import CLoader as Loader
-except ImportError:
-    from yaml import Loader
+from .cache import memoize
 from .common import CrateBuilder
+from .dockstore import DOCKSTORE_CONF_BASENAME, get_record, get_record_name
+from .fs import DIR, FILE, FSSnapshot
+from .jsonscan import load_keys
+from .profile import phase
 
 
-DOCKSTORE_CONF_BASENAME = ".dockstore.yml"
 PLANEMO_TEST_SUFFIXES = ["-tests", "_tests", "-test", "_test"]
 PLANEMO_TEST_EXTENSIONS = [".yml", ".yaml", ".json"]
+# top-level .ga fields used for the metadata
+WF_KEYS = ("release", "license", "creator")
+# directories not searched for workflows when indexing a monorepo
+INDEX_SKIP_DIRS = frozenset(["test-data", "node_modules", "__pycache__"])
+
+WorkflowInfo = namedtuple("WorkflowInfo", "root workflow test_definition dockstore_record fs")
+WorkflowInfo.__doc__ = """\
+A workflow found in a monorepo: ``root`` is the directory that contains the
+``workflow`` (.ga) file, ``test_definition`` is the path of its Planemo test
+file and ``dockstore_record`` its entry in the directory's .dockstore.yml
+(``None`` if not found). ``fs`` is a snapshot of ``root``.
+"""
 
 
-def find_workflow(root_dir):
-    candidates = [_.name for _ in os.scandir(root_dir) if _.is_file() and _.name.endswith(".ga")]
+def select_workflow(fs):
+    """\
+    Return the name of the .ga file in the root of snapshot ``fs`` to use
+    as the workflow, or ``None`` if there is none. If there are several,
+    warn and pick main.ga, if present, or the first in sorted order.
+    """
+    candidates = sorted(_ for _ in fs.listdir() if _.endswith(".ga") and fs.is_file(_))
     if not candidates:
-        raise RuntimeError("workflow (.ga file) not found")
+        return None
     if len(candidates) > 1:
-        warnings.warn("Multiple .ga files found, picking one arbitrarily")
-        for c in candidates:
-            if c.lower() == "main.ga":
-                return root_dir / c
-    return root_dir / candidates[0]
+        name = next((_ for _ in candidates if _.lower() == "main.ga"), candidates[0])
+        warnings.warn(f"Multiple .ga files found, picking {name}")
+        return name
+    return candidates[0]
 
 
-def find_test_definition(root_dir, wf_name):
+def find_workflow(root_dir, fs=None):
+    if fs is None:
+        fs = FSSnapshot(root_dir)
+    name = select_workflow(fs)
+    if not name:
+        raise RuntimeError("workflow (.ga file) not found")
+    return root_dir / name
+
+
+def find_test_definition(root_dir, wf_name, fs=None):
+    if fs is None:
+        fs = FSSnapshot(root_dir)
     tag = os.path.splitext(wf_name)[0]
     for suffix in PLANEMO_TEST_SUFFIXES:
         for ext in PLANEMO_TEST_EXTENSIONS:
-            def_path = root_dir / f"{tag}{suffix}{ext}"
-            if def_path.is_file():
-                return def_path
+            def_relpath = f"{tag}{suffix}{ext}"
+            if fs.is_file(def_relpath):
+                return root_dir / def_relpath
 
 
-def get_workflow_name(root_dir, workflow_relpath):
-    dockstore_conf_path = root_dir / DOCKSTORE_CONF_BASENAME
-    if not dockstore_conf_path.is_file():
-        return None
-    try:
-        with open(dockstore_conf_path) as f:
-            conf = yaml.load(f, Loader=Loader)
-    except (OSError, yaml.error.YAMLError):
-        return None
-    for record in conf.get("workflows", []):
-        relpath = record.get("primaryDescriptorPath", "").strip().lstrip("/")
-        if Path(relpath) == workflow_relpath:
-            return f"{root_dir.name}/{record.get('name')}"
+def get_workflow_fields(wf_path):
+    """\
+    Return the top-level fields of Galaxy workflow ``wf_path`` used for the
+    metadata (``WF_KEYS``). Results are cached by file contents.
+    """
+    def compute():
+        with open(wf_path) as f:
+            try:
+                return load_keys(f, WF_KEYS), []
+            except json.decoder.JSONDecodeError:
+                return {}, []
+    return memoize("galaxy.fields", wf_path, compute)
+
+
+def get_workflow_name(root_dir, workflow_relpath, fs=None):
+    record = get_record(root_dir, workflow_relpath, fs=fs)
+    if record is not None:
+        return get_record_name(root_dir, record)
+
+
+def index_workflows(root_dir, fs=None):
+    """\
+    Find all Galaxy workflows in a monorepo such as IWC, where each
+    workflow directory contains one or more .ga files, along with their
+    Planemo tests and a .dockstore.yml. The tree is traversed once, without
+    descending into workflow directories, hidden directories or
+    ``INDEX_SKIP_DIRS``. Return a list
+    of ``WorkflowInfo``, sorted by workflow path.
+    """
+    root_dir = Path(root_dir)
+    if fs is None:
+        fs = FSSnapshot(root_dir)
+    index = []
+    stack = [Path()]
+    while stack:
+        d = stack.pop()
+        subdirs, ga_names = [], []
+        for name in sorted(fs.listdir(d)):
+            kind = fs.kind(d / name)
+            if kind == FILE and name.endswith(".ga"):
+                ga_names.append(name)
+            elif kind == DIR and not name.startswith(".") and name not in INDEX_SKIP_DIRS:
+                subdirs.append(d / name)
+        if not ga_names:
+            stack.extend(reversed(subdirs))
+            continue
+        wf_dir = root_dir / d
+        sub_fs = fs.subtree(d)
+        for name in ga_names:
+            index.append(WorkflowInfo(
+                wf_dir,
+                wf_dir / name,
+                find_test_definition(wf_dir, name, fs=sub_fs),
+                get_record(wf_dir, name, fs=sub_fs),
+                sub_fs,
+            ))
+    index.sort(key=lambda _: _.workflow)
+    return index
 
 
 class GalaxyCrateBuilder(CrateBuilder):
@@ -91,6 +161,7 @@ class GalaxyCrateBuilder(CrateBuilder):
         return "galaxy"
 
     def __add_creator(self, workflow, wf_code):
+        from rocrate.model.entity import Entity
         for c in wf_code.get("creator", []):
             type_ = c.get("class")
             if type_ not in {"Organization", "Person"}:
@@ -113,7 +184,7 @@ class GalaxyCrateBuilder(CrateBuilder):
         diagram=None,
     ):
         if not wf_name:
-            wf_name = get_workflow_name(self.root, wf_source.relative_to(self.root))
+            wf_name = get_workflow_name(self.root, wf_source.relative_to(self.root), fs=self.fs)
         workflow = super().add_workflow(
             wf_source,
             wf_name=wf_name,
@@ -122,11 +193,7 @@ class GalaxyCrateBuilder(CrateBuilder):
             license=license,
             diagram=diagram,
         )
-        with open(wf_source) as f:
-            try:
-                wf_code = json.load(f)
-            except json.decoder.JSONDecodeError:
-                wf_code = {}
+        wf_code = get_workflow_fields(wf_source)
         if "release" in wf_code:
             workflow.setdefault("version", wf_code["release"])
         if "license" in wf_code:
@@ -138,7 +205,7 @@ class GalaxyCrateBuilder(CrateBuilder):
         suite = super().add_test_suite(workflow, ci_workflow=ci_workflow)
         if workflow is None:
             workflow = suite["mainEntity"]
-        def_path = find_test_definition(self.root, workflow.id)
+        def_path = find_test_definition(self.root, workflow.id, fs=self.fs)
         if def_path:
             self.crate.add_test_definition(
                 suite, source=def_path, dest_path=def_path.relative_to(self.root), engine="planemo"
@@ -156,10 +223,31 @@ def make_crate(
     license=None,
     ci_workflow=None,
     diagram=None,
+    fs=None,
+    materialize=None,
+    tracked_only=False,
+    honor_ignore=True,
+    max_file_size=None,
+    max_total_size=None,
+    reference_only=False,
+    store=None,
 ):
-    builder = GalaxyCrateBuilder(root, repo_url=repo_url)
+    builder = GalaxyCrateBuilder(
+        root,
+        repo_url=repo_url,
+        fs=fs,
+        materialize=materialize,
+        tracked_only=tracked_only,
+        honor_ignore=honor_ignore,
+        max_file_size=max_file_size,
+        max_total_size=max_total_size,
+        reference_only=reference_only,
+        store=store,
+    )
     if not workflow:
-        workflow = find_workflow(root)
+        with phase("detection") as p:
+            workflow = find_workflow(root, fs=builder.fs)
+            p.add(files=1)
     return builder.build(
         workflow,
         wf_name=wf_name,
@@ -0,0 +1,296 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""\
+Enumeration of the files tracked by git, read directly from the index file
+(``.git/index``) rather than by walking the working tree, which can contain
+large amounts of untracked data (work directories, results, caches), and
+resolution of the current commit, without running git.
+
+https://git-scm.com/docs/index-format
+"""
+
+import os
+import re
+import struct
+from bisect import bisect_left
+from pathlib import Path
+
+SIGNATURE = b"DIRC"
+HEADER = struct.Struct(">4sII")
+# ctime, mtime (seconds and nanoseconds), dev, ino, mode, uid, gid, size, sha1, flags
+ENTRY = struct.Struct(">10I20sH")
+EXTENSION = struct.Struct(">4sI")  # signature, size
+MIN_CHECKSUM_SIZE = 20
+UNSUPPORTED_EXTENSIONS = {b"link": "split index", b"sdir": "sparse index"}
+EXTENDED_FLAG = 0x4000
+SKIP_WORKTREE_FLAG = 0x4000  # in the extended flags
+MODE_TYPE_MASK = 0o170000
+MODE_REGULAR, MODE_SYMLINK = 0o100000, 0o120000
+COMMIT_ID_RE = re.compile(r"[0-9a-f]{40}|[0-9a-f]{64}")  # SHA-1 or SHA-256
+MAX_SYMREF_DEPTH = 5
+
+
+class GitIndexError(ValueError):
+    """\
+    The git index cannot be used (missing working tree, corrupt or
+    unsupported index).
+    """
+
+
+def find_git_dir(path):
+    """\
+    Find the working tree that contains ``path``. Return a ``(worktree,
+    git_dir)`` tuple, or ``None`` if ``path`` is not in a working tree. A
+    ``.git`` file (as in linked worktrees and submodules) is followed to
+    the actual git directory.
+    """
+    path = Path(os.path.abspath(path))
+    for d in [path, *path.parents]:
+        dot_git = d / ".git"
+        if dot_git.is_dir():
+            return d, dot_git
+        if dot_git.is_file():
+            try:
+                content = dot_git.read_text().strip()
+            except OSError:
+                return None
+            if content.startswith("gitdir:"):
+                return d, d / content[len("gitdir:"):].strip()
+            return None
+    return None
+
+
+def get_common_dir(git_dir):
+    """\
+    Return the directory that holds the files shared by all the worktrees
+    of ``git_dir`` (refs, objects, ``info``): for a linked worktree, the
+    one named in its ``commondir`` file; otherwise, ``git_dir`` itself.
+    """
+    git_dir = Path(git_dir)
+    try:
+        return git_dir / (git_dir / "commondir").read_text().strip()
+    except OSError:
+        return git_dir
+
+
+def read_head(git_dir):
+    """\
+    Return the id of the commit that ``HEAD`` points to in ``git_dir``, or
+    ``None`` if it cannot be resolved (e.g., in a repository without
+    commits). Symbolic references are followed through loose and packed
+    refs; for linked worktrees, the latter are looked up in the common
+    git directory.
+    """
+    git_dir = Path(git_dir)
+    common_dir = get_common_dir(git_dir)
+    try:
+        value = (git_dir / "HEAD").read_text().strip()
+    except OSError:
+        return None
+    for _ in range(MAX_SYMREF_DEPTH):
+        if not value or not value.startswith("ref:"):
+            break
+        ref = value[len("ref:"):].strip()
+        for d in git_dir, common_dir:
+            try:
+                value = (d / ref).read_text().strip()
+                break
+            except OSError:
+                pass
+        else:
+            value = _read_packed_ref(common_dir, ref)
+    return value if value and COMMIT_ID_RE.fullmatch(value) else None
+
+
+def get_head_location(path):
+    """\
+    Return a ``(commit, prefix)`` tuple, where ``commit`` is the id of the
+    commit checked out in the working tree that contains ``path`` and
+    ``prefix`` is the path of ``path`` relative to the working tree, or
+    ``None`` if ``path`` is not in a working tree or the commit cannot be
+    resolved.
+    """
+    found = find_git_dir(path)
+    if not found:
+        return None
+    worktree, git_dir = found
+    commit = read_head(git_dir)
+    if not commit:
+        return None
+    return commit, Path(os.path.relpath(os.path.abspath(path), worktree))
+
+
+def _read_packed_ref(common_dir, ref):
+    try:
+        with open(common_dir / "packed-refs") as f:
+            for line in f:
+                if line[:1] not in ("#", "^"):
+                    parts = line.split()
+                    if len(parts) == 2 and parts[1] == ref:
+                        return parts[0]
+    except OSError:
+        pass
+    return None
+
+
+def _read_varint(data, pos):
+    # offset encoding used by index version 4
+    c = data[pos]
+    pos += 1
+    value = c & 0x7F
+    while c & 0x80:
+        c = data[pos]
+        pos += 1
+        value = ((value + 1) << 7) | (c & 0x7F)
+    return value, pos
+
+
+def read_index(index_path):
+    """\
+    Parse the git index file at ``index_path`` (versions 2 to 4). Return the
+    sorted list of the POSIX paths, relative to the working tree, of the
+    regular files and symlinks it lists. Unmerged paths (which have an
+    entry per conflict stage) are reported once; submodules and entries
+    excluded by a sparse checkout (skip-worktree) are left out. Raise
+    ``GitIndexError`` if the file is not a valid index, or if it needs an
+    extension that is not supported: a split index (``link``), whose
+    entries are partly stored in a separate file, or a sparse index
+    (``sdir``), where whole directories outside of the sparse checkout
+    are collapsed into a single entry.
+    """
+    with open(index_path, "rb") as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise GitIndexError(f"{index_path}: truncated git index")
+    signature, version, n = HEADER.unpack_from(data)
+    if signature != SIGNATURE or version not in (2, 3, 4):
+        raise GitIndexError(f"{index_path}: unsupported git index (version {version})")
+    paths = []
+    pos = HEADER.size
+    name = b""
+    has_empty_names = False
+    unpack_entry = ENTRY.unpack_from
+    try:
+        for _ in range(n):
+            fields = unpack_entry(data, pos)
+            mode, flags = fields[6], fields[11]
+            start = pos
+            pos += ENTRY.size
+            extended = 0
+            if flags & EXTENDED_FLAG:
+                extended = struct.unpack_from(">H", data, pos)[0]
+                pos += 2
+            if version == 4:
+                strip, pos = _read_varint(data, pos)
+                end = data.index(b"\0", pos)
+                name = name[:len(name) - strip] + data[pos:end]
+                pos = end + 1
+            else:
+                end = data.index(b"\0", pos)
+                name = data[pos:end]
+                pos = start + ((end - start + 8) & ~7)
+            if not name:
+                has_empty_names = True  # e.g., placeholders in a split index
+                continue
+            if extended & SKIP_WORKTREE_FLAG:
+                continue
+            if mode & MODE_TYPE_MASK in (MODE_REGULAR, MODE_SYMLINK):
+                paths.append(name)
+        # extensions, followed by the checksum of the file (at least 20 bytes)
+        extensions = set()
+        while pos + EXTENSION.size + MIN_CHECKSUM_SIZE <= len(data):
+            signature, size = EXTENSION.unpack_from(data, pos)
+            pos += EXTENSION.size + size
+            if pos + MIN_CHECKSUM_SIZE > len(data):
+                break  # not an extension: the checksum is longer
+            extensions.add(signature)
+    except (struct.error, ValueError, IndexError):
+        raise GitIndexError(f"{index_path}: truncated git index")
+    for signature, description in UNSUPPORTED_EXTENSIONS.items():
+        if signature in extensions:
+            raise GitIndexError(f"{index_path}: unsupported git index ({description})")
+    if has_empty_names:
+        raise GitIndexError(f"{index_path}: invalid git index (entries with empty paths)")
+    return sorted({_.decode("utf-8", "surrogateescape") for _ in paths})
+
+
+class TrackedFiles:
+    """\
+    The files tracked by git in the working tree that contains ``root``.
+    Raise ``GitIndexError`` if there is none. If ``fs`` (an ``FSSnapshot``)
+    is given, the index file is recorded as an input in it, so that
+    staging changes invalidates incremental builds.
+    """
+
+    def __init__(self, root, fs=None):
+        found = find_git_dir(root)
+        if not found:
+            raise GitIndexError(f"{root} is not in a git working tree")
+        self.worktree, git_dir = found
+        index_path = git_dir / "index"
+        if fs is not None:
+            fs.track(Path(os.path.abspath(index_path)))
+        self.paths = read_index(index_path) if index_path.exists() else []
+
+    def __relkey(self, path):
+        rel = os.path.relpath(os.path.abspath(path), self.worktree)
+        return "" if rel == os.curdir else Path(rel).as_posix()
+
+    def __range(self, prefix):
+        i = bisect_left(self.paths, prefix)
+        while i < len(self.paths) and self.paths[i].startswith(prefix):
+            yield self.paths[i]
+            i += 1
+
+    def is_tracked(self, path):
+        key = self.__relkey(path)
+        i = bisect_left(self.paths, key)
+        return i < len(self.paths) and self.paths[i] == key
+
+    def has_files(self, top):
+        """\
+        Return true if any tracked file is under directory ``top``.
+        """
+        key = self.__relkey(top)
+        return next(self.__range(f"{key}/" if key else ""), None) is not None
+
+    def walk(self, top, exclude=None, ignore=None):
+        """\
+        Like ``output.walk_files``, but yield only tracked files (that exist
+        in the working tree), in lexicographic order of their paths.
+        """
+        key = self.__relkey(top)
+        prefix = f"{key}/" if key else ""
+        exclude_key = self.__relkey(exclude) if exclude else None
+        top = Path(top)
+        ignored_dirs = {"": False}
+
+        def is_dir_ignored(d):
+            try:
+                return ignored_dirs[d]
+            except KeyError:
+                pass
+            ignored = ignored_dirs[d] = is_dir_ignored(d.rpartition("/")[0]) or ignore(d, True)
+            return ignored
+
+        for p in self.__range(prefix):
+            if exclude_key is not None and (p == exclude_key or p.startswith(f"{exclude_key}/")):
+                continue
+            relpath = p[len(prefix):]
+            if ignore and (is_dir_ignored(relpath.rpartition("/")[0]) or ignore(relpath, False)):
+                continue
+            path = top / relpath
+            if os.path.isfile(path):
+                yield path, relpath
@@ -0,0 +1,316 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""\
+Exclusion of files from ``Dataset`` contents based on ignore files.
+
+Files are excluded as git would do, according to the ``.gitignore`` files
+in the repository root, in its subdirectories and in the directories above
+it up to the top of its git working tree (those in deeper directories
+taking precedence), and to the working tree's ``info/exclude`` file (with
+the lowest precedence). The patterns in ``.repo2rocrateignore``, in the
+repository root, take precedence over all of them. All use the gitignore
+syntax:
+
+https://git-scm.com/docs/gitignore#_pattern_format
+
+The patterns of each file are compiled into a single matcher: a regular expression where
+each pattern is a group and later patterns come first, so that the group of
+the match tells which pattern wins, and thus whether the path is ignored or
+re-included by a negated pattern. Patterns without a slash, which can match
+at any depth, are matched against the last path component only, by a
+separate expression; directories get their own pair of expressions, since
+patterns ending with a slash only match them. Matching a path thus takes at
+most two regular expression matches, whatever the number of patterns.
+"""
+
+import os
+import re
+from pathlib import Path
+
+GITIGNORE_BASENAME = ".gitignore"
+IGNORE_FILE_BASENAME = ".repo2rocrateignore"
+ANY_DIRS = "(?:.*/)?"  # zero or more leading directories
+
+
+def _ignore_all(relpath, is_dir):
+    return True
+
+
+def translate(pattern):
+    """\
+    Translate a gitignore ``pattern`` into a regular expression. Return a
+    ``(regex, negated, dir_only, basename)`` tuple, or ``None`` for blank
+    lines and comments: if ``basename`` is true, the expression is to be
+    matched against the last component of paths, otherwise against POSIX
+    paths relative to the directory of the ignore file.
+    """
+    line = pattern.rstrip("\r\n")
+    stripped = line.rstrip(" ")
+    if stripped.endswith("\\") and len(stripped) < len(line):
+        stripped += " "  # escaped trailing space
+    line = stripped
+    if not line or line.startswith("#"):
+        return None
+    negated = line.startswith("!")
+    if negated:
+        line = line[1:]
+    dir_only = line.endswith("/") and not line.endswith("\\/")
+    if dir_only:
+        line = line[:-1]
+    if not line:
+        return None
+    basename = "/" not in line
+    if line.startswith("/"):
+        line = line[1:]
+    elif line.startswith("**/") and "/" not in line[3:]:
+        basename = True
+        line = line[3:]
+    out = []
+    i, n = 0, len(line)
+    while i < n:
+        c = line[i]
+        if c == "*":
+            j = i
+            while j < n and line[j] == "*":
+                j += 1
+            if j - i == 2 and (i == 0 or line[i - 1] == "/") and (j == n or line[j] == "/"):
+                if j == n:
+                    out.append(".*")
+                    i = j
+                else:
+                    out.append(ANY_DIRS)
+                    i = j + 1
+                continue
+            out.append("[^/]*")
+            i = j
+        elif c == "?":
+            out.append("[^/]")
+            i += 1
+        elif c == "[":
+            j = i + 1
+            if j < n and line[j] in "!^":
+                j += 1
+            if j < n and line[j] == "]":
+                j += 1
+            j = line.find("]", j)
+            if j < 0:
+                out.append(re.escape(c))
+                i += 1
+                continue
+            stuff = line[i + 1:j]
+            negate = stuff[:1] in ("!", "^")
+            if negate:
+                stuff = stuff[1:]
+            stuff = re.sub(r"([\\\[&~|])", r"\\\1", stuff)
+            out.append(f"(?!/)[{'^' if negate else ''}{stuff}]")
+            i = j + 1
+        elif c == "\\" and i + 1 < n:
+            out.append(re.escape(line[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return "".join(out), negated, dir_only, basename
+
+
+def _compile(rules):
+    # rules are (index, regex) pairs; later rules come first, each in its own
+    # group, so the first alternative that matches is the winning rule
+    if not rules:
+        return None, []
+    rules = rules[::-1]
+    return re.compile("|".join(f"({_[1]})" for _ in rules), re.S), [_[0] for _ in rules]
+
+
+class _Patterns:
+    """\
+    A compiled list of gitignore patterns, relative to the same directory.
+    """
+
+    def __init__(self, patterns):
+        rules = [_ for _ in map(translate, patterns) if _]
+        self.size = len(rules)
+        self.__negated = [_[1] for _ in rules]
+        # (basename matcher, path matcher) for files and for directories
+        self.__matchers = [
+            tuple(
+                _compile([(i, r[0]) for i, r in enumerate(rules) if r[3] == basename and (is_dir or not r[2])])
+                for basename in (True, False)
+            )
+            for is_dir in (False, True)
+        ]
+
+    def decide(self, relpath, is_dir=False):
+        """\
+        Return ``True`` if the last pattern that matches the POSIX path
+        ``relpath`` excludes it, ``False`` if it is a negated pattern, or
+        ``None`` if no pattern matches.
+        """
+        (base_re, base_rules), (path_re, path_rules) = self.__matchers[is_dir]
+        winner = -1
+        if base_re is not None:
+            m = base_re.fullmatch(relpath, relpath.rfind("/") + 1)
+            if m:
+                winner = base_rules[m.lastindex - 1]
+        if path_re is not None:
+            m = path_re.fullmatch(relpath)
+            if m:
+                winner = max(winner, path_rules[m.lastindex - 1])
+        return None if winner < 0 else not self.__negated[winner]
+
+
+def _read_patterns(path, fs=None):
+    # files found are tracked in fs, if given; those outside of it are just
+    # opened, rather than looked up in it at the cost of extra system calls
+    inside = fs is not None and Path(os.path.abspath(fs.root)) in path.parents
+    if inside and not fs.is_file(path):
+        return []
+    try:
+        with open(path, encoding="utf-8", errors="surrogateescape") as f:
+            patterns = list(f)
+    except OSError:
+        return []
+    if fs is not None:
+        fs.track(path)
+    return patterns
+
+
+class IgnoreRules:
+    """\
+    Gitignore patterns that apply to the files under directory ``root``.
+
+    ``patterns`` are relative to ``root`` and have the lowest precedence;
+    ``outer`` lists ``(prefix, patterns)`` pairs for the ``.gitignore``
+    files of directories above ``root`` (in order of precedence), whose
+    patterns are matched against ``prefix`` followed by the path relative
+    to ``root``; ``override`` patterns, relative to ``root``, take
+    precedence over everything else. If ``per_dir`` is true, the
+    ``.gitignore`` file of each directory under ``root`` (including
+    ``root`` itself) is read when a path in it is first matched, and its
+    patterns take precedence over those of the directories above, as in
+    git. Files are looked up in ``fs`` (an ``FSSnapshot`` of ``root``), if
+    given, which also tracks the ones found.
+    """
+
+    def __init__(self, root, patterns, outer=(), override=(), per_dir=False, fs=None):
+        self.root = os.path.abspath(root)
+        self.fs = fs
+        self.per_dir = per_dir
+        self.__base = _Patterns(patterns)
+        self.__outer = [(prefix, _Patterns(_)) for prefix, _ in outer]
+        self.__override = _Patterns(override)
+        self.size = self.__base.size + self.__override.size + sum(_[1].size for _ in self.__outer)
+        self.__dir_patterns = {}
+        self.__dirs = {}
+
+    @classmethod
+    def load(cls, root, fs=None):
+        """\
+        Read the ignore files that apply to ``root``: the
+        ``.repo2rocrateignore`` file in it and, as in git, the ``.gitignore``
+        files in it, in its subdirectories (read as they are needed) and in
+        the directories above it up to the top of its git working tree, if
+        any, plus the working tree's ``info/exclude`` file. The global
+        excludes file (``core.excludesFile``) is not read. Return an
+        ``IgnoreRules`` instance. If ``fs`` (an ``FSSnapshot`` of ``root``)
+        is given, the files found are tracked in it.
+        """
+        from .gitindex import find_git_dir, get_common_dir
+        root = Path(os.path.abspath(root))
+        override = _read_patterns(root / IGNORE_FILE_BASENAME, fs=fs)
+        patterns, outer = [], []
+        found = find_git_dir(root)
+        if found:
+            worktree, git_dir = found
+            patterns = _read_patterns(get_common_dir(git_dir) / "info" / "exclude", fs=fs)
+            for d in root.parents:
+                if worktree != d and worktree not in d.parents:
+                    break
+                outer.append((f"{root.relative_to(d).as_posix()}/", _read_patterns(d / GITIGNORE_BASENAME, fs=fs)))
+        return cls(root, patterns, outer=outer, override=override, per_dir=True, fs=fs)
+
+    def __get_dir_patterns(self, reld):
+        try:
+            return self.__dir_patterns[reld]
+        except KeyError:
+            pass
+        patterns = _Patterns(_read_patterns(Path(self.root, reld, GITIGNORE_BASENAME), fs=self.fs))
+        patterns = self.__dir_patterns[reld] = patterns if patterns.size else None
+        return patterns
+
+    def match(self, relpath, is_dir=False):
+        """\
+        Return true if the POSIX path ``relpath`` (relative to the root) is
+        ignored by the patterns, regardless of its parent directories.
+        """
+        ignored = self.__override.decide(relpath, is_dir)
+        if ignored is not None:
+            return ignored
+        if self.per_dir:
+            # from the innermost directory up to the root
+            end = len(relpath)
+            while end > 0:
+                end = relpath.rfind("/", 0, end)
+                patterns = self.__get_dir_patterns(relpath[:max(end, 0)])
+                if patterns is not None:
+                    ignored = patterns.decide(relpath[end + 1:], is_dir)
+                    if ignored is not None:
+                        return ignored
+        for prefix, patterns in self.__outer:
+            ignored = patterns.decide(prefix + relpath, is_dir)
+            if ignored is not None:
+                return ignored
+        return bool(self.__base.decide(relpath, is_dir))
+
+    def is_ignored(self, relpath, is_dir=False):
+        """\
+        Like ``match``, but the path is also ignored if any of its parent
+        directories is (as in git, a file cannot be re-included if its
+        directory is excluded). Results for directories are cached.
+        """
+        parent = relpath.rpartition("/")[0]
+        if parent and self.__is_dir_ignored(parent):
+            return True
+        return self.__is_dir_ignored(relpath) if is_dir else self.match(relpath)
+
+    def __is_dir_ignored(self, relpath):
+        try:
+            return self.__dirs[relpath]
+        except KeyError:
+            pass
+        parent = relpath.rpartition("/")[0]
+        ignored = bool(parent and self.__is_dir_ignored(parent)) or self.match(relpath, is_dir=True)
+        self.__dirs[relpath] = ignored
+        return ignored
+
+    def relative_to(self, top):
+        """\
+        Return a ``filter(relpath, is_dir)`` function for paths relative to
+        directory ``top``, suitable for the ``ignore`` argument of
+        ``output.walk_files``, or ``None`` if ``top`` is not under the root.
+        Parent directories are not checked, since walks skip the contents
+        of ignored directories.
+        """
+        rel = os.path.relpath(os.path.abspath(top), self.root)
+        if rel == os.curdir:
+            return self.match
+        if rel == os.pardir or rel.startswith(os.pardir + os.sep):
+            return None
+        rel = Path(rel).as_posix()
+        if self.is_ignored(rel, is_dir=True):
+            return _ignore_all
+        prefix = f"{rel}/"
+        match = self.match
+        return lambda relpath, is_dir: match(prefix + relpath, is_dir)
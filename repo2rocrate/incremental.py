@@ -0,0 +1,162 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""\
+Support for incremental regeneration of in-place crate metadata.
+
+After each build, a fingerprint of all the inputs the build depended on is
+saved next to the metadata file: the listing of each directory that was
+looked at (which captures files being added, removed or changing type) and
+the modification time and size (and, optionally, SHA-256 hash) of each file
+whose contents were used. For crates whose URLs are pinned to the current
+commit (references and detached files), the commit is saved as well. The
+next build can be skipped if none of these has changed.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from .digest import sha256_file
+from .fs import FSSnapshot
+from .gitindex import get_head_location
+from .utils import as_list
+from .version import VERSION
+
+METADATA_BASENAME = "ro-crate-metadata.json"
+STATE_BASENAME = ".repo2rocrate-state.json"
+OUTPUT_BASENAMES = frozenset([METADATA_BASENAME, STATE_BASENAME])
+
+
+def _relkey(root, path):
+    path = Path(path)
+    if path.is_absolute():
+        try:
+            path = path.relative_to(root)
+        except ValueError:
+            return path.as_posix()
+    return path.as_posix()
+
+
+def dir_fingerprint(fs, relpath):
+    try:
+        names = fs.listdir(relpath)
+    except NotADirectoryError:
+        return None
+    entries = sorted(f"{_}:{fs.kind(Path(relpath, _))}" for _ in names if _ not in OUTPUT_BASENAMES)
+    return hashlib.sha1("\n".join(entries).encode("utf-8")).hexdigest()
+
+
+def file_fingerprint(path, hash=False):
+    try:
+        st = Path(path).stat()
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size, sha256_file(path) if hash else None]
+
+
+def get_input_files(crate, fs):
+    """\
+    Return the local files whose contents a build depended on: those
+    explicitly tracked in the snapshot plus the sources of all File entities.
+    """
+    paths = {Path(_): None for _ in fs.tracked}
+    for e in crate.data_entities:
+        source = getattr(e, "source", None)
+        if isinstance(source, (str, Path)) and "File" in as_list(e.type) and fs.is_file(os.path.abspath(source)):
+            paths[Path(source)] = None
+    return list(paths)
+
+
+def get_head_commit(root):
+    location = get_head_location(root)
+    return location[0] if location else None
+
+
+def get_fingerprint(crate, fs, hash=False, head=False):
+    """\
+    Return the fingerprint of the inputs of ``crate``, built from snapshot
+    ``fs``. If ``hash`` is true, include the SHA-256 of input files; if
+    ``head`` is true, include the current commit.
+    """
+    root = fs.root
+    fingerprint = {
+        "dirs": {_relkey(root, _): dir_fingerprint(fs, _) for _ in fs.scanned_dirs},
+        "files": {
+            _relkey(root, _): file_fingerprint(root / _, hash=hash)
+            for _ in get_input_files(crate, fs)
+        },
+    }
+    if head:
+        fingerprint["head"] = get_head_commit(root)
+    return fingerprint
+
+
+def save_state(root, options, fingerprint):
+    state = {"version": VERSION, "options": options, "fingerprint": fingerprint}
+    with open(Path(root) / STATE_BASENAME, "wt") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+
+
+def load_state(root):
+    try:
+        with open(Path(root) / STATE_BASENAME) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_up_to_date(root, options):
+    """\
+    Return ``True`` if the in-place metadata for ``root`` was generated by
+    this version with the same options, and none of the inputs recorded in
+    the saved state (including the current commit, if recorded) has changed
+    since. Files that were touched without
+    changes (same digest) get their new modification time saved, so that
+    they are not hashed again on the next call.
+    """
+    root = Path(root)
+    if not (root / METADATA_BASENAME).is_file():
+        return False
+    state = load_state(root)
+    if not state or state.get("version") != VERSION or state.get("options") != options:
+        return False
+    fs = FSSnapshot(root)
+    fingerprint = state.get("fingerprint", {})
+    if "head" in fingerprint and get_head_commit(root) != fingerprint["head"]:
+        return False
+    touched = {}
+    for relpath, fp in fingerprint.get("dirs", {}).items():
+        if dir_fingerprint(fs, relpath) != fp:
+            return False
+    for relpath, fp in fingerprint.get("files", {}).items():
+        path = root / relpath
+        if fp is None:
+            if path.exists():
+                return False
+            continue
+        mtime_ns, size, digest = fp
+        current = file_fingerprint(path)
+        if current is None or current[1] != size:
+            return False
+        if current[0] != mtime_ns:
+            if not digest or sha256_file(path) != digest:
+                return False
+            touched[relpath] = current[0]
+    if touched:
+        for relpath, mtime_ns in touched.items():
+            fingerprint["files"][relpath][0] = mtime_ns
+        save_state(root, options, fingerprint)
+    return True
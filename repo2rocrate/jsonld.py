@@ -0,0 +1,148 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""\
+Streaming serialization of crate metadata.
+
+The ro-crate-py writer renders the whole JSON-LD document as a single string
+(then encodes it), which for graphs with hundreds of thousands of entities
+takes several times the memory of the entities themselves. Here the
+``@graph`` is rendered in batches of entities, with the same layout: the
+output is byte-identical to ``json.dumps(content, indent=4, sort_keys=True,
+ensure_ascii=False)``.
+
+If orjson is installed, batches are rendered with it (with 2-space
+indentation, which is then doubled), falling back to the json module for
+values it renders differently (floats) or does not support (e.g., integers
+over 64 bits).
+"""
+
+import json
+from itertools import islice
+
+from rocrate.model.metadata import Metadata
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+INDENT = 4
+BATCH_SIZE = 256
+CHUNK_SIZE = 1 << 20
+MAX_DEPTH = 64
+
+
+def _has_floats(value):
+    if isinstance(value, dict):
+        value = value.values()
+    elif not isinstance(value, (list, tuple)):
+        return isinstance(value, float)
+    for v in value:
+        if v.__class__ is not str and _has_floats(v):
+            return True
+    return False
+
+
+def encode_json(value, level=0):
+    """\
+    Return the UTF-8 encoding of ``value`` as rendered by the json module
+    with 4-space indentation, sorted keys and non-ASCII characters left as
+    they are, for insertion at nesting ``level`` (lines after the first are
+    indented by ``level`` more steps).
+    """
+    s = json.dumps(value, indent=INDENT, sort_keys=True, ensure_ascii=False)
+    if level:
+        s = s.replace("\n", "\n" + " " * (INDENT * level))
+    return s.encode("utf-8")
+
+
+# strings cannot contain raw newlines or NUL characters, so each newline
+# starts a line and NUL can mark lines already reindented
+_ORJSON_INDENTS = [b"\n" + b"  " * _ for _ in range(MAX_DEPTH)]
+_INDENTS = [b"\n\0" + b" " * (INDENT * _) for _ in range(MAX_DEPTH)]
+
+
+def encode_orjson(value, level=0):
+    """\
+    Like ``encode_json``, using orjson. Raise ``TypeError`` if the result
+    would differ.
+    """
+    if _has_floats(value):
+        raise TypeError("floats are rendered differently by orjson")
+    out = orjson.dumps(value, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS)
+    depth = 1
+    while depth < MAX_DEPTH and _ORJSON_INDENTS[depth] in out:
+        depth += 1
+    if depth == MAX_DEPTH:
+        raise TypeError("value nested too deeply")
+    for d in range(depth - 1, 0, -1):
+        out = out.replace(_ORJSON_INDENTS[d], _INDENTS[d])
+    out = out.replace(b"\n\0", b"\n")
+    if level:
+        out = out.replace(b"\n", b"\n" + b" " * (INDENT * level))
+    return out
+
+
+def encode(value, level=0):
+    if orjson is not None:
+        try:
+            return encode_orjson(value, level)
+        except TypeError:
+            pass
+    return encode_json(value, level)
+
+
+def get_context(metadata):
+    # as in Metadata.generate
+    context = [f"{metadata.profile}/context"]
+    context.extend(metadata.extra_contexts)
+    if metadata.extra_terms:
+        context.append(metadata.extra_terms)
+    return context[0] if len(context) == 1 else context
+
+
+def iter_document(context, entities, batch_size=BATCH_SIZE):
+    """\
+    Yield the UTF-8 encoded JSON-LD document for ``context`` and the
+    property dictionaries in ``entities`` as a sequence of chunks, rendering
+    ``batch_size`` entities at a time.
+    """
+    pad = b" " * INDENT
+    yield b"{\n" + pad + b'"@context": ' + encode(context, 1) + b",\n" + pad + b'"@graph": ['
+    entities = iter(entities)
+    sep = b"\n"
+    while batch := list(islice(entities, batch_size)):
+        # as a list at level 1: "[\n", entities at level 2 joined by ",\n", "\n" + pad + "]"
+        yield sep + encode(batch, 1)[2:-INDENT - 2]
+        sep = b",\n"
+    yield (b"]" if sep == b"\n" else b"\n" + pad + b"]") + b"\n}"
+
+
+class StreamingMetadata(Metadata):
+    """\
+    Metadata file entity whose stream renders the metadata incrementally,
+    in chunks of about ``chunk_size`` bytes.
+    """
+
+    def stream(self, chunk_size=CHUNK_SIZE):
+        entities = (_.properties() for _ in self.crate.get_entities())
+        buf, size = [], 0
+        for data in iter_document(get_context(self), entities):
+            buf.append(data)
+            size += len(data)
+            if size >= chunk_size:
+                yield self.id, b"".join(buf)
+                buf, size = [], 0
+        yield self.id, b"".join(buf)
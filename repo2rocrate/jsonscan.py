@@ -0,0 +1,182 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""\
+Incremental extraction of top-level keys from a JSON object.
+
+Galaxy workflows (.ga files) can be several megabytes, most of which is the
+description of the steps, while only a few small top-level fields are needed
+for the metadata. ``load_keys`` reads the file in chunks, decodes only the
+values of the requested keys and stops as soon as it has seen all of them.
+Other values are skipped: those that fit in a chunk are parsed (and
+discarded) by the standard library's C decoder, larger ones item by item, so
+memory usage depends on the chunk size rather than on the size of the file.
+"""
+
+import json
+import re
+
+CHUNK_SIZE = 1 << 16
+WS_RE = re.compile(r"[ \t\n\r]*")
+STRING_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+SCALAR_RE = re.compile(r"[^,:{}\[\]\s\"]+")
+DECODER = json.JSONDecoder()
+
+
+class _Scanner:
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.mark = None  # start of the text to keep when refilling
+        self.eof = False
+
+    def fill(self):
+        """\
+        Read another chunk, discarding consumed text not needed anymore.
+        Return false at end of file.
+        """
+        if self.eof:
+            return False
+        chunk = self.f.read(CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        start = self.pos if self.mark is None else self.mark
+        self.buf = self.buf[start:] + chunk
+        self.pos -= start
+        if self.mark is not None:
+            self.mark = 0
+        return True
+
+    def error(self, msg):
+        return json.JSONDecodeError(msg, self.buf, self.pos)
+
+    def peek(self):
+        """\
+        Skip whitespace and return the next character ("" at end of file).
+        """
+        while True:
+            self.pos = WS_RE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, c):
+        if self.peek() != c:
+            raise self.error(f"expecting {c!r}")
+        self.pos += 1
+
+    def match(self, regex):
+        # match regex at the current position, making sure it is not cut by the end of the buffer
+        while True:
+            m = regex.match(self.buf, self.pos)
+            if m and (m.end() < len(self.buf) or self.eof):
+                self.pos = m.end()
+                return m
+            if not self.fill():
+                if m:
+                    self.pos = m.end()
+                return m
+
+    def skip_value(self):
+        c = self.peek()
+        if c == '"':
+            if not self.match(STRING_RE):
+                raise self.error("unterminated string")
+        elif c and c in "{[":
+            self.skip_container()
+        elif not c or not self.match(SCALAR_RE):
+            raise self.error("expecting value")
+
+    def skip_container(self):
+        # containers that fit in a chunk are skipped by the (C) decoder
+        while not self.eof and len(self.buf) - self.pos < CHUNK_SIZE:
+            if not self.fill():
+                break
+        try:
+            self.pos = DECODER.raw_decode(self.buf, self.pos)[1]
+            return
+        except json.JSONDecodeError:
+            pass
+        # too large (or invalid): skip its items one by one
+        close = "}" if self.buf[self.pos] == "{" else "]"
+        self.pos += 1
+        if self.peek() == close:
+            self.pos += 1
+            return
+        while True:
+            if close == "}":
+                if self.peek() != '"' or not self.match(STRING_RE):
+                    raise self.error("expecting property name")
+                self.expect(":")
+            self.skip_value()
+            c = self.peek()
+            self.pos += 1
+            if c == close:
+                return
+            if c != ",":
+                self.pos -= 1
+                raise self.error(f"expecting ',' or {close!r}")
+
+    def read_value(self):
+        self.peek()
+        self.mark = self.pos
+        try:
+            self.skip_value()
+            return json.loads(self.buf[self.mark:self.pos])
+        finally:
+            self.mark = None
+
+
+def load_keys(f, keys):
+    """\
+    Read the JSON object in text file ``f`` up to the point where all
+    ``keys`` have been found at its top level. Return a dictionary with the
+    decoded values of the keys that were found (the first occurrence of
+    each). Return an empty dictionary if the document is not an object.
+    Raise ``json.JSONDecodeError`` if the document is not valid JSON up to
+    that point.
+    """
+    scanner = _Scanner(f)
+    missing = set(keys)
+    found = {}
+    c = scanner.peek()
+    if c != "{":
+        if c and c in "[\"-0123456789tfn":
+            return {}
+        raise scanner.error("expecting value")
+    scanner.pos += 1
+    if scanner.peek() == "}":
+        return found
+    while missing:
+        m = scanner.match(STRING_RE) if scanner.peek() == '"' else None
+        if not m:
+            raise scanner.error("expecting property name")
+        key = json.loads(m.group())
+        scanner.expect(":")
+        if key in missing:
+            missing.discard(key)
+            found[key] = scanner.read_value()
+        else:
+            scanner.skip_value()
+        c = scanner.peek()
+        if c == "}":
+            break
+        if c != ",":
+            raise scanner.error("expecting ',' delimiter")
+        scanner.pos += 1
+    return found
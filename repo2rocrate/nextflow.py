@@ -21,40 +21,61 @@ https://nf-co.re/contributing/guidelines
 https://nf-co.re/developers/adding_pipelines#nf-core-pipeline-structure
 """
 
-import re
+import os
+from pathlib import Path
+
+from .cache import memoize
 from .common import CrateBuilder
+from .fs import FSSnapshot
+from .nfconfig import load_config
+from .profile import is_enabled, phase
 
 
 WF_BASENAME = "main.nf"
 CONFIG_BASENAME = "nextflow.config"
 
 
-def find_workflow(root_dir):
+def find_workflow(root_dir, fs=None):
+    if fs is None:
+        fs = FSSnapshot(root_dir)
     wf_path = root_dir / WF_BASENAME
-    if not wf_path.is_file():
+    if not fs.is_file(WF_BASENAME):
         raise RuntimeError(f"{wf_path} not found")
     return wf_path
 
 
+def get_manifest(settings):
+    """\
+    Extract manifest entries from config settings (see ``nfconfig``).
+    """
+    prefix = "manifest."
+    return {
+        k[len(prefix):]: v for k, v in settings.items()
+        if k.startswith(prefix) and "." not in k[len(prefix):]
+    }
+
+
+def load_manifest(config_file_path):
+    """\
+    Read the config file at ``config_file_path`` and the files it includes.
+    Return the manifest entries and the list of the files that were read
+    (see ``nfconfig.load_config``). Results are cached by file contents.
+    """
+    config_file_path = Path(config_file_path)
+
+    def compute():
+        missing = []
+        settings, files = load_config(config_file_path, missing=missing)
+        relpaths = [os.path.relpath(_, config_file_path.parent) for _ in files]
+        return [get_manifest(settings), relpaths], files[1:] + missing
+
+    manifest, relpaths = memoize("nextflow.manifest", config_file_path, compute)
+    files = [config_file_path] + [config_file_path.parent / _ for _ in relpaths[1:]]
+    return manifest, files
+
+
 def get_metadata(config_file_path):
-    metadata = {}
-    manifest_start = re.compile(r"manifest\s*{")
-    kv_entry = re.compile(r"""([a-zA-Z0-9]+)\s*=\s*["']([^"']+)["']""")
-    in_manifest = False
-    with open(config_file_path) as f:
-        for line in f:
-            line = line.strip()
-            if manifest_start.match(line):
-                in_manifest = True
-                line = line.split("{", 1)[-1]
-            if in_manifest:
-                match = kv_entry.match(line)
-                if match:
-                    k, v = match.groups()
-                    metadata[k] = v
-            if line.endswith("}"):
-                in_manifest = False
-    return metadata
+    return load_manifest(config_file_path)[0]
 
 
 class NextflowCrateBuilder(CrateBuilder):
@@ -94,11 +115,16 @@ class NextflowCrateBuilder(CrateBuilder):
     def lang(self):
         return "nextflow"
 
-    def __init__(self, root, repo_url=None):
-        self.metadata = get_metadata(root / CONFIG_BASENAME)
-        if not repo_url:
-            repo_url = self.metadata.get("homePage")
-        super().__init__(root, repo_url=repo_url)
+    def __init__(self, root, **kwargs):
+        super().__init__(root, **kwargs)
+        with phase("add_workflow") as p:
+            self.metadata, config_files = load_manifest(self.root / CONFIG_BASENAME)
+            for path in config_files:
+                self.fs.track(path)
+                if is_enabled():
+                    p.add(files=1, bytes=self.fs.stat(path).st_size)
+        if not self.repo_url:
+            self.repo_url = self.metadata.get("homePage")
 
     def add_workflow(
         self,
@@ -115,6 +141,9 @@ class NextflowCrateBuilder(CrateBuilder):
             lang_version = self.metadata.get("nextflowVersion")
         if not wf_name:
             wf_name = self.metadata.get("name")
+        if not wf_name:
+            # Dockstore records for Nextflow point to the config file
+            wf_name = self.get_dockstore_name(wf_source.relative_to(self.root), CONFIG_BASENAME)
         workflow = super().add_workflow(
             wf_source,
             wf_name=wf_name,
@@ -140,10 +169,31 @@ def make_crate(
     license=None,
     ci_workflow=None,
     diagram=None,
+    fs=None,
+    materialize=None,
+    tracked_only=False,
+    honor_ignore=True,
+    max_file_size=None,
+    max_total_size=None,
+    reference_only=False,
+    store=None,
 ):
-    builder = NextflowCrateBuilder(root, repo_url=repo_url)
+    builder = NextflowCrateBuilder(
+        root,
+        repo_url=repo_url,
+        fs=fs,
+        materialize=materialize,
+        tracked_only=tracked_only,
+        honor_ignore=honor_ignore,
+        max_file_size=max_file_size,
+        max_total_size=max_total_size,
+        reference_only=reference_only,
+        store=store,
+    )
     if not workflow:
-        workflow = find_workflow(root)
+        with phase("detection") as p:
+            workflow = find_workflow(root, fs=builder.fs)
+            p.add(files=1)
     return builder.build(
         workflow,
         wf_name=wf_name,
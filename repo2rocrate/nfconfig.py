@@ -0,0 +1,265 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""\
+Static reader for Nextflow configuration files.
+
+Config files are Groovy code, so they cannot be fully evaluated without
+running Nextflow. This module extracts the settings whose values are
+literal strings, e.g.::
+
+    manifest {
+        name = 'nf-core/foo'
+    }
+    manifest.version = "1.0"
+    includeConfig 'conf/base.config'
+
+Scope blocks (including multi-line ones) and dotted assignments are mapped
+to dotted keys (``manifest.name``, ``manifest.version``). Files referenced by
+``includeConfig`` with a literal path are read in place, within the scope
+where the directive appears (so that settings in an included file are
+overridden by later ones in the including file, and vice versa). Control
+flow blocks (``if``, ``try``, ...) are transparent; code blocks (closures,
+functions) are skipped. Settings whose value is not a literal string (e.g.,
+an expression or an interpolated string) are ignored.
+
+Each file is tokenized with a single regular expression and parsed in one
+pass; parse results are cached per file and reused until the file's
+modification time or size changes.
+"""
+
+import os
+import re
+from pathlib import Path
+
+from .cache import memoize_in_memory
+
+# each match is a token, preceded by any whitespace and comments
+TOKEN_RE = re.compile(r"""
+    (?: [ \t\r\f]+ | \\\n | //[^\n]* | /\*.*?\*/ )*
+    (?:
+        (?P<nl>\n)
+      | (?P<str>'''.*?''' | \"\"\".*?\"\"\" | '(?:[^'\\\n]|\\.)*' | "(?:[^"\\\n]|\\.)*")
+      | (?P<name>[A-Za-z_$][\w$]*)
+      | (?P<num>\d[\w.]*)
+      | (?P<op>==|!=|<=|>=|=~|&&|\|\||->|\?:|[^\s\w])
+    )
+""", re.S | re.X)
+
+NL, STR, NAME, OP = "nl", "str", "name", "op"
+FLOW_KEYWORDS = frozenset(["if", "else", "try", "catch", "finally", "for", "while", "switch"])
+OPENING = {"{": "}", "(": ")", "[": "]"}
+ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", "0": "\0"}
+ESCAPE_RE = re.compile(r"\\(.)", re.S)
+
+
+def tokenize(text):
+    """\
+    Return a list of ``(kind, text)`` tokens, where ``kind`` is one of
+    ``NL``, ``STR``, ``NAME``, ``OP`` or ``"num"``. Whitespace and comments
+    are dropped, as are newlines within parentheses or brackets.
+    """
+    tokens = []
+    depth = 0
+    for m in TOKEN_RE.finditer(text):
+        kind = m.lastgroup
+        value = m.group(kind)
+        if kind == NL:
+            if depth or (tokens and tokens[-1][0] == NL):
+                continue
+        elif kind == OP:
+            if value in "([":
+                depth += 1
+            elif value in ")]":
+                depth = max(0, depth - 1)
+        tokens.append((kind, value))
+    return tokens
+
+
+def string_value(token):
+    """\
+    Return the value of string literal ``token``, or ``None`` if it is
+    interpolated (a double-quoted string containing ``$``).
+    """
+    text = token[1]
+    q = 3 if text[:3] in ("'''", '"""') else 1
+    body, double = text[q:-q], text[0] == '"'
+    if double and re.search(r"(?<!\\)(?:\\\\)*\$", body):
+        return None
+    return ESCAPE_RE.sub(lambda m: ESCAPES.get(m.group(1), m.group(1)), body)
+
+
+class _Parser:
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.n = len(tokens)
+
+    def skip_balanced(self, i):
+        # tokens[i] is an opening bracket; return the index after the matching one
+        stack = [OPENING[self.tokens[i][1]]]
+        i += 1
+        while i < self.n and stack:
+            kind, text = self.tokens[i]
+            if kind == OP:
+                if text in OPENING:
+                    stack.append(OPENING[text])
+                elif text == stack[-1]:
+                    stack.pop()
+            i += 1
+        return i
+
+    def at_end(self, i):
+        return i >= self.n or self.tokens[i][0] == NL or self.tokens[i][1] in (";", "}")
+
+    def skip_expression(self, i):
+        while not self.at_end(i):
+            if self.tokens[i][1] in OPENING and self.tokens[i][0] == OP:
+                i = self.skip_balanced(i)
+            else:
+                i += 1
+        return i
+
+    def parse(self):
+        """\
+        Return a list of statements: ``("set", key, value)`` and
+        ``("include", scope, path)``, where ``key`` and ``scope`` are tuples
+        of names relative to the file's top level.
+        """
+        statements = []
+        scopes = []  # one entry per open block: a tuple of names (empty for control flow)
+        prefix = ()
+        i = 0
+        while i < self.n:
+            kind, text = self.tokens[i]
+            if kind == NL or text == ";":
+                i += 1
+                continue
+            if text == "}" and kind == OP:
+                if scopes:
+                    scopes.pop()
+                    prefix = sum(scopes, ())
+                i += 1
+                continue
+            # scan the head of the statement, up to "=", "{" or its end
+            start = i
+            while not self.at_end(i):
+                kind, text = self.tokens[i]
+                if kind == OP and text in ("=", "{"):
+                    break
+                if kind == OP and text in "([":
+                    i = self.skip_balanced(i)
+                else:
+                    i += 1
+            head = self.tokens[start:i]
+            path = _dotted_path(head)
+            if self.at_end(i):
+                if head and head[0] == (NAME, "includeConfig"):
+                    args = [_ for _ in head[1:] if _[0] != OP]
+                    if len(args) == 1 and args[0][0] == STR:
+                        value = string_value(args[0])
+                        if value is not None:
+                            statements.append(("include", prefix, value))
+                continue
+            kind, text = self.tokens[i]
+            if text == "=":
+                i += 1
+                if path and i < self.n and self.tokens[i][0] == STR and self.at_end(i + 1):
+                    value = string_value(self.tokens[i])
+                    if value is not None:
+                        statements.append(("set", prefix + path, value))
+                    i += 1
+                else:
+                    i = self.skip_expression(i)
+            elif not head or head[0] == (NAME, "def"):
+                i = self.skip_balanced(i)  # closure or function body
+            else:
+                if head[0][1] in FLOW_KEYWORDS:
+                    scope = ()
+                elif path:
+                    scope = path
+                else:
+                    # e.g., process selectors such as "withName: FOO"
+                    scope = ("".join(_[1] for _ in head),)
+                scopes.append(scope)
+                prefix = prefix + scope
+                i += 1
+        return statements
+
+
+def _dotted_path(head):
+    # names in "a.b.c" (with the dots), or None if head is something else
+    if not head or len(head) % 2 == 0:
+        return None
+    names = head[::2]
+    if any(_[0] != NAME for _ in names) or any(_ != (OP, ".") for _ in head[1::2]):
+        return None
+    return tuple(_[1] for _ in names)
+
+
+def parse_config(text):
+    """\
+    Parse the contents of a config file (see ``_Parser.parse``).
+    """
+    return _Parser(tokenize(text)).parse()
+
+
+def _read_config(path):
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return parse_config(f.read())
+
+
+def parse_config_file(path):
+    """\
+    Parse the config file at ``path``, using the cached result if the file
+    has not changed since it was last parsed.
+    """
+    return memoize_in_memory("nfconfig.statements", path, _read_config)
+
+
+def load_config(path, missing=None):
+    """\
+    Read the config file at ``path`` along with the files it includes.
+    Return a ``(settings, files)`` tuple, where ``settings`` maps dotted keys
+    to literal string values and ``files`` lists the paths of the files that
+    were read (relative to the same directory as ``path``), starting with
+    ``path``. Missing or circular includes are skipped; the paths of the
+    missing ones are appended to ``missing``, if given.
+    """
+    settings, files = {}, {}
+    active = set()
+
+    def load(p, scope):
+        abs_p = os.path.abspath(p)
+        if abs_p in active:
+            return
+        try:
+            statements = parse_config_file(abs_p)
+        except OSError:
+            if not files:
+                raise
+            if missing is not None:
+                missing.append(p)
+            return
+        files.setdefault(abs_p, p)
+        active.add(abs_p)
+        for stmt, key, value in statements:
+            if stmt == "set":
+                settings[".".join(scope + key)] = value
+            else:
+                load(p.parent / value, scope + key)
+        active.discard(abs_p)
+
+    load(Path(path), ())
+    return settings, list(files.values())
@@ -0,0 +1,362 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""\
+Write a crate generated from a workflow repository to its destination.
+"""
+
+import errno
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
+from urllib.parse import unquote
+
+from .profile import is_enabled, phase
+from .store import ContentStore
+from .utils import COPY, HARDLINK, SYMLINK, REFLINK, MATERIALIZE_MODES
+from .zipwriter import ZipStreamWriter, DEFAULT_MEMORY
+
+
+def get_local_source(entity):
+    """\
+    Return the source of ``entity`` as a ``Path`` if it is a local file or
+    directory, ``None`` otherwise.
+    """
+    from rocrate.utils import is_url
+    source = getattr(entity, "source", None)
+    if not isinstance(source, (str, Path)) or is_url(str(source)):
+        return None
+    return Path(source)
+
+
+def walk_files(top, exclude=None, ignore=None):
+    """\
+    Yield ``(path, relpath)`` for each file under ``top``, where ``relpath``
+    is a POSIX path relative to ``top``. Symlinks to directories are not
+    followed. If ``exclude`` (an absolute path) is given, it is skipped
+    along with its contents. If ``ignore`` is given, it is called as
+    ``ignore(relpath, is_dir)`` on each entry: files for which it returns
+    true are skipped, and so are directories, without being scanned.
+    """
+    stack = [(Path(top), "")]
+    while stack:
+        d, reld = stack.pop()
+        with os.scandir(d) as it:
+            entries = sorted(it, key=lambda _: _.name)
+        subdirs = []
+        for e in entries:
+            if exclude and os.path.abspath(e.path) == exclude:
+                continue
+            relpath = f"{reld}{e.name}"
+            if e.is_dir(follow_symlinks=False):
+                if not (ignore and ignore(relpath, True)):
+                    subdirs.append((Path(e.path), f"{relpath}/"))
+            elif e.is_file() and not (ignore and ignore(relpath, False)):
+                yield Path(e.path), relpath
+        stack.extend(reversed(subdirs))
+
+
+def walk_dataset(crate, top, exclude=None):
+    """\
+    Like ``walk_files``, but list only the files tracked by git if
+    ``crate`` has a ``tracked`` attribute (a ``gitindex.TrackedFiles``) and
+    skip those excluded by its ``ignore_rules`` attribute (an
+    ``ignore.IgnoreRules``), if any.
+    """
+    tracked = getattr(crate, "tracked", None)
+    rules = getattr(crate, "ignore_rules", None)
+    ignore = rules.relative_to(top) if rules is not None else None
+    walk = tracked.walk if tracked is not None else walk_files
+    return walk(top, exclude=exclude, ignore=ignore)
+
+
+class CrateLayout:
+    """\
+    The files and directories that make up a crate's payload.
+
+    ``dirs`` lists the destination path of each ``Dataset`` with a local
+    source; ``files`` lists ``(source, dest)`` pairs for all local files,
+    whether they are ``File`` entities or (unlisted) ``Dataset`` contents
+    (as listed by ``walk_dataset``), with the first occurrence of each
+    destination winning; ``others`` lists the remaining data entities, which
+    are written by their own methods. Destinations listed in the crate's
+    ``detached`` attribute, if any, are left out.
+    """
+
+    def __init__(self, crate, exclude=None):
+        """\
+        ``exclude`` is the path of the output (file or directory), which
+        must not be included in the payload if it lies under a source.
+        """
+        from rocrate.model.dataset import Dataset
+        from rocrate.model.file import File
+        from rocrate.utils import is_url
+        self.dirs = []
+        self.files = []
+        self.others = []
+        detached = getattr(crate, "detached", set())
+        seen = set(detached)
+        if exclude is not None:
+            exclude = os.path.abspath(exclude)
+        for e in crate.data_entities:
+            source = get_local_source(e)
+            if unquote(e.id).rstrip("/") in detached:
+                continue
+            if source is None or is_url(e.id):
+                self.others.append(e)
+            elif isinstance(e, Dataset):
+                dest = unquote(e.id).rstrip("/")
+                self.dirs.append(dest)
+                for path, relpath in walk_dataset(crate, source, exclude=exclude):
+                    d = f"{dest}/{relpath}"
+                    if d not in seen:
+                        seen.add(d)
+                        self.files.append((path, d))
+            elif isinstance(e, File):
+                dest = unquote(e.id)
+                if dest not in seen:
+                    seen.add(dest)
+                    self.files.append((source, dest))
+            else:
+                self.others.append(e)
+
+
+class WriteStats:
+    """\
+    Summary of the data moved by a write operation.
+    """
+
+    def __init__(self, files=0, bytes=0, seconds=0.0, linked=0):
+        self.files = files
+        self.bytes = bytes
+        self.seconds = seconds
+        self.linked = linked
+
+    @property
+    def bytes_per_second(self):
+        return self.bytes / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self):
+        mib = 1 << 20
+        linked = f" ({self.linked} linked)" if self.linked else ""
+        return (
+            f"{self.files} files{linked}, {self.bytes / mib:.1f} MiB in {self.seconds:.2f} s"
+            f" ({self.bytes_per_second / mib:.1f} MiB/s)"
+        )
+
+
+FICLONE = 0x40049409  # from linux/fs.h
+
+
+FALLBACK_ERRNOS = frozenset([
+    errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF,
+    errno.ETXTBSY, errno.EPERM, errno.EIO,
+])
+
+
+def _copy_range(infd, outfd, copy_fn, count=1 << 30):
+    copied = 0
+    while True:
+        n = copy_fn(infd, outfd, count)
+        if n == 0:
+            return copied
+        copied += n
+
+
+def copy_file(src, dst, chunk_size=1 << 20):
+    """\
+    Copy the contents and permission bits of ``src`` to ``dst`` and return
+    the number of bytes copied. The data is moved within the kernel with
+    ``copy_file_range`` or ``sendfile`` where possible, falling back to a
+    buffered copy.
+    """
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        infd, outfd = fsrc.fileno(), fdst.fileno()
+        st = os.fstat(infd)
+        strategies = []
+        if hasattr(os, "copy_file_range"):
+            strategies.append(lambda i, o, n: os.copy_file_range(i, o, n))
+        if hasattr(os, "sendfile"):
+            strategies.append(lambda i, o, n: os.sendfile(o, i, None, n))
+        for fn in strategies:
+            try:
+                copied = _copy_range(infd, outfd, fn)
+            except OSError as e:
+                if e.errno not in FALLBACK_ERRNOS or os.lseek(outfd, 0, os.SEEK_CUR) > 0:
+                    raise
+            else:
+                break
+        else:
+            shutil.copyfileobj(fsrc, fdst, chunk_size)
+            copied = fdst.tell()
+    os.chmod(dst, st.st_mode & 0o7777)
+    return copied
+
+
+def reflink_file(src, dst):
+    """\
+    Make ``dst`` a copy-on-write clone of ``src``. Raise ``OSError`` if
+    not supported (e.g., on platforms without ``fcntl``).
+    """
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError(errno.ENOTSUP, "reflinks are not supported on this platform")
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError:
+            fdst.close()
+            os.unlink(dst)
+            raise
+        os.chmod(dst, os.fstat(fsrc.fileno()).st_mode & 0o7777)
+
+
+def materialize_file(src, dst, mode=COPY):
+    """\
+    Materialize ``src`` at ``dst`` according to ``mode`` (one of
+    ``MATERIALIZE_MODES``), falling back to a full copy if the requested kind
+    of link cannot be created (e.g., across file systems). Return a
+    ``(bytes_copied, linked)`` tuple.
+    """
+    if os.path.lexists(dst):
+        if os.path.abspath(src) == os.path.abspath(dst):
+            return 0, False
+        os.unlink(dst)  # never write through an existing (sym)link
+    if mode != COPY:
+        try:
+            if mode == HARDLINK:
+                os.link(src, dst)
+            elif mode == SYMLINK:
+                os.symlink(os.path.abspath(src), dst)
+            elif mode == REFLINK:
+                reflink_file(src, dst)
+            else:
+                raise ValueError(f"unknown materialization mode: {mode!r}")
+        except OSError:
+            pass
+        else:
+            return 0, True
+    return copy_file(src, dst), False
+
+
+def write_dir(crate, out_dir, jobs=None, materialize=COPY, store=None):
+    """\
+    Write ``crate`` to directory ``out_dir``, copying files in parallel on
+    ``jobs`` threads (default: a few per CPU, since copying is I/O bound).
+    With a ``materialize`` mode other than ``COPY``, files are linked to
+    their sources instead of copied whenever possible. If ``store`` (a
+    ``store.ContentStore`` or the path of its directory) is given, files
+    are hard links to objects in the store instead, and ``materialize`` is
+    ignored. Return a ``WriteStats`` instance describing the operation.
+    """
+    if materialize not in MATERIALIZE_MODES:
+        raise ValueError(f"unknown materialization mode: {materialize!r}")
+    if store is not None and not isinstance(store, ContentStore):
+        store = ContentStore(store)
+    with phase("write") as p:
+        start = time.perf_counter()
+        out_dir = Path(out_dir)
+        layout = CrateLayout(crate, exclude=out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        parents = {out_dir / _ for _ in layout.dirs}
+        parents.update((out_dir / dest).parent for _, dest in layout.files)
+        for d in sorted(parents):
+            d.mkdir(parents=True, exist_ok=True)
+        jobs = jobs or min(32, 4 * (os.cpu_count() or 1))
+        stats = WriteStats()
+        if store is not None:
+            from .cache import DigestCache
+            from .digest import compute_digests
+            cache = DigestCache()
+            try:
+                digests = compute_digests([src for src, _ in layout.files], cache=cache)
+            finally:
+                cache.close()
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            if store is not None:
+                futures = [
+                    executor.submit(store.link, src, out_dir / dest, digests[src][0])
+                    for src, dest in layout.files
+                ]
+            else:
+                futures = [
+                    executor.submit(materialize_file, src, out_dir / dest, materialize)
+                    for src, dest in layout.files
+                ]
+            for f in futures:
+                n, linked = f.result()
+                stats.bytes += n
+                stats.linked += linked
+                stats.files += 1
+        for e in layout.others + crate.default_entities:
+            e.write(out_dir)
+        stats.seconds = time.perf_counter() - start
+        p.add(files=stats.files, bytes=stats.bytes, linked=stats.linked)
+    return stats
+
+
+def write_zip(crate, out_path, jobs=None, memory=DEFAULT_MEMORY):
+    """\
+    Write ``crate`` as a zip file, streaming each file from its source
+    straight into the archive. Compression runs in parallel on ``jobs``
+    threads, using at most ``memory`` bytes for buffers.
+    """
+    with phase("write") as p:
+        out_path = Path(out_path)
+        layout = CrateLayout(crate, exclude=out_path)
+        with open(out_path, "wb") as f, ZipStreamWriter(f) as zf:
+            for d in layout.dirs:
+                zf.add_dir(d)
+            zf.add_files(layout.files, jobs=jobs, memory=memory)
+            for e in layout.others + crate.default_entities:
+                for path, group in groupby(e.stream(), key=itemgetter(0)):
+                    zf.add_stream(path, (chunk for _, chunk in group))
+        members = [_ for _ in zf.members if not _.is_dir]
+        p.add(files=len(members), bytes=sum(_.file_size for _ in members), compressed=zf.offset)
+    return out_path
+
+
+def is_in_place(root, output):
+    try:
+        return Path(output).samefile(root)
+    except OSError:
+        return False
+
+
+def write_crate(crate, root, output=None):
+    """\
+    Write ``crate`` to ``output``, which can be a directory or a zip file
+    (detected by the ``.zip`` suffix). If ``output`` is not given or points to
+    the repository root, only the metadata file is written.
+
+    For directory outputs, return the ``WriteStats`` of the copy (if
+    available); otherwise, return ``None``.
+    """
+    if not output:
+        output = root
+    output = Path(output)
+    if is_in_place(root, output):
+        with phase("write") as p:
+            crate.metadata.write(output)
+            if is_enabled():
+                p.add(files=1, bytes=(output / crate.metadata.id).stat().st_size)
+    elif output.suffix == ".zip":
+        crate.write_zip(output)
+    else:
+        return crate.write(output)
@@ -0,0 +1,130 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""\
+Timing and counters for the phases of crate generation.
+
+Crate generation reports its progress as a sequence of phases: ``detection``
+(finding the workflow file), ``add_workflow``, ``add_test_suite``,
+``add_data_entities``, ``add_digests`` and ``write``. When a phase ends, a
+``PhaseRecord`` with its duration and counters (such as ``files`` and
+``bytes``) is passed to each subscribed callback::
+
+    from repo2rocrate.profile import subscribe, unsubscribe
+
+    def log(record):
+        print(record.name, record.seconds, record.counters)
+
+    subscribe(log)
+    ...
+    unsubscribe(log)
+
+A phase can occur more than once during a run (e.g., ``detection`` when
+autodetecting both the language and the workflow). ``Profiler`` is a
+subscriber that aggregates records by phase name.
+"""
+
+import time
+from contextlib import contextmanager
+
+_subscribers = []
+
+
+class PhaseRecord:
+
+    def __init__(self, name, seconds=0.0, counters=None):
+        self.name = name
+        self.seconds = seconds
+        self.counters = dict(counters or {})
+
+    def add(self, **counters):
+        for k, v in counters.items():
+            self.counters[k] = self.counters.get(k, 0) + v
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.name!r}, {self.seconds!r}, {self.counters!r})"
+
+
+def subscribe(callback):
+    """\
+    Call ``callback`` with a ``PhaseRecord`` at the end of each phase.
+    """
+    _subscribers.append(callback)
+    return callback
+
+
+def unsubscribe(callback):
+    _subscribers.remove(callback)
+
+
+def is_enabled():
+    """\
+    Return true if there are subscribers. Counters that are expensive to
+    compute (e.g., requiring extra system calls) should be skipped if not.
+    """
+    return bool(_subscribers)
+
+
+@contextmanager
+def phase(name):
+    """\
+    Time the enclosed block as phase ``name``, yielding the ``PhaseRecord``
+    so that the block can update its counters.
+    """
+    record = PhaseRecord(name)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.seconds = time.perf_counter() - start
+        for callback in list(_subscribers):
+            callback(record)
+
+
+class Profiler:
+    """\
+    Collect phase records, summing durations and counters of phases with the
+    same name. Use as a context manager to subscribe for its duration.
+    """
+
+    def __init__(self):
+        self.phases = {}
+
+    def __call__(self, record):
+        try:
+            total = self.phases[record.name]
+        except KeyError:
+            total = self.phases[record.name] = PhaseRecord(record.name)
+        total.seconds += record.seconds
+        total.add(**record.counters)
+
+    def __enter__(self):
+        return subscribe(self)
+
+    def __exit__(self, *exc):
+        unsubscribe(self)
+
+    def report(self):
+        """\
+        Return a table with one line per phase, plus the total time.
+        """
+        lines = [f"{'phase':<20}{'seconds':>10}{'files':>10}{'bytes':>14}  other"]
+        for r in self.phases.values():
+            other = " ".join(f"{k}={v}" for k, v in r.counters.items() if k not in ("files", "bytes"))
+            lines.append(
+                f"{r.name:<20}{r.seconds:>10.3f}{r.counters.get('files', 0):>10}"
+                f"{r.counters.get('bytes', 0):>14}  {other}".rstrip()
+            )
+        lines.append(f"{'total':<20}{sum(_.seconds for _ in self.phases.values()):>10.3f}")
+        return "\n".join(lines)
@@ -0,0 +1,376 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""\
+Long-running crate generation service.
+
+Requests are served over HTTP, on a TCP port or a Unix socket, and crates
+are built by a pool of worker processes that are started (and import all
+the language modules) when the service starts, then kept for its whole
+lifetime, so that requests don't pay for interpreter startup and imports
+and benefit from the in-memory caches of previous builds. At most ``jobs``
+crates are built at a time; up to ``max_queue`` further requests wait for
+a worker, and requests beyond that are rejected with a 503 status. If a
+worker process dies (e.g., it runs out of memory), the pending requests get
+a 503 status too, and the pool is replaced by a new one.
+
+Endpoints:
+
+* ``POST /crate``: the body is a JSON object with the repository ``root``
+  (a local path), optionally ``lang`` and ``workflow`` (a path relative to
+  the root, or an absolute path under it), ``format``
+  (``"metadata"``, the default, or ``"zip"``) and any of the ``OPTIONS``
+  of ``make_crate``. The response is the metadata JSON or the crate as a
+  zip file. Errors are reported as ``{"error": message}``;
+* ``GET /status``: the number of workers and of running and queued
+  requests.
+"""
+
+import json
+import os
+import shutil
+import socketserver
+import tempfile
+import threading
+import traceback
+import uuid
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from . import find_workflow, LANG_MODULES
+from .utils import parse_size
+
+DEFAULT_MAX_QUEUE = 64
+MAX_BODY_SIZE = 1 << 20
+FORMATS = ("metadata", "zip")
+OPTIONS = frozenset([
+    "repo_url",
+    "wf_name",
+    "wf_version",
+    "lang_version",
+    "license",
+    "ci_workflow",
+    "diagram",
+    "tracked_only",
+    "honor_ignore",
+    "max_file_size",
+    "max_total_size",
+    "reference_only",
+])
+METADATA_TYPE = "application/ld+json"
+ZIP_TYPE = "application/zip"
+COPY_BUFSIZE = 1 << 20
+
+
+class RequestError(Exception):
+    """\
+    Invalid request.
+    """
+
+
+class BuildError(Exception):
+    """\
+    Crate generation failed (message from the worker process).
+    """
+
+
+class QueueFull(Exception):
+    pass
+
+
+class WorkerDied(Exception):
+    """\
+    A worker process terminated abruptly (e.g., killed for running out of
+    memory) while the request was running or waiting.
+    """
+
+
+def _init_worker():
+    # import everything once per worker, rather than on its first request
+    import rocrate.rocrate  # noqa: F401
+    import yaml  # noqa: F401
+    from . import galaxy, nextflow, snakemake  # noqa: F401
+
+
+def _ping():
+    return os.getpid()
+
+
+def generate(root, lang=None, workflow=None, format="metadata", zip_path=None, **kwargs):
+    """\
+    Build the crate for repository ``root``. Return the metadata as bytes if
+    ``format`` is ``"metadata"``; otherwise, write the crate as a zip file
+    to ``zip_path`` and return its size. Runs in the worker processes, where
+    errors are converted to ``BuildError`` (tracebacks don't cross process
+    boundaries well).
+    """
+    try:
+        root = Path(root)
+        if not lang:
+            lang, auto_workflow = find_workflow(root)
+            workflow = workflow or auto_workflow
+        crate = LANG_MODULES[lang].make_crate(root, workflow=workflow, **kwargs)
+        if format == "zip":
+            crate.write_zip(zip_path)
+            return os.stat(zip_path).st_size
+        return b"".join(chunk for _, chunk in crate.metadata.stream())
+    except Exception as e:
+        raise BuildError("".join(traceback.format_exception_only(type(e), e)).strip())
+
+
+def parse_request(body):
+    """\
+    Validate the JSON ``body`` of a crate request. Return the keyword
+    arguments for ``generate`` (except ``zip_path``). Raise ``RequestError``
+    if the request is invalid.
+    """
+    try:
+        request = json.loads(body)
+    except ValueError as e:
+        raise RequestError(f"invalid JSON: {e}")
+    if not isinstance(request, dict):
+        raise RequestError("request must be a JSON object")
+    request = dict(request)
+    root = request.pop("root", None)
+    if not isinstance(root, str) or not os.path.isabs(root):
+        raise RequestError("root must be an absolute path")
+    if not os.path.isdir(root):
+        raise RequestError(f"{root} is not a directory")
+    lang = request.pop("lang", None)
+    if lang is not None and lang not in LANG_MODULES:
+        raise RequestError(f"unknown language: {lang}")
+    format = request.pop("format", "metadata")
+    if format not in FORMATS:
+        raise RequestError(f"format must be one of {', '.join(FORMATS)}")
+    workflow = request.pop("workflow", None)
+    if workflow is not None:
+        if not isinstance(workflow, str):
+            raise RequestError("workflow must be a path")
+        workflow = Path(os.path.normpath(os.path.join(root, workflow)))
+        if Path(root) not in workflow.parents:
+            raise RequestError(f"workflow must be under {root}")
+    unknown = set(request) - OPTIONS
+    if unknown:
+        raise RequestError(f"unknown options: {', '.join(sorted(unknown))}")
+    for k in "max_file_size", "max_total_size":
+        if isinstance(request.get(k), str):
+            try:
+                request[k] = parse_size(request[k])
+            except ValueError as e:
+                raise RequestError(str(e))
+    return dict(request, root=root, lang=lang, workflow=workflow, format=format)
+
+
+class CrateService:
+    """\
+    A pool of ``jobs`` worker processes (default: number of CPUs) that
+    build crates, with room for ``max_queue`` waiting requests.
+    """
+
+    def __init__(self, jobs=None, max_queue=DEFAULT_MAX_QUEUE):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.executor = None
+        self.tmp_dir = None
+        self.__slots = threading.BoundedSemaphore(self.jobs + max_queue)
+        self.__lock = threading.Lock()
+        self.__pending = 0
+
+    def start(self):
+        """\
+        Start the worker processes and wait until they are ready.
+        """
+        self.tmp_dir = Path(tempfile.mkdtemp(prefix="repo2rocrate-"))
+        self.executor = self.__new_executor()
+        for f in self.__warm_up(self.executor):
+            f.result()
+        return self
+
+    def __new_executor(self):
+        from concurrent.futures import ProcessPoolExecutor  # pulls in multiprocessing
+        return ProcessPoolExecutor(max_workers=self.jobs, initializer=_init_worker)
+
+    def __warm_up(self, executor):
+        # tasks submitted before any worker is ready each get a new process
+        return [executor.submit(_ping) for _ in range(self.jobs)]
+
+    def __replace_executor(self, broken):
+        """\
+        Replace ``broken``, a pool that lost a worker, with a new one (unless
+        another thread already did). The new workers are started in the
+        background.
+        """
+        with self.__lock:
+            if self.executor is not broken:
+                return
+            self.executor = self.__new_executor()
+            self.__warm_up(self.executor)
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def __submit(self, **kwargs):
+        from concurrent.futures.process import BrokenProcessPool
+        executor = self.executor
+        try:
+            return executor.submit(generate, **kwargs).result()
+        except BrokenProcessPool:
+            self.__replace_executor(executor)
+            raise WorkerDied("a worker process terminated abruptly")
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+        if self.tmp_dir is not None:
+            shutil.rmtree(self.tmp_dir, ignore_errors=True)
+            self.tmp_dir = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def status(self):
+        with self.__lock:
+            pending = self.__pending
+        return {
+            "workers": self.jobs,
+            "running": min(pending, self.jobs),
+            "queued": max(pending - self.jobs, 0),
+            "max_queue": self.max_queue,
+        }
+
+    def run(self, **kwargs):
+        """\
+        Run ``generate`` in a worker process with the given arguments,
+        waiting for its result. For zip requests, the crate is written to a
+        new file in the service's temporary directory, and the result is a
+        ``(path, size)`` tuple: the caller must remove the file. Raise
+        ``QueueFull`` if all workers are busy and the queue is full, and
+        ``WorkerDied`` if a worker process died before the crate was built
+        (the pool is then replaced, so later requests can succeed).
+        """
+        if not self.__slots.acquire(blocking=False):
+            raise QueueFull()
+        with self.__lock:
+            self.__pending += 1
+        try:
+            if kwargs.get("format") != "zip":
+                return self.__submit(**kwargs)
+            zip_path = self.tmp_dir / f"{uuid.uuid4().hex}.zip"
+            try:
+                return zip_path, self.__submit(zip_path=zip_path, **kwargs)
+            except BaseException:
+                zip_path.unlink(missing_ok=True)
+                raise
+        finally:
+            with self.__lock:
+                self.__pending -= 1
+            self.__slots.release()
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+
+    server_version = "repo2rocrate"
+    protocol_version = "HTTP/1.1"
+
+    def address_string(self):
+        # client_address is not a (host, port) tuple for Unix sockets
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def send_json(self, status, obj):
+        self.send_data(status, json.dumps(obj).encode("utf-8"), "application/json")
+
+    def send_data(self, status, data, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_file(self, path, size):
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", ZIP_TYPE)
+        self.send_header("Content-Length", str(size))
+        self.end_headers()
+        with open(path, "rb") as f:
+            shutil.copyfileobj(f, self.wfile, COPY_BUFSIZE)
+
+    def do_GET(self):
+        if self.path != "/status":
+            return self.send_json(HTTPStatus.NOT_FOUND, {"error": "not found"})
+        self.send_json(HTTPStatus.OK, self.server.service.status)
+
+    def do_POST(self):
+        if self.path != "/crate":
+            return self.send_json(HTTPStatus.NOT_FOUND, {"error": "not found"})
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            return self.send_json(HTTPStatus.LENGTH_REQUIRED, {"error": "missing Content-Length"})
+        if length > MAX_BODY_SIZE:
+            self.close_connection = True
+            return self.send_json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "request too large"})
+        try:
+            kwargs = parse_request(self.rfile.read(length))
+        except RequestError as e:
+            return self.send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+        try:
+            result = self.server.service.run(**kwargs)
+        except QueueFull:
+            return self.send_json(HTTPStatus.SERVICE_UNAVAILABLE, {"error": "too many requests"})
+        except WorkerDied as e:
+            return self.send_json(HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(e)})
+        except BuildError as e:
+            return self.send_json(HTTPStatus.UNPROCESSABLE_ENTITY, {"error": str(e)})
+        if kwargs["format"] == "metadata":
+            return self.send_data(HTTPStatus.OK, result, METADATA_TYPE)
+        zip_path, size = result
+        try:
+            self.send_file(zip_path, size)
+        finally:
+            zip_path.unlink(missing_ok=True)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)  # stale socket from a previous run
+        super().server_bind()
+        self.server_name, self.server_port = "localhost", 0
+
+
+def make_server(service, host="127.0.0.1", port=0, socket_path=None, quiet=False):
+    """\
+    Return an HTTP server (not yet serving) that handles requests with
+    ``service`` (a started ``CrateService``), listening on ``socket_path``
+    if given, otherwise on ``host`` and ``port``.
+    """
+    if socket_path:
+        server = UnixHTTPServer(str(socket_path), RequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), RequestHandler)
+        server.daemon_threads = True
+    server.service = service
+    server.quiet = quiet
+    return server
@@ -0,0 +1,101 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""\
+Size limits for the files in a crate's payload.
+
+Files larger than the maximum file size, and those that would bring the
+payload over the maximum total size, are described in the metadata (size
+and SHA-256 digest) but not written. If the repository is on GitHub, they
+are identified by the URL of their contents; otherwise, they keep their
+relative path as identifier. Everything is decided from a single ``stat``
+of each payload file, before any data is written.
+"""
+
+import os
+import warnings
+from pathlib import PurePosixPath
+from urllib.parse import unquote
+
+from .cache import DigestCache
+from .digest import compute_digests
+from .output import CrateLayout
+from .utils import get_raw_url, parse_github_url
+
+
+def apply_size_policy(
+    crate, max_file_size=None, max_total_size=None, repo_url=None, location=None, keep=(), jobs=None, cache=True
+):
+    """\
+    Detach from the payload of ``crate`` (a ``RepoCrate``) the files over
+    the limits. Files are considered in payload order, each one counting
+    towards the total only if it is kept. ``location`` is a ``(commit,
+    prefix)`` tuple as returned by ``gitindex.get_head_location``: if given,
+    URLs point to the contents at ``commit``, under ``prefix``; otherwise,
+    to the contents at ``HEAD`` under the repository root. The files whose
+    destinations are in ``keep`` are never detached, but count towards the
+    total. ``jobs`` and ``cache`` are as in ``digest.add_digests``. Without
+    a GitHub ``repo_url``, detached files keep local identifiers that are
+    not in the payload, and a warning is issued. Return the list of the
+    ``(dest, size)`` tuples of the detached files.
+    """
+    from rocrate.model.file import File
+    if max_file_size is None and max_total_size is None:
+        return []
+    keep = set(keep)
+    stats, detached, total = {}, [], 0
+    for source, dest in CrateLayout(crate).files:
+        st = os.stat(source)
+        over_file_limit = max_file_size is not None and st.st_size > max_file_size
+        over_total_limit = max_total_size is not None and total + st.st_size > max_total_size
+        if (over_file_limit or over_total_limit) and dest not in keep:
+            stats[source] = st
+            detached.append((source, dest))
+        else:
+            total += st.st_size
+    if not detached:
+        return []
+    own_cache = cache is True
+    if own_cache:
+        cache = DigestCache()
+    try:
+        digests = compute_digests(stats, jobs=jobs, cache=cache or None, stats=stats)
+    finally:
+        if own_cache:
+            cache.close()
+    entities = {unquote(e.id): e for e in crate.data_entities if isinstance(e, File)}
+    if not (repo_url and parse_github_url(repo_url)):
+        warnings.warn(
+            f"{len(detached)} files over the size limits are left out of the payload, keeping local"
+            " identifiers (with a GitHub repository URL, they would be identified by their URLs)"
+        )
+    for source, dest in detached:
+        digest, size = digests[source]
+        if not repo_url:
+            url = None
+        elif location:
+            url = get_raw_url(repo_url, PurePosixPath(location[1], dest), ref=location[0])
+        else:
+            url = get_raw_url(repo_url, dest)
+        e = entities.get(dest)
+        if e is None:
+            e = crate.add_file(url, None if url else dest, properties={"@type": "File"})
+        else:
+            e.source = None
+            if url:
+                e = crate.relocate(e, url)
+        e["contentSize"] = str(size)
+        e["sha256"] = digest
+        crate.detached.add(dest)
+    return [(dest, digests[source][1]) for source, dest in detached]
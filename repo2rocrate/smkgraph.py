@@ -0,0 +1,193 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""\
+Static extraction of the graph of Snakefiles that make up a workflow.
+
+Starting from the main Snakefile, the following are followed:
+
+  * ``include: "rules/foo.smk"``
+  * ``module foo:`` blocks with a ``snakefile: "path"`` entry, if the module
+    is referenced by a ``use rule ... from foo`` statement (as Snakemake only
+    loads modules that are used).
+
+Only literal paths are followed (not expressions or remote sources such as
+``github(...)``); relative paths are resolved against the directory of the
+file where they appear. Directives are recognized at the start of logical
+lines, so those within strings or comments are ignored.
+
+Each file is parsed once per run, even if included from several places, and
+parse results are cached per file until its modification time or size
+changes.
+"""
+
+import ast
+import os
+import re
+from collections import namedtuple
+from pathlib import Path
+
+from .cache import memoize_in_memory
+
+TOKEN_RE = re.compile(r"""
+    (?: [ \t\r\f]+ | \\\n | \#[^\n]* )*
+    (?:
+        (?P<nl>\n[ \t]*)
+      | (?P<str>(?i:[rbfu]{0,2})(?:'''.*?''' | \"\"\".*?\"\"\" | '(?:[^'\\\n]|\\.)*' | "(?:[^"\\\n]|\\.)*"))
+      | (?P<name>[A-Za-z_]\w*)
+      | (?P<op>[^\s\w])
+    )
+""", re.S | re.X)
+
+SnakefileInfo = namedtuple("SnakefileInfo", "includes modules used_modules min_version")
+SnakefileInfo.__doc__ = """\
+Directives found in a Snakefile: ``includes`` (list of paths),
+``modules`` (dictionary from module names to snakefile paths),
+``used_modules`` (set of module names referenced by ``use rule``) and
+``min_version`` (the argument of ``min_version``, or ``None``).
+"""
+
+
+def logical_lines(text):
+    """\
+    Yield ``(indent, tokens)`` for each logical line in ``text``, where
+    ``tokens`` is a list of ``(kind, text)`` tuples.
+    """
+    indent, tokens, depth = 0, [], 0
+    for m in TOKEN_RE.finditer("\n" + text):
+        kind = m.lastgroup
+        value = m.group(kind)
+        if kind == "nl":
+            if depth:
+                continue
+            if tokens:
+                yield indent, tokens
+            indent, tokens = len(value.expandtabs()) - 1, []
+            continue
+        if kind == "op":
+            if value in "([{":
+                depth += 1
+            elif value in ")]}":
+                depth = max(0, depth - 1)
+        tokens.append((kind, value))
+    if tokens:
+        yield indent, tokens
+
+
+def string_value(token):
+    """\
+    Return the value of string literal ``token``, or ``None`` if it is not a
+    plain string (e.g., an f-string or a bytes literal).
+    """
+    kind, text = token
+    if kind != "str":
+        return None
+    try:
+        value = ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return None
+    return value if isinstance(value, str) else None
+
+
+def parse_snakefile(text):
+    """\
+    Extract directives from the contents of a Snakefile. Return a
+    ``SnakefileInfo``.
+    """
+    includes, modules, used_modules, min_version = [], {}, set(), None
+    module, module_indent = None, 0
+    pending = None  # directive whose value is on the following lines
+    for indent, tokens in logical_lines(text):
+        if pending:
+            directive, directive_indent = pending
+            pending = None
+            if indent > directive_indent and len(tokens) == 1:
+                path = string_value(tokens[0])
+                if path and directive == "include":
+                    includes.append(path)
+                elif path:
+                    modules[module] = path
+                continue
+        if module and indent <= module_indent:
+            module = None
+        first = tokens[0][1] if tokens[0][0] == "name" else None
+        n = len(tokens)
+        if first in ("include", "snakefile") and n == 2 and tokens[1][1] == ":":
+            if first == "include" or module:
+                pending = first, indent
+        elif first == "include" and n == 3 and tokens[1][1] == ":":
+            path = string_value(tokens[2])
+            if path:
+                includes.append(path)
+        elif first == "module" and n == 3 and tokens[1][0] == "name" and tokens[2][1] == ":":
+            module, module_indent = tokens[1][1], indent
+        elif first == "snakefile" and module and n == 3 and tokens[1][1] == ":":
+            path = string_value(tokens[2])
+            if path:
+                modules[module] = path
+        elif first == "use" and n > 2 and tokens[1][1] == "rule":
+            for i in range(2, n - 1):
+                if tokens[i] == ("name", "from") and tokens[i + 1][0] == "name":
+                    used_modules.add(tokens[i + 1][1])
+                    break
+        if min_version is None:
+            for i in range(n - 3):
+                if tokens[i] == ("name", "min_version") and tokens[i + 1][1] == "(" and tokens[i + 3][1] == ")":
+                    min_version = string_value(tokens[i + 2])
+                    break
+    return SnakefileInfo(includes, modules, used_modules, min_version)
+
+
+def _read_snakefile(path):
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return parse_snakefile(f.read())
+
+
+def parse_snakefile_file(path):
+    """\
+    Parse the Snakefile at ``path``, using the cached result if the file has
+    not changed since it was last parsed.
+    """
+    return memoize_in_memory("smkgraph.info", path, _read_snakefile)
+
+
+def get_workflow_files(snakefile, missing=None):
+    """\
+    Return the list of the Snakefiles that make up the workflow whose main
+    Snakefile is ``snakefile``, starting with the latter, in breadth-first
+    order. Paths are joined to the parent of ``snakefile``, so they are
+    relative if it is. Missing files are skipped; their paths are appended
+    to ``missing``, if given.
+    """
+    snakefile = Path(snakefile)
+    seen = {os.path.abspath(snakefile)}
+    files, queue = [], [snakefile]
+    for path in queue:  # the queue grows while iterating
+        try:
+            info = parse_snakefile_file(path)
+        except OSError:
+            if path is snakefile:
+                raise
+            if missing is not None:
+                missing.append(path)
+            continue
+        files.append(path)
+        targets = info.includes + [v for k, v in info.modules.items() if k in info.used_modules]
+        for t in targets:
+            t = Path(os.path.normpath(path.parent / t))
+            key = os.path.abspath(t)
+            if key not in seen:
+                seen.add(key)
+                queue.append(t)
+    return files
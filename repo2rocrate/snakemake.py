@@ -20,32 +20,53 @@ https://snakemake.readthedocs.io/en/stable/snakefiles/deployment.html
 https://snakemake.github.io/snakemake-workflow-catalog/?rules=true
 """
 
-import re
+import os
+from pathlib import Path
 
+from .cache import memoize
 from .common import CrateBuilder
+from .fs import FSSnapshot
+from .profile import phase
+from .smkgraph import get_workflow_files, parse_snakefile_file
 
 
 WF_BASENAME = "Snakefile"
 
 
-def find_workflow(root_dir):
+def find_workflow(root_dir, fs=None):
+    if fs is None:
+        fs = FSSnapshot(root_dir)
     candidates = [
         root_dir / "workflow" / WF_BASENAME,
         root_dir / WF_BASENAME,
     ]
     for p in candidates:
-        if p.is_file():
+        if fs.is_file(p.relative_to(root_dir)):
             return p
     raise RuntimeError(f"workflow definition (one of: {', '.join(map(str, candidates))}) not found")
 
 
 def get_lang_version(workflow_path):
-    pattern = re.compile(r"""min_version\(\s*['"]([^'"]+)['"]\s*\)""")
-    with open(workflow_path) as f:
-        for line in f:
-            m = pattern.match(line)
-            if m:
-                return m.groups()[0]
+    return memoize(
+        "snakemake.min_version", workflow_path, lambda: (parse_snakefile_file(workflow_path).min_version, [])
+    )
+
+
+def get_rule_files(workflow_path):
+    """\
+    Return the paths of the files included (directly or not) by the
+    Snakefile at ``workflow_path`` (see ``smkgraph.get_workflow_files``).
+    Results are cached by file contents.
+    """
+    workflow_path = Path(workflow_path)
+
+    def compute():
+        missing = []
+        paths = get_workflow_files(workflow_path, missing=missing)[1:]
+        return [os.path.relpath(_, workflow_path.parent) for _ in paths], paths + missing
+
+    relpaths = memoize("snakemake.rule_files", workflow_path, compute)
+    return [Path(os.path.normpath(workflow_path.parent / _)) for _ in relpaths]
 
 
 class SnakemakeCrateBuilder(CrateBuilder):
@@ -84,6 +105,8 @@ class SnakemakeCrateBuilder(CrateBuilder):
     ):
         if not lang_version:
             lang_version = get_lang_version(wf_source)
+        if not wf_name:
+            wf_name = self.get_dockstore_name(wf_source.relative_to(self.root))
         workflow = super().add_workflow(
             wf_source,
             wf_name=wf_name,
@@ -92,8 +115,35 @@ class SnakemakeCrateBuilder(CrateBuilder):
             license=license,
             diagram=diagram,
         )
+        self.add_rule_files(workflow, wf_source)
         return workflow
 
+    def add_rule_files(self, workflow, wf_source):
+        """\
+        Add the files included by the main Snakefile (directly or not) as
+        parts of the workflow.
+        """
+        try:
+            paths = get_rule_files(wf_source)
+        except OSError:
+            return []
+        parts = []
+        for path in paths:
+            self.fs.track(path)
+            try:
+                relpath = path.relative_to(self.root)
+            except ValueError:
+                continue  # outside of the repository
+            entity = self.crate.get(relpath.as_posix())
+            if entity is None:
+                entity = self.crate.add_file(path, relpath, properties={
+                    "@type": ["File", "SoftwareSourceCode"],
+                    "programmingLanguage": workflow["programmingLanguage"],
+                })
+            workflow.append_to("hasPart", entity)
+            parts.append(entity)
+        return parts
+
 
 def make_crate(
     root,
@@ -105,10 +155,31 @@ def make_crate(
     license=None,
     ci_workflow=None,
     diagram=None,
+    fs=None,
+    materialize=None,
+    tracked_only=False,
+    honor_ignore=True,
+    max_file_size=None,
+    max_total_size=None,
+    reference_only=False,
+    store=None,
 ):
-    builder = SnakemakeCrateBuilder(root, repo_url=repo_url)
+    builder = SnakemakeCrateBuilder(
+        root,
+        repo_url=repo_url,
+        fs=fs,
+        materialize=materialize,
+        tracked_only=tracked_only,
+        honor_ignore=honor_ignore,
+        max_file_size=max_file_size,
+        max_total_size=max_total_size,
+        reference_only=reference_only,
+        store=store,
+    )
     if not workflow:
-        workflow = find_workflow(root)
+        with phase("detection") as p:
+            workflow = find_workflow(root, fs=builder.fs)
+            p.add(files=1)
     return builder.build(
         workflow,
         wf_name=wf_name,
@@ -0,0 +1,101 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""\
+Content-addressed storage for crate files.
+
+Each distinct file content is stored once, under ``objects/`` in the store
+directory, at a path derived from its SHA-256 digest; crate directories are
+then made of hard links to the stored objects. When generating many similar
+crates (e.g., for pipelines that share modules and boilerplate files), the
+space taken and the data written thus grow with the amount of unique content
+rather than with the number of crates.
+
+Since all the links to an object share its permission bits, objects are
+read-only, and executable files are stored separately from non-executable
+ones with the same content. Objects are never removed.
+"""
+
+import errno
+import os
+import stat
+import uuid
+from pathlib import Path
+
+OBJECTS_DIR = "objects"
+TMP_DIR = "tmp"
+EXEC_SUFFIX = ".x"
+OBJECT_MODE = 0o444
+EXEC_OBJECT_MODE = 0o555
+
+
+class ContentStore:
+    """\
+    A content-addressed store in directory ``root``, which should be on the
+    same file system as the crate outputs (otherwise, files are copied out
+    of the store).
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        (self.root / OBJECTS_DIR).mkdir(parents=True, exist_ok=True)
+        (self.root / TMP_DIR).mkdir(exist_ok=True)
+
+    def object_path(self, digest, executable=False):
+        suffix = EXEC_SUFFIX if executable else ""
+        return self.root / OBJECTS_DIR / digest[:2] / f"{digest[2:]}{suffix}"
+
+    def add(self, src, digest, executable=False):
+        """\
+        Store the contents of ``src``, whose SHA-256 digest is ``digest``,
+        unless already present. Return a ``(path, bytes_copied)`` tuple.
+        """
+        from .output import copy_file
+        path = self.object_path(digest, executable)
+        if path.exists():
+            return path, 0
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = self.root / TMP_DIR / uuid.uuid4().hex
+        try:
+            n = copy_file(src, tmp_path)
+            os.chmod(tmp_path, EXEC_OBJECT_MODE if executable else OBJECT_MODE)
+            os.replace(tmp_path, path)  # atomic: concurrent writers store the same content
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        return path, n
+
+    def link(self, src, dst, digest):
+        """\
+        Make ``dst`` a hard link to the stored copy of ``src`` (whose SHA-256
+        digest is ``digest``), storing it first if needed. If the link
+        cannot be created, copy the stored object to ``dst``. Return a
+        ``(bytes_copied, linked)`` tuple, as ``output.materialize_file``.
+        """
+        from .output import copy_file
+        if os.path.lexists(dst) and os.path.abspath(src) == os.path.abspath(dst):
+            return 0, False
+        executable = bool(os.stat(src).st_mode & stat.S_IXUSR)
+        path, n = self.add(src, digest, executable)
+        if os.path.lexists(dst):
+            if os.path.samefile(path, dst):
+                return n, True  # already linked (e.g., rewriting the same crate)
+            os.unlink(dst)
+        try:
+            os.link(path, dst)
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EMLINK, errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP):
+                raise
+            return n + copy_file(path, dst), False
+        return n, True
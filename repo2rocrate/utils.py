@@ -12,8 +12,19 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import re
 from pathlib import PurePosixPath
-from urllib.parse import unquote, urlparse
+from urllib.parse import quote, unquote, urlparse
+
+# how crate files are materialized from their sources (see output.py)
+COPY = "copy"
+HARDLINK = "hardlink"
+SYMLINK = "symlink"
+REFLINK = "reflink"
+MATERIALIZE_MODES = (COPY, HARDLINK, SYMLINK, REFLINK)
+
+SIZE_RE = re.compile(r"\s*(\d+(?:\.\d*)?)\s*([kmgt]?)(?:i?b)?\s*", re.I)
+SIZE_UNITS = {"": 1, "k": 1 << 10, "m": 1 << 20, "g": 1 << 30, "t": 1 << 40}
 
 
 def get_ci_wf_endpoint(repo_url, ci_wf_name):
@@ -22,3 +33,62 @@ def get_ci_wf_endpoint(repo_url, ci_wf_name):
         raise ValueError("repository url must be like https://github.com/<OWNER>/<REPO>")
     owner, repo_name = repo_path.parts[-2:]
     return f"repos/{owner}/{repo_name}/actions/workflows/{ci_wf_name}"
+
+
+def as_list(value):
+    """\
+    Same as ``rocrate.utils.as_list``, without importing the RO-Crate library.
+    """
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def parse_size(value):
+    """\
+    Convert a size like ``"500M"``, ``"1.5G"`` or ``"2GiB"`` (binary units,
+    case-insensitive) to a number of bytes. Raise ``ValueError`` if
+    ``value`` is not a valid size.
+    """
+    m = SIZE_RE.fullmatch(str(value))
+    if not m:
+        raise ValueError(f"invalid size: {value!r}")
+    return int(float(m.group(1)) * SIZE_UNITS[m.group(2).lower()])
+
+
+def parse_github_url(repo_url):
+    """\
+    Return the ``(owner, repo_name)`` tuple of GitHub repository URL
+    ``repo_url``, or ``None`` if it is not a GitHub repository URL.
+    """
+    parsed = urlparse(repo_url)
+    repo_path = PurePosixPath(unquote(parsed.path))
+    if parsed.netloc not in ("github.com", "www.github.com") or len(repo_path.parts) != 3:
+        return None
+    owner, repo_name = repo_path.parts[1:]
+    if repo_name.endswith(".git"):
+        repo_name = repo_name[:-len(".git")]
+    return owner, repo_name
+
+
+def get_raw_url(repo_url, relpath, ref="HEAD"):
+    """\
+    Return the URL of the contents of file ``relpath`` at git reference
+    ``ref`` in GitHub repository ``repo_url``, or ``None`` if ``repo_url``
+    is not a GitHub repository URL.
+    """
+    repo = parse_github_url(repo_url)
+    if not repo:
+        return None
+    return f"https://raw.githubusercontent.com/{repo[0]}/{repo[1]}/{ref}/{quote(PurePosixPath(relpath).as_posix())}"
+
+
+def get_tree_url(repo_url, relpath, ref="HEAD"):
+    """\
+    Like ``get_raw_url``, but return the URL of the web page of directory
+    ``relpath``.
+    """
+    repo = parse_github_url(repo_url)
+    if not repo:
+        return None
+    return f"https://github.com/{repo[0]}/{repo[1]}/tree/{ref}/{quote(PurePosixPath(relpath).as_posix())}"
@@ -0,0 +1,303 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""\
+Keep in-place crate metadata up to date while the repository is edited.
+
+Only the inputs of the last build are watched: the directories it listed and
+the files whose contents it used, so that the cost does not depend on the
+size of the rest of the tree. Events are collected until none arrives for
+a short debounce interval, then the crate is updated:
+
+* if the changed files are only the sources of ``File`` entities and no
+  directory listing changed, only the digests of those entities are
+  recomputed;
+* otherwise (e.g., a Snakefile, ``nextflow.config``, ``.ga`` file or
+  ``.dockstore.yml`` was modified, or a CI workflow or data directory was
+  added or removed) the crate is rebuilt from a new snapshot. Metadata
+  parsed from unchanged files is taken from the in-memory caches of the
+  running process.
+
+Events come from inotify on Linux; elsewhere (or if inotify is not
+available) the watched directories are polled.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from pathlib import Path
+
+from .fs import FSSnapshot
+from .incremental import OUTPUT_BASENAMES, dir_fingerprint, get_input_files
+from .output import get_local_source
+
+DEBOUNCE = 0.03
+POLL_INTERVAL = 0.25
+
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_ONLYDIR = 0x1000000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+WATCH_MASK |= IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+EVENT = struct.Struct("iIII")  # wd, mask, cookie, len (followed by the name)
+
+
+class InotifyWatcher:
+    """\
+    Watch directories for changes with the Linux inotify API. Raise
+    ``OSError`` if it is not available.
+    """
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        try:
+            self.libc = ctypes.CDLL(libc_name, use_errno=True)
+            self.libc.inotify_init1
+        except (OSError, AttributeError, TypeError):
+            raise OSError("inotify is not available")
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.wds = {}  # watch descriptor -> directory
+        self.dirs = {}  # directory -> watch descriptor
+
+    def set_dirs(self, dirs):
+        """\
+        Watch exactly the directories in ``dirs`` (absolute paths).
+        """
+        dirs = set(map(Path, dirs))
+        for d in set(self.dirs) - dirs:
+            wd = self.dirs.pop(d)
+            self.wds.pop(wd, None)
+            self.libc.inotify_rm_watch(self.fd, wd)
+        for d in dirs - set(self.dirs):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(d), WATCH_MASK)
+            if wd >= 0:
+                self.dirs[d] = wd
+                self.wds[wd] = d
+
+    def read(self, timeout=None):
+        """\
+        Wait up to ``timeout`` seconds (forever if ``None``) for events and
+        return the set of the paths they refer to.
+        """
+        changed = set()
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return changed
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return changed
+        pos = 0
+        while pos < len(data):
+            wd, mask, _, length = EVENT.unpack_from(data, pos)
+            pos += EVENT.size
+            name = os.fsdecode(data[pos:pos + length].rstrip(b"\0"))
+            pos += length
+            if mask & IN_Q_OVERFLOW:
+                changed.update(self.dirs)
+                continue
+            d = self.wds.get(wd)
+            if d is not None:
+                changed.add(d / name if name else d)
+        return changed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def _scan(d):
+    try:
+        with os.scandir(d) as it:
+            entries = {}
+            for e in it:
+                try:
+                    st = e.stat()
+                    entries[e.name] = (e.is_dir(), st.st_mtime_ns, st.st_size)
+                except OSError:
+                    entries[e.name] = None
+            return entries
+    except OSError:
+        return None
+
+
+class PollingWatcher:
+    """\
+    Watch directories for changes by comparing their contents (entry
+    names, types, modification times and sizes) every ``interval``
+    seconds.
+    """
+
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+        self.dirs = {}
+
+    def set_dirs(self, dirs):
+        self.dirs = {Path(d): self.dirs.get(Path(d)) or _scan(d) for d in dirs}
+
+    def read(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = set()
+            for d, old in self.dirs.items():
+                new = _scan(d)
+                if new == old:
+                    continue
+                self.dirs[d] = new
+                if old is None or new is None:
+                    changed.add(d)
+                    continue
+                changed.update(d / _ for _ in set(old) | set(new) if old.get(_) != new.get(_))
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return changed
+            wait = self.interval if deadline is None else min(self.interval, deadline - time.monotonic())
+            time.sleep(max(wait, 0))
+
+    def close(self):
+        pass
+
+
+def get_watcher(poll=False):
+    """\
+    Return an ``InotifyWatcher`` if available (and ``poll`` is false),
+    otherwise a ``PollingWatcher``.
+    """
+    if not poll:
+        try:
+            return InotifyWatcher()
+        except OSError:
+            pass
+    return PollingWatcher()
+
+
+class WatchSession:
+    """\
+    Keeps the crate generated from repository ``root`` in memory and
+    updates it when its inputs change. ``build(fs)`` must return a new
+    crate built from snapshot ``fs``; ``write(crate, fs)`` is called after
+    each update.
+    """
+
+    def __init__(self, root, build, write, watcher=None, debounce=DEBOUNCE):
+        self.root = Path(root).absolute()
+        self.build = build
+        self.write = write
+        self.watcher = watcher or get_watcher()
+        self.debounce = debounce
+        self.crate = None
+        self.fs = None
+        self.sources = {}  # File entity sources -> entities
+        self.listings = {}  # watched directories -> listing fingerprints
+        self.stale = False  # true if the last build failed
+
+    def rebuild(self):
+        """\
+        Build the crate from a new snapshot and write it. If the build
+        fails, the previous state is kept (and the previous inputs watched),
+        and the next change triggers a rebuild.
+        """
+        self.stale = True
+        fs = FSSnapshot(self.root)
+        crate = self.build(fs)
+        sources = {}
+        from rocrate.model.file import File
+        for e in crate.data_entities:
+            source = get_local_source(e)
+            if isinstance(e, File) and source is not None:
+                sources.setdefault(Path(os.path.abspath(source)), []).append(e)
+        dirs = {self.root / _ for _ in fs.scanned_dirs}
+        dirs.update((self.root / _).parent for _ in get_input_files(crate, fs))
+        # listings of the parents of input files may not have been scanned yet
+        listings = {
+            d: dir_fingerprint(fs, d.relative_to(self.root))
+            for d in dirs if d == self.root or self.root in d.parents
+        }
+        self.fs, self.crate, self.sources, self.listings = fs, crate, sources, listings
+        self.stale = False
+        self.watcher.set_dirs(dirs)
+        self.write(crate, fs)
+
+    def update(self, changed):
+        """\
+        Update the crate after the paths in ``changed`` have changed. Return
+        ``"digests"`` if only digests were updated, ``"rebuild"`` if the
+        crate was rebuilt, or ``None`` if nothing had to be done.
+        """
+        changed = {_ for _ in changed if not (_.parent == self.root and _.name in OUTPUT_BASENAMES)}
+        if not changed:
+            return None
+        if self.stale:
+            self.rebuild()
+            return "rebuild"
+        tracked = {Path(os.path.abspath(self.root / _)) for _ in self.fs.tracked}
+        current = FSSnapshot(self.root)
+        for path in changed:
+            if path in tracked:
+                self.rebuild()
+                return "rebuild"
+            d = path.parent
+            if d in self.listings and self.listings[d] != dir_fingerprint(current, d.relative_to(self.root)):
+                self.rebuild()
+                return "rebuild"
+        modified = [_ for _ in changed if _ in self.sources]
+        if not modified:
+            return None
+        from .digest import compute_digests
+        from .cache import DigestCache
+        cache = DigestCache()
+        try:
+            digests = compute_digests(modified, cache=cache)
+        finally:
+            cache.close()
+        for path, (digest, size) in digests.items():
+            for e in self.sources[path]:
+                e["sha256"] = digest
+                e["contentSize"] = str(size)
+        self.write(self.crate, self.fs)
+        return "digests"
+
+    def step(self, timeout=None):
+        """\
+        Wait up to ``timeout`` seconds (forever if ``None``) for changes,
+        then for the debounce interval to pass without further changes, and
+        update the crate. Return the result of ``update``, or ``None`` if
+        there was no change.
+        """
+        changed = self.watcher.read(timeout)
+        if not changed:
+            return None
+        while True:
+            more = self.watcher.read(self.debounce)
+            if not more:
+                break
+            changed |= more
+        return self.update(changed)
+
+    def close(self):
+        self.watcher.close()
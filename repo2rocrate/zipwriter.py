@@ -0,0 +1,279 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""\
+Streaming zip writer with parallel compression.
+
+Members are written sequentially to an output stream (which need not be
+seekable) with sizes and CRCs in data descriptors. File contents are split
+into chunks that are deflated independently on a thread pool, each primed
+with the 32 KiB that precede it and terminated with a sync flush (as done by
+pigz), so that their concatenation is a single valid deflate stream. The
+number of chunks in flight is bounded, which bounds memory usage regardless
+of the number and size of the files.
+"""
+
+import os
+import struct
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+DEFAULT_MEMORY = 64 << 20
+DEFAULT_LEVEL = 6
+WINDOW_SIZE = 1 << 15
+
+ZIP64_LIMIT = (1 << 31) - 1
+ZIP_MAX_COUNT = 0xFFFF
+ZIP_DEFLATED = 8
+ZIP_STORED = 0
+FLAG_DATA_DESCRIPTOR = 0x08
+FLAG_UTF8 = 0x800
+VERSION_DEFAULT = 20
+VERSION_ZIP64 = 45
+UNIX = 3
+
+LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+END_RECORD = struct.Struct("<IHHHHIIH")
+END_RECORD64 = struct.Struct("<IQHHIIQQQQ")
+END_LOCATOR64 = struct.Struct("<IIQI")
+
+
+def dos_datetime(timestamp):
+    t = time.localtime(timestamp)
+    year = min(max(t.tm_year, 1980), 2107)
+    return (
+        (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2),
+        ((year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday,
+    )
+
+
+def deflate_chunk(path, offset, length, last, level=DEFAULT_LEVEL):
+    """\
+    Read ``length`` bytes of ``path`` starting at ``offset`` and deflate them
+    as a part of the raw deflate stream of the whole file. Return the
+    uncompressed and compressed data.
+    """
+    start = max(0, offset - WINDOW_SIZE)
+    with open(path, "rb") as f:
+        f.seek(start)
+        buf = memoryview(f.read(offset - start + length))
+    zdict, data = buf[:offset - start], buf[offset - start:]
+    kwargs = {"zdict": zdict} if len(zdict) else {}
+    c = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, **kwargs)
+    out = c.compress(data) + c.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+    return data, out
+
+
+class ZipMember:
+
+    def __init__(self, name, mtime, mode, is_dir=False, zip64=False):
+        self.name = name
+        self.encoded_name = name.encode("utf-8")
+        self.mtime = mtime
+        self.mode = mode
+        self.is_dir = is_dir
+        self.zip64 = zip64
+        self.crc = 0
+        self.compress_size = 0
+        self.file_size = 0
+        self.offset = 0
+
+
+class ZipStreamWriter:
+    """\
+    Write a zip archive to the binary stream ``f``.
+    """
+
+    def __init__(self, f, level=DEFAULT_LEVEL):
+        self.f = f
+        self.level = level
+        self.offset = 0
+        self.members = []
+        self.names = set()
+
+    def _write(self, data):
+        self.f.write(data)
+        self.offset += len(data)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.close()
+
+    def start_member(self, name, mtime=None, mode=0o644, is_dir=False, size_hint=0):
+        if name in self.names:
+            raise ValueError(f"duplicate zip member: {name}")
+        self.names.add(name)
+        zip64 = size_hint * 1.05 > ZIP64_LIMIT
+        m = ZipMember(name, time.time() if mtime is None else mtime, mode, is_dir=is_dir, zip64=zip64)
+        m.offset = self.offset
+        dostime, dosdate = dos_datetime(m.mtime)
+        if is_dir:
+            flags, method, version = FLAG_UTF8, ZIP_STORED, VERSION_DEFAULT
+            extra = b""
+            size = 0
+        else:
+            flags, method = FLAG_UTF8 | FLAG_DATA_DESCRIPTOR, ZIP_DEFLATED
+            version = VERSION_ZIP64 if zip64 else VERSION_DEFAULT
+            extra = struct.pack("<HHQQ", 1, 16, 0, 0) if zip64 else b""
+            size = 0xFFFFFFFF if zip64 else 0
+        self._write(LOCAL_HEADER.pack(
+            0x04034B50, version, flags, method, dostime, dosdate, 0, size, size,
+            len(m.encoded_name), len(extra)
+        ))
+        self._write(m.encoded_name)
+        self._write(extra)
+        self.members.append(m)
+        return m
+
+    def write_data(self, m, data, compressed):
+        m.crc = zlib.crc32(data, m.crc)
+        m.file_size += len(data)
+        m.compress_size += len(compressed)
+        self._write(compressed)
+
+    def end_member(self, m):
+        if m.is_dir:
+            return
+        if m.zip64:
+            self._write(struct.pack("<IIQQ", 0x08074B50, m.crc, m.compress_size, m.file_size))
+        else:
+            if max(m.compress_size, m.file_size) > ZIP64_LIMIT:
+                raise RuntimeError(f"{m.name}: size grew past the zip64 limit while being read")
+            self._write(struct.pack("<IIII", 0x08074B50, m.crc, m.compress_size, m.file_size))
+
+    def add_dir(self, name, mtime=None, mode=0o755):
+        self.start_member(name.rstrip("/") + "/", mtime=mtime, mode=mode, is_dir=True)
+
+    def add_stream(self, name, chunks, mtime=None, mode=0o644, size_hint=ZIP64_LIMIT):
+        """\
+        Add a member with contents taken from the iterable of bytes
+        ``chunks``, compressing them in the calling thread. If the total size
+        is not known in advance, ``size_hint`` defaults to a value that
+        enables zip64 extensions.
+        """
+        m = self.start_member(name, mtime=mtime, mode=mode, size_hint=size_hint)
+        c = zlib.compressobj(self.level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        for chunk in chunks:
+            self.write_data(m, chunk, c.compress(chunk))
+        self.write_data(m, b"", c.flush())
+        self.end_member(m)
+
+    def add_files(self, files, jobs=None, memory=DEFAULT_MEMORY, chunk_size=DEFAULT_CHUNK_SIZE):
+        """\
+        Add local files, given as an iterable of ``(source, name)`` pairs,
+        deflating them in parallel on ``jobs`` threads (default: number of
+        CPUs). At most ``memory`` bytes of uncompressed and compressed data
+        are held at any given time.
+        """
+        jobs = jobs or os.cpu_count() or 1
+        if jobs <= 1:
+            for source, name in files:
+                st = os.stat(source)
+                with open(source, "rb") as f:
+                    self.add_stream(
+                        name, iter(lambda: f.read(chunk_size), b""),
+                        mtime=st.st_mtime, mode=st.st_mode & 0o777, size_hint=st.st_size
+                    )
+            return
+        window = max(1, memory // (2 * chunk_size))
+
+        def gen_tasks():
+            for source, name in files:
+                st = os.stat(source)
+                size = st.st_size
+                info = (name, st.st_mtime, st.st_mode & 0o777, size)
+                offset = 0
+                while True:
+                    length = min(chunk_size, size - offset)
+                    last = offset + length >= size
+                    yield info, (source, offset, length, last, self.level)
+                    if last:
+                        break
+                    offset += length
+
+        pending = deque()
+        current_info, m = None, None
+
+        def consume():
+            nonlocal current_info, m
+            info, last, future = pending.popleft()
+            data, compressed = future.result()
+            if info is not current_info:
+                name, mtime, mode, size = info
+                current_info, m = info, self.start_member(name, mtime=mtime, mode=mode, size_hint=size)
+            self.write_data(m, data, compressed)
+            if last:
+                self.end_member(m)
+
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            for info, args in gen_tasks():
+                if len(pending) >= window:
+                    consume()
+                pending.append((info, args[3], executor.submit(deflate_chunk, *args)))
+            while pending:
+                consume()
+
+    def close(self):
+        cd_offset = self.offset
+        for m in self.members:
+            dostime, dosdate = dos_datetime(m.mtime)
+            extra_fields = []
+            file_size, compress_size, offset = m.file_size, m.compress_size, m.offset
+            if file_size > ZIP64_LIMIT:
+                extra_fields.append(file_size)
+                file_size = 0xFFFFFFFF
+            if compress_size > ZIP64_LIMIT:
+                extra_fields.append(compress_size)
+                compress_size = 0xFFFFFFFF
+            if offset > ZIP64_LIMIT:
+                extra_fields.append(offset)
+                offset = 0xFFFFFFFF
+            extra = b""
+            if extra_fields:
+                extra = struct.pack(f"<HH{len(extra_fields)}Q", 1, 8 * len(extra_fields), *extra_fields)
+            version = VERSION_ZIP64 if (extra_fields or m.zip64) else VERSION_DEFAULT
+            if m.is_dir:
+                flags, method = FLAG_UTF8, ZIP_STORED
+                external_attr = ((0o40000 | m.mode) << 16) | 0x10
+            else:
+                flags, method = FLAG_UTF8 | FLAG_DATA_DESCRIPTOR, ZIP_DEFLATED
+                external_attr = (0o100000 | m.mode) << 16
+            self._write(CENTRAL_HEADER.pack(
+                0x02014B50, (UNIX << 8) | version, version, flags, method, dostime, dosdate,
+                m.crc, compress_size, file_size, len(m.encoded_name), len(extra), 0, 0, 0,
+                external_attr, offset
+            ))
+            self._write(m.encoded_name)
+            self._write(extra)
+        cd_size = self.offset - cd_offset
+        count = len(self.members)
+        if count > ZIP_MAX_COUNT or cd_offset > ZIP64_LIMIT or cd_size > ZIP64_LIMIT:
+            end64_offset = self.offset
+            self._write(END_RECORD64.pack(
+                0x06064B50, 44, (UNIX << 8) | VERSION_ZIP64, VERSION_ZIP64, 0, 0,
+                count, count, cd_size, cd_offset
+            ))
+            self._write(END_LOCATOR64.pack(0x07064B50, 0, end64_offset, 1))
+            count = min(count, ZIP_MAX_COUNT)
+            cd_size = min(cd_size, 0xFFFFFFFF)
+            cd_offset = min(cd_offset, 0xFFFFFFFF)
+        self._write(END_RECORD.pack(0x06054B50, 0, 0, count, count, cd_size, cd_offset, 0))
+        self.f.flush()
@@ -50,7 +50,11 @@ setup(
     python_requires=">=3.9, <4",
     install_requires=["click", "pyyaml", "rocrate"],
     entry_points={
-        "console_scripts": ["repo2rocrate=repo2rocrate.cli:cli"],
+        "console_scripts": [
+            "repo2rocrate=repo2rocrate.cli:cli",
+            "repo2rocrate-batch=repo2rocrate.cli:batch",
+            "repo2rocrate-serve=repo2rocrate.cli:serve",
+        ],
     },
     zip_safe=True,
 )
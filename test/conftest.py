@@ -29,3 +29,10 @@ def tmpdir(tmpdir):
 @pytest.fixture
 def data_dir(tmpdir):
     return THIS_DIR / DATA_DIR_NAME
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmpdir, monkeypatch):
+    cache_dir = tmpdir / "cache"
+    monkeypatch.setenv("REPO2ROCRATE_CACHE_DIR", str(cache_dir))
+    return cache_dir
@@ -0,0 +1,43 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+BENCHMARKS_DIR = Path(__file__).absolute().parent.parent / "benchmarks"
+
+
+def test_run(tmpdir):
+    out_path = tmpdir / "results.json"
+    args = [
+        sys.executable, str(BENCHMARKS_DIR / "run.py"), "-n", "50", "--data-size", "100k", "-r", "1",
+        "--outputs", "make_crate", "write_zip", "-w", str(tmpdir / "work"), "-o", str(out_path),
+    ]
+    subprocess.run(args, check=True, stderr=subprocess.DEVNULL)
+    results = json.loads(out_path.read_text())["results"]
+    assert [(_["lang"], _["output"]) for _ in results] == [
+        (lang, output) for lang in ("nextflow", "snakemake", "galaxy") for output in ("make_crate", "write_zip")
+    ]
+    for r in results:
+        assert r["files"] == 50
+        assert r["repo_files"] == 50
+        assert r["repo_bytes"] > 100 * 1024
+        assert r["seconds"] > 0
+        assert (r["output_bytes"] > 0) == (r["output"] == "write_zip")
+        assert r["peak_disk_bytes"] >= 0
+    # generated repositories are reused; comparing with itself finds no regressions
+    args += ["--baseline", str(out_path)]
+    subprocess.run(args, check=True, stderr=subprocess.DEVNULL)
@@ -0,0 +1,133 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+
+import pytest
+from click.testing import CliRunner
+from repo2rocrate import nextflow, snakemake
+from repo2rocrate.cache import (
+    DB_BASENAME, MetadataCache, clear_memory_cache, get_metadata_cache, memoize, memoize_in_memory
+)
+from repo2rocrate.cli import cli
+
+
+def test_metadata_cache(cache_dir):
+    cache = MetadataCache(cache_dir, max_bytes=100)
+    assert cache.get("a") is None
+    cache.put("a", {"x": "a" * 30})
+    cache.put("b", ["b" * 30])
+    assert cache.get("a") == {"x": "a" * 30}  # now "b" is the least recently used
+    cache.put("c", "c" * 30)
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+    assert cache.total_size() <= 100
+    cache.put("big", "x" * 200)  # larger than the whole cache
+    assert cache.get("big") is None
+    assert cache.get("a") and cache.get("c")
+    cache.close()
+
+
+def test_memoize(tmpdir):
+    calls = []
+
+    def compute(path, dep):
+        def f():
+            calls.append(path)
+            return {"n": len(path.read_text() + dep.read_text())}, [dep]
+        return f
+
+    repos = []
+    for i in range(2):
+        repo = tmpdir / f"repo{i}"
+        (repo / "conf").mkdir(parents=True)
+        (repo / "main").write_text("main")
+        (repo / "conf" / "dep").write_text("dep" * (i + 1))
+        repos.append((repo / "main", repo / "conf" / "dep"))
+    path, dep = repos[0]
+    assert memoize("test", path, compute(path, dep)) == {"n": 7}
+    assert memoize("test", path, compute(path, dep)) == {"n": 7}
+    assert memoize("test", path, compute(path, dep), extra="x") == {"n": 7}
+    assert len(calls) == 2
+    # same contents, different dependency
+    path, dep = repos[1]
+    assert memoize("test", path, compute(path, dep)) == {"n": 10}
+    assert len(calls) == 3
+    dep.write_text("d")
+    assert memoize("test", path, compute(path, dep)) == {"n": 5}
+    assert len(calls) == 4
+
+
+def test_nextflow(data_dir, tmpdir, monkeypatch):
+    root = tmpdir / "nf-core-foobar"
+    shutil.copytree(data_dir / root.name, root)
+    expected = nextflow.load_manifest(root / "nextflow.config")
+    monkeypatch.setattr(nextflow, "load_config", None)  # not called on cache hits
+    assert nextflow.load_manifest(root / "nextflow.config") == expected
+    assert nextflow.make_crate(root).mainEntity["name"] == "nf-core/foobar"
+
+
+def test_no_cache(data_dir, tmpdir, cache_dir, monkeypatch):
+    monkeypatch.chdir(tmpdir)
+    root = data_dir / "fair-crcc-send-data"
+    runner = CliRunner()
+    result = runner.invoke(cli, ["-r", str(root), "-o", "crate.zip", "--no-cache"])
+    assert result.exit_code == 0, result.output
+    assert not (cache_dir / DB_BASENAME).exists()
+    assert get_metadata_cache() is not None  # the setting is restored
+    other_dir = tmpdir / "other-cache"
+    result = runner.invoke(cli, ["-r", str(root), "-o", "crate.zip", "--cache-dir", str(other_dir)])
+    assert result.exit_code == 0, result.output
+    assert (other_dir / DB_BASENAME).is_file()
+
+
+def test_missing_includes(tmpdir):
+    config = tmpdir / "nextflow.config"
+    config.write_text("manifest.name = 'base'\nincludeConfig 'extra.config'\n")
+    manifest, files = nextflow.load_manifest(config)
+    assert manifest == {"name": "base"} and files == [config]
+    (tmpdir / "extra.config").write_text("manifest.name = 'override'\n")
+    manifest, files = nextflow.load_manifest(config)
+    assert manifest == {"name": "override"} and files == [config, tmpdir / "extra.config"]
+    snakefile = tmpdir / "Snakefile"
+    snakefile.write_text('include: "rules/a.smk"\n')
+    assert snakemake.get_rule_files(snakefile) == []
+    (tmpdir / "rules").mkdir()
+    (tmpdir / "rules" / "a.smk").write_text("rule a:\n    shell: 'true'\n")
+    assert snakemake.get_rule_files(snakefile) == [tmpdir / "rules" / "a.smk"]
+
+
+def test_memoize_in_memory(tmpdir):
+    path = tmpdir / "f.txt"
+    path.write_text("a")
+    calls = []
+
+    def compute(p):
+        calls.append(p)
+        return object()
+    clear_memory_cache()
+    value = memoize_in_memory("test.a", path, compute)
+    assert memoize_in_memory("test.a", path, compute) is value
+    assert memoize_in_memory("test.b", path, compute) is not value
+    assert len(calls) == 2
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert memoize_in_memory("test.a", path, compute) is not value
+    assert len(calls) == 3
+    clear_memory_cache()
+    memoize_in_memory("test.a", path, compute)
+    assert len(calls) == 4
+    with pytest.raises(OSError):
+        memoize_in_memory("test.a", tmpdir / "missing", compute)
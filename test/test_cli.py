@@ -18,7 +18,7 @@ import pytest
 import repo2rocrate
 from click.testing import CliRunner
 from rocrate.rocrate import ROCrate
-from repo2rocrate.cli import cli
+from repo2rocrate.cli import batch, cli
 
 SNAKEMAKE_ID = "https://w3id.org/workflowhub/workflow-ro-crate#snakemake"
 
@@ -117,8 +117,125 @@ def test_options(data_dir, tmpdir):
     assert instance["resource"] == f"repos/crs4/{repo_name}/actions/workflows/{ci_workflow}"
 
 
+def test_size_limits(data_dir, tmpdir):
+    root = data_dir / "fair-crcc-send-data"
+    out = tmpdir / "crate"
+    runner = CliRunner()
+    result = runner.invoke(cli, ["-r", str(root), "-o", str(out), "--max-file-size", "10X"])
+    assert result.exit_code == 2
+    with pytest.warns(UserWarning, match="local identifiers"):  # no GitHub repository URL
+        result = runner.invoke(cli, ["-r", str(root), "-o", str(out), "--max-file-size", "32K"])
+    assert result.exit_code == 0, result.output
+    assert (out / "README.md").is_file()
+    assert not (out / "LICENSE").exists()
+    assert ROCrate(out).get("LICENSE")["contentSize"] == str((root / "LICENSE").stat().st_size)
+
+
+def test_tracked_only_errors(data_dir, tmpdir):
+    root = tmpdir / "fair-crcc-send-data"
+    shutil.copytree(data_dir / root.name, root)
+    runner = CliRunner()
+    result = runner.invoke(cli, ["-r", str(root), "--tracked-only"])
+    assert result.exit_code == 2
+    assert "git working tree" in result.output
+    result = runner.invoke(batch, [str(root), "--tracked-only"])
+    assert result.exit_code == 2
+    assert "git working trees" in result.output
+    (root / ".git").mkdir()
+    (root / ".git" / "index").write_bytes(b"DIRC\0\0\0\x09\0\0\0\0")
+    # falls back to including untracked files
+    result = runner.invoke(cli, ["-r", str(root), "--tracked-only"])
+    assert result.exit_code == 0, result.output
+    assert "unsupported git index" in result.output
+    assert ROCrate(root).get("workflow/Snakefile")
+
+
 def test_version():
     runner = CliRunner()
     result = runner.invoke(cli, ["--version"])
     assert result.exit_code == 0
     assert result.output.strip() == repo2rocrate.__version__
+
+
+@pytest.mark.parametrize("to_zip", [False, True])
+def test_batch(data_dir, tmpdir, to_zip):
+    repos = {
+        "fair-crcc-send-data": "workflow/Snakefile",
+        "nf-core-foobar": "main.nf",
+        "parallel-accession-download": "parallel-accession-download.ga",
+    }
+    out_dir = tmpdir / "crates"
+    args = [str(data_dir / _) for _ in repos] + ["-o", str(out_dir), "-j", "2"]
+    if to_zip:
+        args.append("--zip")
+    runner = CliRunner()
+    result = runner.invoke(batch, args)
+    assert result.exit_code == 0, result.output
+    assert "3 succeeded, 0 failed" in result.output
+    for repo_name, wf_id in repos.items():
+        if to_zip:
+            crate_zip = out_dir / f"{repo_name}.crate.zip"
+            assert crate_zip.is_file()
+            crate_dir = tmpdir / repo_name
+            shutil.unpack_archive(crate_zip, crate_dir)
+        else:
+            crate_dir = out_dir / repo_name
+        crate = ROCrate(crate_dir)
+        assert crate.mainEntity.id == wf_id
+
+
+def test_batch_failure(data_dir, tmpdir):
+    bad_root = tmpdir / "not-a-workflow"
+    bad_root.mkdir()
+    good_root = tmpdir / "fair-crcc-send-data"
+    shutil.copytree(data_dir / good_root.name, good_root)
+    runner = CliRunner()
+    result = runner.invoke(batch, [str(bad_root), str(good_root)])
+    assert result.exit_code == 1
+    assert f"FAILED {bad_root}" in result.output
+    assert "1 succeeded, 1 failed" in result.output
+    assert (good_root / "ro-crate-metadata.json").is_file()
+
+
+def test_batch_duplicate_names(data_dir, tmpdir):
+    roots = []
+    for parent in "a", "b":
+        root = tmpdir / parent / "x"
+        shutil.copytree(data_dir / "fair-crcc-send-data", root)
+        roots.append(str(root))
+    runner = CliRunner()
+    for args in ["-o", str(tmpdir / "out")], ["--monorepo", "-o", str(tmpdir / "out")]:
+        result = runner.invoke(batch, roots + args)
+        assert result.exit_code == 2
+        assert "same output" in result.output
+    assert not (tmpdir / "out").exists()
+    result = runner.invoke(batch, roots)  # in place: no clash
+    assert result.exit_code == 0, result.output
+
+
+@pytest.mark.parametrize("to_zip", [False, True])
+def test_batch_monorepo(data_dir, tmpdir, to_zip):
+    root = tmpdir / "iwc"
+    wf_dir = root / "workflows" / "data-fetching" / "parallel-accession-download"
+    shutil.copytree(data_dir / wf_dir.name, wf_dir)
+    shutil.copy(wf_dir / f"{wf_dir.name}.ga", wf_dir / "other.ga")
+    out_dir = tmpdir / "crates"
+    args = [str(root), "--monorepo", "-o", str(out_dir), "-j", "2"]
+    if to_zip:
+        args.append("--zip")
+    runner = CliRunner()
+    result = runner.invoke(batch, args)
+    assert result.exit_code == 0, result.output
+    assert "2 succeeded, 0 failed" in result.output
+    for name in wf_dir.name, "other":
+        out_path = out_dir / "workflows" / "data-fetching" / wf_dir.name / name
+        if to_zip:
+            crate_dir = tmpdir / "unpacked" / name
+            shutil.unpack_archive(f"{out_path}.crate.zip", crate_dir, format="zip")
+        else:
+            crate_dir = out_path
+        crate = ROCrate(crate_dir)
+        assert crate.mainEntity.id == f"{name}.ga"
+        assert crate.get("test-data")
+    result = runner.invoke(batch, [str(root), "--monorepo"])
+    assert result.exit_code != 0
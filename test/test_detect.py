@@ -0,0 +1,75 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from repo2rocrate import find_workflow, galaxy
+from repo2rocrate.detect import detect
+from repo2rocrate.fs import FSSnapshot
+
+
+@pytest.mark.parametrize("repo_name,lang,wf_relpath", [
+    ("fair-crcc-send-data", "snakemake", "workflow/Snakefile"),
+    ("nf-core-foobar", "nextflow", "main.nf"),
+    ("parallel-accession-download", "galaxy", "parallel-accession-download.ga"),
+])
+def test_detect(data_dir, repo_name, lang, wf_relpath):
+    root = data_dir / repo_name
+    fs = FSSnapshot(root)
+    candidates = detect(root, fs=fs)
+    assert len(candidates) == 1
+    c = candidates[0]
+    assert (c.lang, c.workflow) == (lang, root / wf_relpath)
+    assert c.signals[0] == wf_relpath
+    assert 0.5 < c.score <= 1
+    # the root directory and at most one subdirectory are listed
+    assert len(fs.scanned_dirs) <= 2
+
+
+def test_mixed(tmpdir):
+    root = tmpdir / "repo"
+    (root / "workflow" / "rules").mkdir(parents=True)
+    (root / "workflow" / "Snakefile").touch()
+    (root / "main.ga").touch()
+    (root / "spam.ga").touch()
+    with pytest.warns(UserWarning, match="picking main.ga"):
+        candidates = detect(root)
+    assert [_.lang for _ in candidates] == ["snakemake", "galaxy"]
+    assert candidates[0].signals == ["workflow/Snakefile", "workflow/rules"]
+    assert candidates[1].workflow == root / "main.ga"
+    with pytest.warns(UserWarning):
+        assert find_workflow(root) == ("snakemake", root / "workflow" / "Snakefile")
+    # a Galaxy repo with a stray Snakefile
+    (root / "main-tests.yml").touch()
+    (root / ".dockstore.yml").touch()
+    (root / "test-data").mkdir()
+    (root / "workflow" / "rules").rmdir()
+    with pytest.warns(UserWarning):
+        candidates = detect(root)
+    assert [_.lang for _ in candidates] == ["galaxy", "snakemake"]
+    assert candidates[0].signals == ["main.ga", "main-tests.yml", ".dockstore.yml", "test-data"]
+    assert candidates[0].score == 0.9
+    assert detect(tmpdir) == []
+
+
+@pytest.mark.parametrize("names, expected", [
+    (["b.ga", "a.ga", "c.ga"], "a.ga"),
+    (["b.ga", "Main.ga", "a.ga"], "Main.ga"),
+])
+def test_multiple_ga(tmpdir, names, expected):
+    for name in names:
+        (tmpdir / name).touch()
+    with pytest.warns(UserWarning, match=f"picking {expected}"):
+        assert galaxy.find_workflow(tmpdir) == tmpdir / expected
+    with pytest.warns(UserWarning, match=f"picking {expected}"):
+        assert find_workflow(tmpdir) == ("galaxy", tmpdir / expected)
@@ -0,0 +1,66 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import hashlib
+import os
+
+from repo2rocrate import digest
+from repo2rocrate.cache import DigestCache
+from repo2rocrate.digest import compute_digests, sha256_file
+from repo2rocrate.galaxy import make_crate
+
+
+def _set_old_mtime(path):
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns - 10 * 10**9))
+
+
+def test_sha256_file(tmpdir):
+    for size in 0, 100, digest.CHUNK_SIZE, 2 * digest.CHUNK_SIZE + 1:
+        path = tmpdir / f"f{size}"
+        data = os.urandom(size)
+        path.write_bytes(data)
+        assert sha256_file(path) == hashlib.sha256(data).hexdigest()
+
+
+def test_compute_digests(tmpdir, cache_dir, monkeypatch):
+    paths = []
+    for i in range(10):
+        path = tmpdir / f"f{i}"
+        path.write_bytes(os.urandom(1000 + i))
+        _set_old_mtime(path)
+        paths.append(path)
+    expected = {p: (hashlib.sha256(p.read_bytes()).hexdigest(), p.stat().st_size) for p in paths}
+    cache = DigestCache(cache_dir)
+    assert compute_digests(paths, jobs=4, cache=cache) == expected
+    # now everything comes from the cache
+    monkeypatch.setattr(digest, "sha256_file", None)
+    assert compute_digests(paths, cache=cache) == expected
+    # changed files are hashed again
+    monkeypatch.undo()
+    paths[0].write_bytes(b"foo")
+    assert compute_digests(paths, cache=cache)[paths[0]] == (hashlib.sha256(b"foo").hexdigest(), 3)
+    cache.close()
+
+
+def test_crate_digests(data_dir):
+    root = data_dir / "parallel-accession-download"
+    crate = make_crate(root)
+    for relpath in "parallel-accession-download.ga", "parallel-accession-download-tests.yml", "README.md":
+        entity = crate.get(relpath)
+        data = (root / relpath).read_bytes()
+        assert entity["sha256"] == hashlib.sha256(data).hexdigest()
+        assert entity["contentSize"] == str(len(data))
+    assert "sha256" not in crate.get("test-data")
@@ -0,0 +1,79 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+from pathlib import Path
+
+from repo2rocrate import dockstore
+from repo2rocrate.cache import clear_memory_cache
+from repo2rocrate.dockstore import find_config, get_record, load_records
+from repo2rocrate.fs import FSSnapshot
+from repo2rocrate.snakemake import make_crate
+
+
+CONF = """\
+version: 1.2
+workflows:
+  - name: main
+    subclass: Galaxy
+    primaryDescriptorPath: /main.ga
+  - name: other
+    subclass: snakemake
+    primaryDescriptorPath: workflow/./Snakefile
+"""
+
+
+def test_load_records(tmpdir, monkeypatch):
+    path = tmpdir / ".dockstore.yml"
+    path.write_text(CONF)
+    clear_memory_cache()
+    calls = []
+    read_records = dockstore.read_records
+    monkeypatch.setattr(dockstore, "read_records", lambda p: calls.append(p) or read_records(p))
+    records = load_records(path)
+    assert set(records) == {Path("main.ga"), Path("workflow/Snakefile")}
+    assert records[Path("main.ga")]["name"] == "main"
+    assert load_records(path) is records
+    assert len(calls) == 1
+    st = path.stat()
+    path.write_text(CONF.replace("name: main", "name: spam"))
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert load_records(path)[Path("main.ga")]["name"] == "spam"
+    assert len(calls) == 2
+    path.write_text("workflows: [")
+    assert load_records(path) is None
+    assert load_records(tmpdir / "missing.yml") is None
+
+
+def test_get_record(tmpdir):
+    root = tmpdir / "repo"
+    (root / ".github").mkdir(parents=True)
+    assert find_config(root) is None
+    assert get_record(root, "main.ga") is None
+    (root / ".github" / ".dockstore.yml").write_text(CONF)
+    fs = FSSnapshot(root)
+    assert find_config(root, fs=fs) == ".github/.dockstore.yml"
+    assert get_record(root, "main.ga", fs=fs)["name"] == "main"
+    assert get_record(root, "./workflow/Snakefile", fs=fs)["name"] == "other"
+    assert get_record(root, "missing.ga", fs=fs) is None
+    assert fs.tracked == [root / ".github" / ".dockstore.yml"]
+
+
+def test_snakemake_name(data_dir, tmpdir):
+    root = tmpdir / "fair-crcc-send-data"
+    shutil.copytree(data_dir / root.name, root)
+    assert make_crate(root).mainEntity["name"] == root.name
+    (root / ".dockstore.yml").write_text(CONF)
+    assert make_crate(root).mainEntity["name"] == f"{root.name}/other"
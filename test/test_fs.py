@@ -0,0 +1,78 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import pytest
+from repo2rocrate.fs import FSSnapshot, DIR, FILE
+from repo2rocrate.incremental import get_input_files
+from repo2rocrate.snakemake import SnakemakeCrateBuilder, find_workflow
+
+
+def test_snapshot(tmpdir):
+    root = tmpdir / "repo"
+    (root / "a" / "b").mkdir(parents=True)
+    (root / "a" / "f.txt").write_text("foo\n")
+    (root / "link").symlink_to("a")
+    fs = FSSnapshot(root)
+    assert fs.kind("a") == DIR
+    assert fs.kind(root / "a" / "f.txt") == FILE
+    assert fs.is_file("a/f.txt")
+    assert fs.is_dir("./a/b")
+    assert fs.is_dir("link")
+    assert fs.is_file("link/f.txt")
+    assert not fs.exists("a/missing")
+    assert not fs.exists("missing/deep/path")
+    assert sorted(fs.listdir("a")) == ["b", "f.txt"]
+    with pytest.raises(NotADirectoryError):
+        fs.listdir("a/f.txt")
+    assert fs.stat("a/f.txt").st_size == 4
+    n = fs.syscalls
+    # everything is answered from memory from now on
+    (root / "a" / "new.txt").touch()
+    assert not fs.exists("a/new.txt")
+    assert fs.is_file("a/f.txt")
+    assert fs.stat("a/f.txt").st_size == 4
+    assert fs.syscalls == n
+    assert sorted(map(str, fs.scanned_dirs)) == [".", "a", "link"]
+    sub = fs.subtree("a")
+    assert sub.root == root / "a"
+    assert sub.is_file("f.txt")
+    assert not sub.exists("new.txt")
+    assert sub.stat("f.txt").st_size == 4
+    assert sub.syscalls == 0
+    assert sorted(map(str, sub.scanned_dirs)) == ["."]
+    with pytest.raises(ValueError):
+        fs.subtree("../outside")
+
+
+def test_shared_by_builder(data_dir):
+    root = data_dir / "fair-crcc-send-data"
+    builder = SnakemakeCrateBuilder(root)
+    wf_path = find_workflow(root, fs=builder.fs)
+    crate = builder.build(wf_path)
+    # one scandir per directory visited, plus one stat per symlink
+    assert builder.fs.syscalls == len(builder.fs.scanned_dirs)
+    n = builder.fs.syscalls
+    assert root / "workflow" / "Snakefile" in get_input_files(crate, builder.fs)
+    assert builder.fs.syscalls == n
+
+
+def test_relative_root(tmpdir, monkeypatch):
+    (tmpdir / "repo" / "a").mkdir(parents=True)
+    (tmpdir / "repo" / "a" / "f.txt").touch()
+    monkeypatch.chdir(tmpdir)
+    fs = FSSnapshot("repo")
+    for _ in range(2):
+        assert fs.is_file(tmpdir / "repo" / "a" / "f.txt")
+    assert fs.syscalls == 2  # absolute paths under the root are in the snapshot
@@ -12,8 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import shutil
+from pathlib import Path
+
 import pytest
-from repo2rocrate.galaxy import find_workflow, make_crate
+from repo2rocrate.galaxy import find_workflow, index_workflows, make_crate
 
 
 GALAXY_ID = "https://w3id.org/workflowhub/workflow-ro-crate#galaxy"
@@ -124,3 +127,48 @@ def test_make_crate(data_dir, defaults):
         assert entity, f"{relpath} not listed in crate metadata"
         assert entity.type == type_
         assert entity["description"] == desc
+
+
+def make_monorepo(data_dir, root):
+    """\
+    Arrange copies of the example Galaxy repository like in IWC.
+    """
+    src = data_dir / "parallel-accession-download"
+    a = root / "workflows" / "data-fetching" / "parallel-accession-download"
+    shutil.copytree(src, a)
+    b = root / "workflows" / "other" / "two-workflows"
+    shutil.copytree(src, b)
+    (b / "parallel-accession-download.ga").rename(b / "first.ga")
+    (b / "parallel-accession-download-tests.yml").rename(b / "first-tests.yml")
+    shutil.copy(b / "first.ga", b / "second.ga")
+    (b / ".dockstore.yml").write_text(
+        "version: 1.2\nworkflows:\n- name: one\n  primaryDescriptorPath: /first.ga\n"
+    )
+    # not indexed
+    for d in root / ".git", root / "workflows" / "other" / "test-data":
+        d.mkdir(parents=True)
+        (d / "hidden.ga").touch()
+    return a, b
+
+
+def test_index_workflows(data_dir, tmpdir):
+    root = tmpdir / "iwc"
+    a, b = make_monorepo(data_dir, root)
+    index = index_workflows(root)
+    assert [_.workflow for _ in index] == [
+        a / "parallel-accession-download.ga", b / "first.ga", b / "second.ga"
+    ]
+    assert [_.root for _ in index] == [a, b, b]
+    assert [_.test_definition for _ in index] == [
+        a / "parallel-accession-download-tests.yml", b / "first-tests.yml", None
+    ]
+    assert [(_.dockstore_record or {}).get("name") for _ in index] == ["main", "one", None]
+    # the builder reuses the snapshot taken while indexing
+    info = index[0]
+    n, scanned = info.fs.syscalls, set(info.fs.scanned_dirs)
+    crate = make_crate(info.root, workflow=info.workflow, fs=info.fs)
+    assert crate.mainEntity["name"] == "parallel-accession-download/main"
+    assert crate.get("test-data")
+    # except for the dataset's directory, scanned to look for a .gitignore
+    assert set(info.fs.scanned_dirs) - scanned == {Path("test-data")}
+    assert info.fs.syscalls == n + 1
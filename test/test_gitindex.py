@@ -0,0 +1,139 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import shutil
+import subprocess
+import zipfile
+
+import pytest
+from repo2rocrate.gitindex import GitIndexError, TrackedFiles, find_git_dir, read_head, read_index
+from repo2rocrate.snakemake import make_crate
+
+pytestmark = pytest.mark.skipif(not shutil.which("git"), reason="git not available")
+
+
+def git(root, *args):
+    return subprocess.run(
+        ["git", "-C", str(root), "-c", "user.name=x", "-c", "user.email=x@example.org", *args],
+        check=True, capture_output=True, text=True,
+    ).stdout
+
+
+def make_repo(root, paths):
+    root.mkdir(parents=True)
+    git(root, "init", "-q")
+    for p in paths:
+        (root / p).parent.mkdir(parents=True, exist_ok=True)
+        (root / p).write_text(p)
+    git(root, "add", *paths)
+    return root
+
+
+@pytest.mark.parametrize("version", [2, 3, 4])
+def test_read_index(tmpdir, version):
+    tracked = ["a.txt", "b/c.txt", "b/d/e.txt", "b/d/f.txt", "café/long-" + "x" * 100 + ".txt", "z"]
+    root = make_repo(tmpdir / "repo", tracked)
+    (root / "b" / "d" / "link").symlink_to("e.txt")
+    (root / "untracked.txt").touch()
+    git(root, "add", "b/d/link")
+    tracked.insert(4, "b/d/link")
+    if version == 3:
+        git(root, "update-index", "--index-version", "3", "--skip-worktree", "z")
+        tracked.remove("z")
+    else:
+        git(root, "update-index", "--index-version", str(version))
+    assert read_index(root / ".git" / "index") == tracked
+
+
+def test_read_index_invalid(tmpdir):
+    path = tmpdir / "index"
+    for data in b"", b"DIRC\0\0\0\x09\0\0\0\0", b"DIRC\0\0\0\x02\0\0\0\x01" + b"\0" * 20:
+        path.write_bytes(data)
+        with pytest.raises(GitIndexError):
+            read_index(path)
+
+
+def test_tracked_files(tmpdir):
+    root = make_repo(tmpdir / "repo", ["wf/a", "wf/sub/b", "wf/sub/c", "other/d"])
+    assert find_git_dir(root / "wf" / "sub") == (root, root / ".git")
+    assert find_git_dir(tmpdir) is None
+    with pytest.raises(GitIndexError):
+        TrackedFiles(tmpdir)
+    (root / "wf" / "sub" / "c").unlink()  # deleted, but still in the index
+    (root / "wf" / "untracked").touch()
+    tracked = TrackedFiles(root / "wf")
+    assert tracked.is_tracked(root / "wf" / "a")
+    assert not tracked.is_tracked(root / "wf" / "untracked")
+    assert tracked.has_files(root / "wf" / "sub")
+    assert not tracked.has_files(root / "w")
+    assert list(tracked.walk(root / "wf")) == [(root / "wf" / "a", "a"), (root / "wf" / "sub" / "b", "sub/b")]
+    assert list(tracked.walk(root / "wf", exclude=root / "wf" / "sub")) == [(root / "wf" / "a", "a")]
+    assert list(tracked.walk(root / "wf", ignore=lambda relpath, is_dir: relpath == "sub")) == [(root / "wf" / "a", "a")]
+    # linked worktree: .git is a file
+    git(root, "commit", "-qm", "init")
+    git(root, "worktree", "add", "-q", str(tmpdir / "wt"))
+    assert find_git_dir(tmpdir / "wt")[0] == tmpdir / "wt"
+    assert TrackedFiles(tmpdir / "wt").paths == ["other/d", "wf/a", "wf/sub/b", "wf/sub/c"]
+
+
+def test_make_crate(data_dir, tmpdir):
+    root = tmpdir / "fair-crcc-send-data"
+    shutil.copytree(data_dir / root.name, root)
+    git(root, "init", "-q")
+    git(root, "add", ".")
+    for relpath in ".snakemake/log/run.log", "workflow/scripts/__pycache__/x.pyc", "results/out.txt":
+        (root / relpath).parent.mkdir(parents=True, exist_ok=True)
+        (root / relpath).touch()
+    crate = make_crate(root, tracked_only=True)
+    assert crate.get("workflow/scripts")
+    assert not crate.get("resources")
+    assert not crate.get("results")
+    out = tmpdir / "crate.zip"
+    crate.write_zip(out)
+    with zipfile.ZipFile(out) as zf:
+        names = zf.namelist()
+    assert "workflow/Snakefile" in names
+    assert not any("__pycache__" in _ or _.startswith(("resources", "results", ".snakemake")) for _ in names)
+
+
+def test_read_head(tmpdir):
+    root = make_repo(tmpdir / "repo", ["a"])
+    assert read_head(root / ".git") is None  # no commits yet
+    git(root, "commit", "-qm", "init")
+    commit = git(root, "rev-parse", "HEAD").strip()
+    assert read_head(root / ".git") == commit
+    git(root, "pack-refs", "--all")
+    assert not any((root / ".git" / "refs" / "heads").iterdir())
+    assert read_head(root / ".git") == commit
+    git(root, "worktree", "add", "-q", "--detach", str(tmpdir / "wt"))
+    assert read_head(find_git_dir(tmpdir / "wt")[1]) == commit
+    git(tmpdir / "wt", "commit", "-q", "--allow-empty", "-m", "next")
+    assert read_head(find_git_dir(tmpdir / "wt")[1]) == git(tmpdir / "wt", "rev-parse", "HEAD").strip() != commit
+    assert read_head(tmpdir / "missing") is None
+
+
+def test_read_index_unsupported(tmpdir):
+    paths = [f"d/f{i}" for i in range(6)]
+    root = make_repo(tmpdir / "split", paths)
+    git(root, "commit", "-qm", "init")
+    git(root, "update-index", "--split-index")
+    (root / "d" / "f6").write_text("f6")
+    git(root, "add", "d/f6")
+    with pytest.raises(GitIndexError, match="split index"):
+        read_index(root / ".git" / "index")
+    root = make_repo(tmpdir / "sparse", ["a/x", "b/y"])
+    git(root, "commit", "-qm", "init")
+    git(root, "sparse-checkout", "set", "--cone", "--sparse-index", "a")
+    with pytest.raises(GitIndexError, match="sparse index"):
+        read_index(root / ".git" / "index")
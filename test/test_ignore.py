@@ -0,0 +1,169 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import shutil
+import subprocess
+import zipfile
+
+import pytest
+from repo2rocrate.fs import FSSnapshot
+from repo2rocrate.ignore import IGNORE_FILE_BASENAME, IgnoreRules, translate
+from repo2rocrate.output import walk_files
+from repo2rocrate.snakemake import make_crate
+
+PATTERNS = [
+    "# comment",
+    "",
+    "*.log",
+    "!keep.log",
+    "/build",
+    "cache/",
+    "docs/**/*.tmp",
+    "**/tmp",
+    "out/**",
+    "!out/summary.txt",
+    "data?.csv",
+    "img[0-9].png",
+    "x[!a-c]",
+    "\\#hash",
+    "\\!bang",
+    "trailing\\ ",
+    "a/b",
+]
+PATHS = [
+    "run.log", "sub/run.log", "keep.log", "sub/keep.log", "build", "sub/build",
+    "cache", "sub/cache", "docs/a.tmp", "docs/x/y/a.tmp", "tmp", "sub/tmp", "out/a",
+    "out/summary.txt", "out", "data1.csv", "data10.csv", "img5.png", "imgx.png", "xd",
+    "xa", "#hash", "!bang", "trailing ", "a/b", "sub/a/b", "README.md",
+]
+
+
+def test_translate():
+    assert translate("# comment") is None
+    assert translate("   ") is None
+    assert translate("/") is None
+    assert translate("!foo/") == ("foo", True, True, True)
+    assert translate("/a/b") == ("a/b", False, False, False)
+    assert translate("*.py") == ("[^/]*\\.py", False, False, True)
+    assert translate("**/tmp") == ("tmp", False, False, True)
+    assert translate("a/**/b/**") == ("a/(?:.*/)?b/.*", False, False, False)
+
+
+@pytest.mark.parametrize("is_dir", [False, True])
+def test_match(is_dir):
+    rules = IgnoreRules("/repo", PATTERNS)
+    ignored = {_ for _ in PATHS if rules.match(_, is_dir=is_dir)}
+    expected = {
+        "run.log", "sub/run.log", "build", "docs/a.tmp", "docs/x/y/a.tmp", "tmp", "sub/tmp",
+        "out/a", "data1.csv", "img5.png", "xd", "#hash", "!bang", "trailing ", "a/b",
+    }
+    if is_dir:
+        expected |= {"cache", "sub/cache"}
+    assert ignored == expected
+
+
+@pytest.mark.skipif(not shutil.which("git"), reason="git not available")
+def test_match_git(tmpdir):
+    root = tmpdir / "repo"
+    root.mkdir()
+    subprocess.run(["git", "init", "-q", str(root)], check=True)
+    (root / ".gitignore").write_text("\n".join(PATTERNS) + "\n")
+    out = subprocess.run(
+        ["git", "-C", str(root), "check-ignore", "--no-index", "--stdin", "-z"],
+        input="\0".join(PATHS), capture_output=True, text=True,
+    ).stdout
+    rules = IgnoreRules.load(root)
+    assert {_ for _ in PATHS if rules.match(_)} == set(out.split("\0")) - {""}
+
+
+@pytest.mark.skipif(not shutil.which("git"), reason="git not available")
+def test_load_git(tmpdir):
+    top = tmpdir / "repo"
+    root = top / "wf"
+    (root / "sub" / "deep").mkdir(parents=True)
+    subprocess.run(["git", "init", "-q", str(top)], check=True)
+    (top / ".git" / "info" / "exclude").write_text("*.bak\n*.tmp\n")
+    (top / ".gitignore").write_text("*.log\n/wf/top-only\n")
+    (root / ".gitignore").write_text("!*.tmp\nlocal/\n")
+    (root / "sub" / ".gitignore").write_text("!keep.log\n/anchored\n")
+    (root / "sub" / "deep" / ".gitignore").write_text("*.txt\n")
+    paths = [
+        "a.bak", "a.tmp", "a.log", "top-only", "local/x", "sub/keep.log", "sub/other.log", "sub/anchored",
+        "anchored", "sub/deep/anchored", "sub/deep/a.txt", "sub/a.txt", "sub/deep/keep.log", "README.md",
+    ]
+    out = subprocess.run(
+        ["git", "-C", str(root), "check-ignore", "--no-index", "--stdin", "-z"],
+        input="\0".join(paths), capture_output=True, text=True,
+    ).stdout
+    fs = FSSnapshot(root)
+    rules = IgnoreRules.load(root, fs=fs)
+    assert {_ for _ in paths if rules.is_ignored(_)} == set(out.split("\0")) - {""}
+    assert {top / ".gitignore", root / ".gitignore", root / "sub" / ".gitignore"} <= set(fs.tracked)
+    (root / IGNORE_FILE_BASENAME).write_text("README.md\n!a.log\n")
+    rules = IgnoreRules.load(root)
+    assert rules.is_ignored("README.md")
+    assert not rules.is_ignored("a.log")
+
+
+def test_is_ignored():
+    rules = IgnoreRules("/repo", ["out/", "!out/keep.txt", "logs/*", "!logs/keep.txt"])
+    assert rules.is_ignored("out", is_dir=True)
+    assert rules.is_ignored("out/keep.txt")  # parent directory excluded
+    assert not rules.is_ignored("logs", is_dir=True)
+    assert rules.is_ignored("logs/a.txt")
+    assert not rules.is_ignored("logs/keep.txt")
+    assert rules.is_ignored("sub/out/x/y.txt")
+
+
+def test_load(tmpdir):
+    assert not IgnoreRules.load(tmpdir).match("a.txt")
+    (tmpdir / ".gitignore").write_text("*.txt\n")
+    (tmpdir / IGNORE_FILE_BASENAME).write_text("!keep.txt\n")
+    fs = FSSnapshot(tmpdir)
+    rules = IgnoreRules.load(tmpdir, fs=fs)
+    assert rules.match("a.txt")
+    assert not rules.match("keep.txt")
+    assert set(fs.tracked) == {tmpdir / ".gitignore", tmpdir / IGNORE_FILE_BASENAME}
+
+
+def test_walk(tmpdir):
+    for relpath in "a.txt", "b.log", "sub/c.txt", "sub/d.log", "skip/e.txt", "deep/skip/f.txt":
+        (tmpdir / relpath).parent.mkdir(parents=True, exist_ok=True)
+        (tmpdir / relpath).touch()
+    rules = IgnoreRules(tmpdir, ["*.log", "skip/"])
+    assert [_[1] for _ in walk_files(tmpdir, ignore=rules.relative_to(tmpdir))] == ["a.txt", "sub/c.txt"]
+    assert [_[1] for _ in walk_files(tmpdir / "sub", ignore=rules.relative_to(tmpdir / "sub"))] == ["c.txt"]
+    assert list(walk_files(tmpdir / "skip", ignore=rules.relative_to(tmpdir / "skip"))) == []
+    assert rules.relative_to(tmpdir.parent) is None
+
+
+def test_make_crate(data_dir, tmpdir):
+    root = tmpdir / "fair-crcc-send-data"
+    shutil.copytree(data_dir / root.name, root)
+    # .gitignore has "results/**" and ".snakemake"
+    for relpath in "results/out.txt", "resources/ref.fa", "resources/ref.fa.fai", "workflow/scripts/x.pyc":
+        (root / relpath).parent.mkdir(parents=True, exist_ok=True)
+        (root / relpath).touch()
+    (root / IGNORE_FILE_BASENAME).write_text("*.fai\n*.pyc\n")
+    crate = make_crate(root)
+    assert not crate.get("results")
+    assert crate.get("resources")
+    out = tmpdir / "crate.zip"
+    crate.write_zip(out)
+    with zipfile.ZipFile(out) as zf:
+        names = zf.namelist()
+    assert "resources/ref.fa" in names
+    assert not any(_.endswith((".fai", ".pyc")) or _.startswith("results") for _ in names)
+    crate = make_crate(root, honor_ignore=False)
+    assert crate.get("results")
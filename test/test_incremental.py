@@ -0,0 +1,127 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import shutil
+import subprocess
+
+import pytest
+from click.testing import CliRunner
+from rocrate.rocrate import ROCrate
+from repo2rocrate.cli import cli
+from repo2rocrate.incremental import STATE_BASENAME, load_state
+
+UP_TO_DATE = "metadata is up to date"
+
+
+def git(root, *args):
+    return subprocess.run(
+        ["git", "-C", str(root), "-c", "user.name=x", "-c", "user.email=x@example.org", *args],
+        check=True, capture_output=True, text=True,
+    ).stdout
+
+
+def test_incremental(data_dir, tmpdir):
+    repo_name = "fair-crcc-send-data"
+    root = tmpdir / repo_name
+    shutil.copytree(data_dir / repo_name, root)
+    runner = CliRunner()
+    args = ["-r", str(root), "--incremental", "--hash-inputs"]
+    result = runner.invoke(cli, args)
+    assert result.exit_code == 0, result.output
+    assert UP_TO_DATE not in result.output
+    state = load_state(root)
+    assert "workflow/Snakefile" in state["fingerprint"]["files"]
+    assert "workflow" in state["fingerprint"]["dirs"]
+    result = runner.invoke(cli, args)
+    assert result.exit_code == 0
+    assert UP_TO_DATE in result.output
+    # touched, but not changed
+    wf_path = root / "workflow" / "Snakefile"
+    st = wf_path.stat()
+    os.utime(wf_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    result = runner.invoke(cli, args)
+    assert UP_TO_DATE in result.output
+    # new mtime saved, so the file is not hashed again
+    assert load_state(root)["fingerprint"]["files"]["workflow/Snakefile"][0] == st.st_mtime_ns + 10**9
+    # different options
+    result = runner.invoke(cli, args + ["--wf-version", "1.0"])
+    assert UP_TO_DATE not in result.output
+    assert ROCrate(root).mainEntity["version"] == "1.0"
+    args.extend(["--wf-version", "1.0"])
+    # changed contents
+    wf_path.write_text(wf_path.read_text().replace('min_version("6.5.0")', 'min_version("7.0.0")'))
+    result = runner.invoke(cli, args)
+    assert UP_TO_DATE not in result.output
+    assert ROCrate(root).mainEntity["programmingLanguage"]["version"] == "7.0.0"
+    # new data entity
+    (root / "resources").mkdir()
+    result = runner.invoke(cli, args)
+    assert UP_TO_DATE not in result.output
+    assert ROCrate(root).get("resources")
+    result = runner.invoke(cli, args)
+    assert UP_TO_DATE in result.output
+
+
+def test_incremental_not_in_place(data_dir, tmpdir):
+    root = data_dir / "fair-crcc-send-data"
+    runner = CliRunner()
+    result = runner.invoke(cli, ["-r", str(root), "-o", str(tmpdir / "crate"), "--incremental"])
+    assert result.exit_code != 0
+    assert not (root / STATE_BASENAME).exists()
+
+
+@pytest.mark.skipif(not shutil.which("git"), reason="git not available")
+def test_incremental_new_commit(data_dir, tmpdir):
+    repo_name = "fair-crcc-send-data"
+    root = tmpdir / repo_name
+    shutil.copytree(data_dir / repo_name, root)
+    git(root, "init", "-q")
+    git(root, "add", ".")
+    git(root, "commit", "-qm", "init")
+    runner = CliRunner()
+    args = ["-r", str(root), "--incremental", "--reference-only", "--repo-url", f"https://github.com/crs4/{repo_name}"]
+    result = runner.invoke(cli, args)
+    assert result.exit_code == 0, result.output
+    result = runner.invoke(cli, args)
+    assert UP_TO_DATE in result.output
+    git(root, "commit", "-q", "--allow-empty", "-m", "next")
+    commit = git(root, "rev-parse", "HEAD").strip()
+    result = runner.invoke(cli, args)
+    assert UP_TO_DATE not in result.output
+    assert commit in ROCrate(root).mainEntity.id
+    assert load_state(root)["fingerprint"]["head"] == commit
+
+
+@pytest.mark.skipif(not shutil.which("git"), reason="git not available")
+def test_incremental_tracked_only(data_dir, tmpdir):
+    repo_name = "fair-crcc-send-data"
+    root = tmpdir / repo_name
+    shutil.copytree(data_dir / repo_name, root)
+    git(root, "init", "-q")
+    git(root, "add", "workflow")
+    (root / "resources").mkdir()
+    (root / "resources" / "data.txt").write_text("data")
+    runner = CliRunner()
+    args = ["-r", str(root), "--incremental", "--tracked-only"]
+    result = runner.invoke(cli, args)
+    assert result.exit_code == 0, result.output
+    assert not ROCrate(root).get("resources")
+    result = runner.invoke(cli, args)
+    assert UP_TO_DATE in result.output
+    git(root, "add", "resources")
+    result = runner.invoke(cli, args)
+    assert UP_TO_DATE not in result.output
+    assert ROCrate(root).get("resources")
@@ -0,0 +1,70 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import zipfile
+
+import pytest
+from repo2rocrate import jsonld
+from repo2rocrate.jsonld import StreamingMetadata, iter_document
+from repo2rocrate.snakemake import make_crate
+
+ENTITIES = [
+    {"@id": "./", "@type": "Dataset", "hasPart": [{"@id": "a b.txt"}], "name": "café \U0001F600"},
+    {"@id": "a b.txt", "@type": ["File", "SoftwareSourceCode"], "description": "x\n\t\"y\"\\ \x01 \x7f   </"},
+    {"@id": "#n", "value": 1.5, "big": 1e16, "neg": -0.0, "ints": [1, 2**70], "flags": [True, False, None]},
+    {"@id": "#k", "1": "str key", "nested": {"z": [], "a": {}, "m": [{"b": 1, "a": [[]]}]}},
+    {"@id": "#empty"},
+]
+
+
+def expected(content):
+    return json.dumps(content, indent=4, sort_keys=True, ensure_ascii=False).encode("utf-8")
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    if request.param == "orjson":
+        if jsonld.orjson is None:
+            pytest.skip("orjson not installed")
+    else:
+        monkeypatch.setattr(jsonld, "orjson", None)
+    return request.param
+
+
+@pytest.mark.parametrize("context", [
+    "https://w3id.org/ro/crate/1.1/context",
+    ["https://w3id.org/ro/crate/1.1/context", {"foo": "https://example.org/foo"}],
+])
+def test_iter_document(encoder, context):
+    for entities in ENTITIES, ENTITIES[:1], []:
+        for batch_size in 1, 2, 256:
+            out = b"".join(iter_document(context, iter(entities), batch_size=batch_size))
+            assert out == expected({"@context": context, "@graph": entities})
+
+
+def test_metadata(encoder, data_dir, tmpdir):
+    crate = make_crate(data_dir / "fair-crcc-send-data")
+    assert isinstance(crate.metadata, StreamingMetadata)
+    crate.metadata.extra_terms = {"foo": "https://example.org/foo"}
+    content = expected(crate.metadata.generate())
+    chunks = [_ for _ in crate.metadata.stream(chunk_size=1000)]
+    assert len(chunks) > 1
+    assert {_[0] for _ in chunks} == {"ro-crate-metadata.json"}
+    assert b"".join(_[1] for _ in chunks) == content
+    crate.metadata.write(tmpdir)
+    assert (tmpdir / "ro-crate-metadata.json").read_bytes() == content
+    crate.write_zip(tmpdir / "crate.zip")
+    with zipfile.ZipFile(tmpdir / "crate.zip") as zf:
+        assert zf.read("ro-crate-metadata.json") == content
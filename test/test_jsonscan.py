@@ -0,0 +1,74 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import json
+
+import pytest
+from repo2rocrate import jsonscan
+from repo2rocrate.jsonscan import load_keys
+
+
+DOC = {
+    "a_galaxy_workflow": "true",
+    "steps": {
+        str(i): {
+            "id": i,
+            "tool_state": json.dumps({"x": "a \"quoted\" {brace} [bracket]", "n": None}),
+            "annotation": "café \\ ☃",
+            "position": {"left": 1.5e3, "top": -2},
+            "input_connections": {"in": [{"id": i - 1, "output_name": "out"}]} if i else {},
+        } for i in range(50)
+    },
+    "creator": [{"class": "Person", "name": "Jane \"JD\" Doe"}],
+    "license": "MIT",
+    "empty": {},
+    "flags": [True, False, None, 0, -1.25e-3],
+    "release": "0.1.3",
+    "tags": [],
+}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 16])
+@pytest.mark.parametrize("indent", [None, 4])
+def test_load_keys(monkeypatch, chunk_size, indent):
+    monkeypatch.setattr(jsonscan, "CHUNK_SIZE", chunk_size)
+    text = json.dumps(DOC, indent=indent)
+    for keys in ["release", "license", "creator"], ["flags", "empty", "tags", "steps"], ["missing", "license"]:
+        assert load_keys(io.StringIO(text), keys) == {k: DOC[k] for k in keys if k in DOC}
+    assert load_keys(io.StringIO(text), []) == {}
+    assert load_keys(io.StringIO(" {} "), ["release"]) == {}
+    assert load_keys(io.StringIO("[1, 2]"), ["release"]) == {}
+
+
+def test_stop_early():
+    text = json.dumps(dict(release="1.0", steps={str(i): {"id": i} for i in range(10000)}))
+    f = io.StringIO(text)
+    assert load_keys(f, ["release"]) == {"release": "1.0"}
+    assert f.tell() == jsonscan.CHUNK_SIZE < len(text)
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "{",
+    '{"release": }',
+    '{"release" "1.0"}',
+    '{"steps": {"1": [}, "release": "1.0"}',
+    '{"steps": "unterminated, "release": "1.0"}',
+    '{"steps": 1 "release": "1.0"}',
+    '{release: "1.0"}',
+])
+def test_invalid(text):
+    with pytest.raises(json.JSONDecodeError):
+        load_keys(io.StringIO(text), ["release"])
@@ -0,0 +1,149 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+import pytest
+from repo2rocrate.nfconfig import load_config, parse_config, parse_config_file, tokenize
+from repo2rocrate.nextflow import get_metadata
+
+CONFIG = """\
+// comment with manifest { name = 'nope' }
+/* block comment
+manifest.name = 'nope'
+*/
+params {
+    outdir = null
+    publish_dir_mode = 'copy'
+}
+
+manifest   {
+    name = 'nf-core/foo'
+    author = \"\"\"Jane Doe, John Doe\"\"\"
+    homePage = "https://github.com/nf-core/foo"; mainScript = 'main.nf'
+    description = \"\"\"A pipeline
+spanning lines\"\"\"
+    doi = "${params.doi}"
+    contributors = [
+        [name: 'Jane Doe', affiliation: 'X'],
+    ]
+}
+manifest.version = '1.0.0'
+manifest.nextflowVersion = '!>=23.04.0' + suffix
+
+def check_max(obj, type) {
+    manifest { name = 'nope' }
+    return obj
+}
+process {
+    cpus = { check_max(1 * task.attempt, 'cpus') }
+    withName: 'FOO|BAR' {
+        ext.args = '--foo'
+    }
+}
+profiles {
+    test { manifest.name = 'nope' }
+}
+try {
+    manifest.defaultBranch = 'main'
+} catch (Exception e) {
+    System.err.println("WARNING: ${e}")
+}
+"""
+
+
+def test_tokenize():
+    assert tokenize("a.b = 'x' // c\n\n\nf(\n1,\n2\n) { }") == [
+        ("name", "a"), ("op", "."), ("name", "b"), ("op", "="), ("str", "'x'"), ("nl", "\n"),
+        ("name", "f"), ("op", "("), ("num", "1"), ("op", ","), ("num", "2"), ("op", ")"),
+        ("op", "{"), ("op", "}"),
+    ]
+
+
+def test_parse_config():
+    settings = {".".join(k): v for _, k, v in parse_config(CONFIG)}
+    assert settings == {
+        "params.publish_dir_mode": "copy",
+        "manifest.name": "nf-core/foo",
+        "manifest.author": "Jane Doe, John Doe",
+        "manifest.homePage": "https://github.com/nf-core/foo",
+        "manifest.mainScript": "main.nf",
+        "manifest.description": "A pipeline\nspanning lines",
+        "manifest.version": "1.0.0",
+        "process.withName:'FOO|BAR'.ext.args": "--foo",
+        "profiles.test.manifest.name": "nope",
+        "manifest.defaultBranch": "main",
+    }
+
+
+def test_get_metadata(tmpdir):
+    config = tmpdir / "nextflow.config"
+    config.write_text(CONFIG)
+    assert get_metadata(config) == {
+        "name": "nf-core/foo",
+        "author": "Jane Doe, John Doe",
+        "homePage": "https://github.com/nf-core/foo",
+        "mainScript": "main.nf",
+        "description": "A pipeline\nspanning lines",
+        "version": "1.0.0",
+        "defaultBranch": "main",
+    }
+
+
+def test_include(tmpdir):
+    (tmpdir / "conf").mkdir()
+    config = tmpdir / "nextflow.config"
+    config.write_text(
+        "manifest.name = 'main'\n"
+        "manifest.version = '1.0'\n"
+        "includeConfig 'conf/base.config'\n"
+        "manifest.version = '2.0'\n"
+        "profiles { test { includeConfig 'conf/test.config' } }\n"
+        "includeConfig \"${params.custom_config_base}/custom.config\"\n"
+        "includeConfig 'conf/missing.config'\n"
+    )
+    (tmpdir / "conf" / "base.config").write_text(
+        "manifest {\n    name = 'base'\n    version = '1.5'\n    author = 'me'\n}\n"
+        "includeConfig('modules.config')\n"
+    )
+    (tmpdir / "conf" / "modules.config").write_text("manifest.description = 'modules'\nincludeConfig 'base.config'\n")
+    (tmpdir / "conf" / "test.config").write_text("manifest.name = 'test'\nparams.input = 'x.csv'\n")
+    settings, files = load_config(config)
+    assert settings == {
+        "manifest.name": "base",
+        "manifest.version": "2.0",
+        "manifest.author": "me",
+        "manifest.description": "modules",
+        "profiles.test.manifest.name": "test",
+        "profiles.test.params.input": "x.csv",
+    }
+    assert files == [
+        config,
+        tmpdir / "conf" / "base.config",
+        tmpdir / "conf" / "modules.config",
+        tmpdir / "conf" / "test.config",
+    ]
+    with pytest.raises(OSError):
+        load_config(tmpdir / "missing.config")
+
+
+def test_cache(tmpdir):
+    config = tmpdir / "nextflow.config"
+    config.write_text("manifest.name = 'foo'\n")
+    statements = parse_config_file(config)
+    assert parse_config_file(config) is statements
+    st = config.stat()
+    config.write_text("manifest.name = 'bar'\n")
+    os.utime(config, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert parse_config_file(config) == [("set", ("manifest", "name"), "bar")]
@@ -0,0 +1,121 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import errno
+import os
+import sys
+
+import pytest
+from repo2rocrate import output
+from repo2rocrate.output import copy_file, materialize_file, WriteStats
+from repo2rocrate.nextflow import make_crate as make_nf_crate
+from repo2rocrate.snakemake import make_crate
+from rocrate.rocrate import ROCrate
+
+
+def _fail(*args):
+    raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+
+
+@pytest.mark.parametrize("disabled", [[], ["copy_file_range"], ["copy_file_range", "sendfile"]])
+def test_copy_file(tmpdir, monkeypatch, disabled):
+    for name in disabled:
+        monkeypatch.setattr(os, name, _fail)
+    src = tmpdir / "src.sh"
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    src.write_bytes(data)
+    src.chmod(0o750)
+    dst = tmpdir / "dst.sh"
+    assert copy_file(src, dst) == len(data)
+    assert dst.read_bytes() == data
+    assert dst.stat().st_mode & 0o777 == 0o750
+
+
+def test_write_dir(data_dir, tmpdir):
+    root = data_dir / "fair-crcc-send-data"
+    crate = make_crate(root)
+    crate_dir = tmpdir / "crate"
+    stats = crate.write(crate_dir, jobs=3)
+    assert isinstance(stats, WriteStats)
+    ref_dir = tmpdir / "ref"
+    ROCrate.write(crate, ref_dir)
+
+    def listing(top):
+        return sorted(str(p.relative_to(top)) for p in top.rglob("*"))
+
+    assert listing(crate_dir) == listing(ref_dir)
+    files = [_ for _ in crate_dir.rglob("*") if _.is_file() and _.name != "ro-crate-metadata.json"]
+    assert stats.files == len(files)
+    assert stats.bytes == sum(_.stat().st_size for _ in files)
+    assert stats.bytes_per_second > 0
+    for p in files:
+        assert p.read_bytes() == (root / p.relative_to(crate_dir)).read_bytes()
+
+
+def test_write_dir_inside_source(tmpdir):
+    root = tmpdir / "repo"
+    root.mkdir()
+    (root / "main.nf").touch()
+    (root / "nextflow.config").write_text("manifest { name = 'foo' }\n")
+    (root / "assets").mkdir()
+    (root / "assets" / "a.txt").write_text("a\n")
+    crate = make_nf_crate(root)
+    crate_dir = root / "assets" / "crate"
+    output.write_crate(crate, root, crate_dir)
+    assert (crate_dir / "assets" / "a.txt").is_file()
+    assert not (crate_dir / "assets" / "crate").exists()
+
+
+@pytest.mark.parametrize("mode", ["hardlink", "symlink", "reflink"])
+def test_materialize(data_dir, tmpdir, mode):
+    root = data_dir / "fair-crcc-send-data"
+    crate = make_crate(root, materialize=mode)
+    crate_dir = tmpdir / "crate"
+    stats = crate.write(crate_dir)
+    for relpath in "LICENSE", "workflow/Snakefile", "workflow/rules/common.smk":
+        src, dst = root / relpath, crate_dir / relpath
+        assert dst.read_bytes() == src.read_bytes()
+        if mode == "hardlink":
+            assert dst.stat().st_ino == src.stat().st_ino
+        elif mode == "symlink":
+            assert dst.is_symlink()
+    if mode != "reflink":  # not supported by all file systems
+        assert stats.linked == stats.files
+        assert stats.bytes == 0
+    # rewriting with copies replaces the links instead of writing through them
+    stats = crate.write(crate_dir, materialize="copy")
+    assert stats.linked == 0
+    dst = crate_dir / "LICENSE"
+    assert not dst.is_symlink()
+    assert dst.stat().st_ino != (root / "LICENSE").stat().st_ino
+    assert dst.read_bytes() == (root / "LICENSE").read_bytes()
+
+
+def test_materialize_fallback(data_dir, tmpdir, monkeypatch):
+    monkeypatch.setattr(os, "link", _fail)
+    crate = make_crate(data_dir / "fair-crcc-send-data", materialize="hardlink")
+    stats = crate.write(tmpdir / "crate")
+    assert stats.linked == 0
+    assert stats.bytes > 0
+    with pytest.raises(ValueError):
+        make_crate(data_dir / "fair-crcc-send-data", materialize="foo")
+
+
+def test_reflink_without_fcntl(tmpdir, monkeypatch):
+    src, dst = tmpdir / "src", tmpdir / "dst"
+    src.write_bytes(b"foo")
+    monkeypatch.setitem(sys.modules, "fcntl", None)  # import fails, as on Windows
+    assert materialize_file(src, dst, mode="reflink") == (3, False)
+    assert dst.read_bytes() == b"foo"
@@ -0,0 +1,100 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import shutil
+
+import pytest
+from click.testing import CliRunner
+from repo2rocrate import find_workflow, LANG_MODULES
+from repo2rocrate.cli import cli
+from repo2rocrate.nfconfig import load_config
+from repo2rocrate.output import write_crate
+from repo2rocrate.profile import phase, Profiler, subscribe, unsubscribe
+
+PHASES = ["detection", "add_workflow", "add_test_suite", "add_data_entities", "add_digests", "write"]
+
+
+def test_phase():
+    records = []
+    subscribe(records.append)
+    try:
+        with phase("foo") as p:
+            p.add(files=1, bytes=10)
+            p.add(files=2)
+        with pytest.raises(KeyError):
+            with phase("bar"):
+                raise KeyError("x")
+    finally:
+        unsubscribe(records.append)
+    with phase("baz"):
+        pass
+    assert [_.name for _ in records] == ["foo", "bar"]
+    assert records[0].counters == {"files": 3, "bytes": 10}
+    assert all(_.seconds >= 0 for _ in records)
+
+
+def test_profiler():
+    with Profiler() as profiler:
+        for i in range(3):
+            with phase("foo") as p:
+                p.add(files=i)
+        with phase("bar") as p:
+            p.add(bytes=100, dirs=2)
+    with phase("foo"):
+        pass
+    assert list(profiler.phases) == ["foo", "bar"]
+    assert profiler.phases["foo"].counters == {"files": 3}
+    assert profiler.phases["bar"].counters == {"bytes": 100, "dirs": 2}
+    lines = profiler.report().splitlines()
+    assert len(lines) == 4
+    foo, bar = lines[1].split(), lines[2].split()
+    assert foo[:1] + foo[2:] == ["foo", "3", "0"]
+    assert bar[:1] + bar[2:] == ["bar", "0", "100", "dirs=2"]
+    assert lines[-1].startswith("total")
+
+
+@pytest.mark.parametrize("output", [None, "crate", "crate.zip"])
+def test_build_phases(data_dir, tmpdir, output):
+    repo_name = "nf-core-foobar"
+    root = tmpdir / repo_name
+    shutil.copytree(data_dir / repo_name, root)
+    with Profiler() as profiler:
+        lang, workflow = find_workflow(root)
+        crate = LANG_MODULES[lang].make_crate(root, workflow=workflow)
+        write_crate(crate, root, tmpdir / output if output else None)
+    assert list(profiler.phases) == PHASES
+    counters = {k: v.counters for k, v in profiler.phases.items()}
+    assert counters["detection"]["files"] == 1
+    # main.nf and the config files
+    inputs = [root / "main.nf"] + load_config(root / "nextflow.config")[1]
+    assert counters["add_workflow"]["files"] == len(inputs)
+    assert counters["add_workflow"]["bytes"] == sum(_.stat().st_size for _ in inputs)
+    assert counters["add_data_entities"]["entities"] > counters["add_data_entities"]["files"] > 0
+    assert counters["add_digests"]["files"] > counters["add_data_entities"]["files"]
+    if output:
+        assert counters["write"]["files"] > counters["add_digests"]["files"]
+        assert counters["write"]["bytes"] > counters["add_digests"]["bytes"]
+    else:
+        assert counters["write"]["files"] == 1
+
+
+def test_cli(data_dir, tmpdir):
+    repo_name = "parallel-accession-download"
+    root = tmpdir / repo_name
+    shutil.copytree(data_dir / repo_name, root)
+    runner = CliRunner()
+    result = runner.invoke(cli, ["-r", str(root), "-o", str(tmpdir / "crate.zip"), "--profile"])
+    assert result.exit_code == 0, result.output
+    names = [_.split()[0] for _ in result.output.splitlines() if _.strip()]
+    assert names[names.index("phase") + 1:] == PHASES + ["total"]
@@ -0,0 +1,62 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import shutil
+import subprocess
+import warnings
+import zipfile
+
+import pytest
+from repo2rocrate.snakemake import make_crate
+
+REPO_URL = "https://github.com/crs4/fair-crcc-send-data"
+
+
+@pytest.mark.skipif(not shutil.which("git"), reason="git not available")
+def test_github(data_dir, tmpdir):
+    root = tmpdir / "fair-crcc-send-data"
+    shutil.copytree(data_dir / root.name, root)
+    git_args = ["git", "-C", str(root), "-c", "user.name=x", "-c", "user.email=x@example.org"]
+    for args in ["init", "-q"], ["add", "."], ["commit", "-qm", "init"]:
+        subprocess.run(git_args + args, check=True)
+    commit = subprocess.run(git_args + ["rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip()
+    crate = make_crate(root, repo_url=REPO_URL, reference_only=True)
+    raw = f"https://raw.githubusercontent.com/crs4/fair-crcc-send-data/{commit}"
+    tree = f"https://github.com/crs4/fair-crcc-send-data/tree/{commit}"
+    workflow = crate.mainEntity
+    assert workflow.id == f"{raw}/workflow/Snakefile"
+    assert "ComputationalWorkflow" in workflow.type
+    assert workflow["image"].id == f"{raw}/images/rulegraph.svg"
+    assert crate.get(f"{raw}/LICENSE")
+    assert crate.get(f"{tree}/workflow/rules/")
+    assert all(_.id.startswith((raw, tree)) for _ in crate.data_entities)
+    assert workflow in crate.root_dataset["hasPart"]
+    out = tmpdir / "crate.zip"
+    crate.write_zip(out)
+    with zipfile.ZipFile(out) as zf:
+        assert zf.namelist() == ["ro-crate-metadata.json"]
+
+
+def test_relative(data_dir, tmpdir):
+    root = tmpdir / "fair-crcc-send-data"
+    shutil.copytree(data_dir / root.name, root)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        crate = make_crate(root, repo_url=REPO_URL, reference_only=True)  # not a git working tree
+        out = tmpdir / "crate"
+        crate.write(out)
+    assert crate.mainEntity.id == "workflow/Snakefile"
+    assert crate.get("config/")
+    assert "sha256" not in crate.mainEntity
+    assert [_.name for _ in out.iterdir()] == ["ro-crate-metadata.json"]
@@ -0,0 +1,159 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import http.client
+import io
+import json
+import os
+import socket
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from repo2rocrate.service import CrateService, RequestError, make_server, parse_request
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, path):
+        super().__init__("localhost")
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+
+
+@pytest.fixture(scope="module")
+def service():
+    with CrateService(jobs=2, max_queue=0) as service:
+        yield service
+
+
+def serve(service, **kwargs):
+    server = make_server(service, quiet=True, **kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def request(conn, method, path, body=None):
+    data = None if body is None else json.dumps(body)
+    conn.request(method, path, body=data, headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    return response.status, response.getheader("Content-Type"), response.read()
+
+
+def test_parse_request(data_dir):
+    root = str(data_dir / "fair-crcc-send-data")
+    kwargs = parse_request(json.dumps({"root": root, "wf_version": "1.0", "max_file_size": "1K"}))
+    assert kwargs == {
+        "root": root, "lang": None, "workflow": None, "format": "metadata",
+        "wf_version": "1.0", "max_file_size": 1024,
+    }
+    for wf in "workflow/Snakefile", f"{root}/workflow/Snakefile":
+        kwargs = parse_request(json.dumps({"root": root, "workflow": wf}))
+        assert kwargs["workflow"] == data_dir / "fair-crcc-send-data" / "workflow" / "Snakefile"
+    for body in (
+        "[", "[]", {}, {"root": "relative"}, {"root": str(data_dir / "foo")}, {"root": root, "lang": "cwl"},
+        {"root": root, "format": "tar"}, {"root": root, "workflow": "../x/Snakefile"},
+        {"root": root, "workflow": "/etc/passwd"}, {"root": root, "workflow": 1}, {"root": root, "output": "/tmp"}, {"root": root, "max_file_size": "x"},
+    ):
+        with pytest.raises(RequestError):
+            parse_request(body if isinstance(body, str) else json.dumps(body))
+
+
+def test_tcp(service, data_dir):
+    server = serve(service)
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_port)
+    try:
+        root = data_dir / "fair-crcc-send-data"
+        status, content_type, data = request(conn, "POST", "/crate", {"root": str(root), "wf_version": "1.0"})
+        assert status == 200, data
+        assert content_type == "application/ld+json"
+        graph = {_["@id"]: _ for _ in json.loads(data)["@graph"]}
+        assert graph["workflow/Snakefile"]["version"] == "1.0"
+        body = {"root": str(root), "lang": "snakemake", "workflow": "workflow/Snakefile"}
+        status, _, data = request(conn, "POST", "/crate", body)
+        assert status == 200, data
+        assert json.loads(data)["@graph"][0]["mainEntity"] == {"@id": "workflow/Snakefile"}
+        # same connection, zip output
+        status, content_type, data = request(conn, "POST", "/crate", {"root": str(root), "format": "zip"})
+        assert status == 200
+        assert content_type == "application/zip"
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            assert "workflow/Snakefile" in zf.namelist()
+            assert "ro-crate-metadata.json" in zf.namelist()
+        assert not list(service.tmp_dir.iterdir())
+        status, _, data = request(conn, "POST", "/crate", {"root": str(root), "lang": "galaxy"})
+        assert status == 422
+        assert "error" in json.loads(data)
+        status, _, _ = request(conn, "POST", "/crate", {"root": "relative"})
+        assert status == 400
+        status, _, _ = request(conn, "GET", "/foo")
+        assert status == 404
+        status, _, data = request(conn, "GET", "/status")
+        assert status == 200
+        assert json.loads(data) == {"workers": 2, "running": 0, "queued": 0, "max_queue": 0}
+    finally:
+        conn.close()
+        server.shutdown()
+        server.server_close()
+
+
+def test_unix_socket(service, data_dir, tmpdir):
+    socket_path = tmpdir / "repo2rocrate.sock"
+    server = serve(service, socket_path=socket_path)
+    root = data_dir / "nf-core-foobar"
+
+    def post():
+        conn = UnixHTTPConnection(str(socket_path))
+        try:
+            return request(conn, "POST", "/crate", {"root": str(root)})
+        finally:
+            conn.close()
+    try:
+        # more concurrent requests than workers, no queue: some may be rejected
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            results = list(executor.map(lambda _: post(), range(6)))
+        statuses = [_[0] for _ in results]
+        assert set(statuses) <= {200, 503}
+        assert 200 in statuses
+        # ids starting with "#" are random
+        ids = [sorted(e["@id"] for e in json.loads(_[2])["@graph"] if e["@id"][0] != "#") for _ in results if _[0] == 200]
+        assert all(_ == ids[0] for _ in ids)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_worker_died(data_dir):
+    with CrateService(jobs=1, max_queue=0) as service:
+        server = serve(service)
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_port)
+        try:
+            # kill the only worker, breaking the pool
+            with pytest.raises(Exception):
+                service.executor.submit(os._exit, 1).result()
+            body = {"root": str(data_dir / "fair-crcc-send-data")}
+            status, _, data = request(conn, "POST", "/crate", body)
+            assert status == 503
+            assert "error" in json.loads(data)
+            status, _, data = request(conn, "POST", "/crate", body)
+            assert status == 200, data
+        finally:
+            conn.close()
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,98 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import shutil
+import subprocess
+import warnings
+import zipfile
+
+import pytest
+from repo2rocrate.snakemake import make_crate
+
+REPO_URL = "https://github.com/crs4/fair-crcc-send-data"
+RAW_URL = "https://raw.githubusercontent.com/crs4/fair-crcc-send-data/HEAD"
+
+
+def make_repo(data_dir, tmpdir):
+    root = tmpdir / "fair-crcc-send-data"
+    shutil.copytree(data_dir / root.name, root)
+    (root / "resources").mkdir()
+    (root / "resources" / "big.bin").write_bytes(b"x" * 65536)
+    (root / "resources" / "small.txt").write_text("small\n")
+    return root
+
+
+def test_max_file_size(data_dir, tmpdir):
+    root = make_repo(data_dir, tmpdir)
+    crate = make_crate(root, repo_url=REPO_URL, max_file_size=32 * 1024)
+    big = crate.get(f"{RAW_URL}/resources/big.bin")
+    assert big["contentSize"] == "65536"
+    assert big["sha256"] == hashlib.sha256(b"x" * 65536).hexdigest()
+    # existing entity, replaced by one identified by its URL
+    assert not crate.get("LICENSE")
+    license = crate.get(f"{RAW_URL}/LICENSE")
+    assert license["contentSize"] == str((root / "LICENSE").stat().st_size)
+    assert license in crate.root_dataset["hasPart"]
+    assert crate.get("resources/small.txt") is None  # still an unlisted Dataset member
+    out = tmpdir / "crate.zip"
+    crate.write_zip(out)
+    with zipfile.ZipFile(out) as zf:
+        names = zf.namelist()
+    assert "resources/small.txt" in names
+    assert "resources/big.bin" not in names
+    assert "LICENSE" not in names
+
+
+def test_max_total_size(data_dir, tmpdir):
+    root = make_repo(data_dir, tmpdir)
+    with pytest.warns(UserWarning, match="local"):
+        crate = make_crate(root, max_total_size=16 * 1024, max_file_size=1 << 30)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        out = tmpdir / "crate"
+        crate.write(out)
+    # no repository URL: detached files keep their relative ids
+    assert crate.mainEntity.id == "workflow/Snakefile"
+    assert crate.get("LICENSE")["contentSize"] == str((root / "LICENSE").stat().st_size)
+    assert crate.get("resources/big.bin")["sha256"] == hashlib.sha256(b"x" * 65536).hexdigest()
+    assert not (out / "LICENSE").exists()
+    assert not (out / "resources" / "big.bin").exists()
+    assert (out / "resources" / "small.txt").is_file()
+    assert (out / "workflow" / "Snakefile").is_file()
+    payload = [_ for _ in out.rglob("*") if _.is_file() and _.name != "ro-crate-metadata.json"]
+    assert sum(_.stat().st_size for _ in payload) <= 16 * 1024
+
+
+def test_main_workflow_kept(data_dir, tmpdir):
+    root = make_repo(data_dir, tmpdir)
+    with pytest.warns(UserWarning):
+        crate = make_crate(root, max_file_size=1)
+    assert crate.mainEntity.id == "workflow/Snakefile"
+    assert "workflow/Snakefile" not in crate.detached
+    assert "config/example_config.yml" in crate.detached
+
+
+@pytest.mark.skipif(not shutil.which("git"), reason="git not available")
+def test_subdir_of_worktree(data_dir, tmpdir):
+    worktree = tmpdir / "mono"
+    root = make_repo(data_dir, worktree)
+    git_args = ["git", "-C", str(worktree), "-c", "user.name=x", "-c", "user.email=x@example.org"]
+    for args in ["init", "-q"], ["add", "."], ["commit", "-q", "-m", "init"]:
+        subprocess.run(git_args + args, check=True)
+    commit = subprocess.run(git_args + ["rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip()
+    crate = make_crate(root, repo_url=REPO_URL, max_file_size=32 * 1024)
+    raw = f"https://raw.githubusercontent.com/crs4/fair-crcc-send-data/{commit}/{root.name}"
+    assert crate.get(f"{raw}/resources/big.bin")["contentSize"] == "65536"
+    assert crate.get(f"{raw}/LICENSE")
@@ -0,0 +1,115 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+import pytest
+from repo2rocrate import smkgraph
+from repo2rocrate.cache import clear_memory_cache
+from repo2rocrate.smkgraph import get_workflow_files, parse_snakefile, parse_snakefile_file
+
+SNAKEFILE = '''\
+from snakemake.utils import min_version
+min_version(
+    "7.0"
+)
+# include: "rules/commented.smk"
+"""
+include: "rules/in_string.smk"
+"""
+include: "rules/common.smk"
+include: 'rules/' + name + '.smk'
+include: f"rules/{name}.smk"
+if config.get("extra"):
+    include: "rules/extra.smk"
+
+module other:
+    snakefile:
+        "../other/Snakefile"
+    config: config["other"]
+
+module unused:
+    snakefile: "unused/Snakefile"
+
+module remote:
+    snakefile: github("owner/repo", path="workflow/Snakefile", tag="v1.0")
+
+use rule * from other as other_*
+use rule foo from remote with:
+    input: "x"
+
+rule all:
+    input: "results/done"
+    shell: "snakefile: 'nope'"
+'''
+
+
+def test_parse_snakefile():
+    info = parse_snakefile(SNAKEFILE)
+    assert info.includes == ["rules/common.smk", "rules/extra.smk"]
+    assert info.modules == {"other": "../other/Snakefile", "unused": "unused/Snakefile"}
+    assert info.used_modules == {"other", "remote"}
+    assert info.min_version == "7.0"
+    assert parse_snakefile("rule all:\n    input: 'x'\n").min_version is None
+
+
+def test_get_workflow_files(tmpdir):
+    root = tmpdir / "repo"
+    rules = root / "workflow" / "rules"
+    rules.mkdir(parents=True)
+    (root / "other").mkdir()
+    snakefile = root / "workflow" / "Snakefile"
+    snakefile.write_text(SNAKEFILE)
+    (rules / "common.smk").write_text('include: "utils.smk"\ninclude: "extra.smk"\n')
+    (rules / "utils.smk").write_text('include: "common.smk"\n')  # cycle
+    # extra.smk is included twice, missing.smk not at all
+    (rules / "extra.smk").write_text('include: "missing.smk"\n')
+    (root / "other" / "Snakefile").write_text('include: "../workflow/rules/utils.smk"\n')
+    assert get_workflow_files(snakefile) == [
+        snakefile,
+        rules / "common.smk",
+        rules / "extra.smk",
+        root / "other" / "Snakefile",
+        rules / "utils.smk",
+    ]
+    with pytest.raises(OSError):
+        get_workflow_files(rules / "missing.smk")
+
+
+def test_parse_once(tmpdir, monkeypatch):
+    n = 200
+    snakefile = tmpdir / "Snakefile"
+    snakefile.write_text("".join(f'include: "rules/r{i}.smk"\n' for i in range(n)))
+    (tmpdir / "rules").mkdir()
+    for i in range(n):
+        # each rule file includes all of the following ones
+        (tmpdir / "rules" / f"r{i}.smk").write_text("".join(f'include: "r{j}.smk"\n' for j in range(i + 1, n)))
+    clear_memory_cache()
+    calls = []
+    monkeypatch.setattr(smkgraph, "parse_snakefile", lambda text: calls.append(text) or parse_snakefile(text))
+    assert len(get_workflow_files(snakefile)) == n + 1
+    assert len(calls) == n + 1
+    assert len(get_workflow_files(snakefile)) == n + 1
+    assert len(calls) == n + 1  # cached
+
+
+def test_cache(tmpdir):
+    snakefile = tmpdir / "Snakefile"
+    snakefile.write_text('include: "a.smk"\n')
+    info = parse_snakefile_file(snakefile)
+    assert parse_snakefile_file(snakefile) is info
+    st = snakefile.stat()
+    snakefile.write_text('include: "b.smk"\n')
+    os.utime(snakefile, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert parse_snakefile_file(snakefile).includes == ["b.smk"]
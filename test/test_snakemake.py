@@ -92,6 +92,14 @@ def test_make_crate(data_dir, defaults):
     assert language.id == SNAKEMAKE_ID
     assert language["version"] == lang_version
     assert workflow["url"] == crate.root_dataset["isBasedOn"] == repo_url
+    if defaults:
+        parts = workflow["hasPart"]
+        assert [_.id for _ in parts] == [
+            f"workflow/rules/{_}.smk" for _ in ("common", "index", "encryption", "upload")
+        ]
+        for p in parts:
+            assert set(p.type) == {"File", "SoftwareSourceCode"}
+            assert p["programmingLanguage"] is language
     # workflow testing metadata
     suite = crate.root_dataset["mentions"]
     assert suite
@@ -0,0 +1,53 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ["rocrate", "yaml", "requests", "multiprocessing"]
+SCRIPT = """\
+import sys
+from pathlib import Path
+import repo2rocrate.cli
+from repo2rocrate import find_workflow
+{action}
+print(" ".join(_ for _ in {heavy!r} if _ in sys.modules))
+"""
+
+
+@pytest.mark.parametrize("wf_name", [None, "main.nf", "Snakefile", "foo.ga"])
+def test_lazy_imports(tmpdir, wf_name):
+    action = ""
+    if wf_name:
+        (tmpdir / wf_name).touch()
+        action = f"find_workflow(Path({str(tmpdir)!r}))"
+    script = SCRIPT.format(action=action, heavy=HEAVY_MODULES)
+    out = subprocess.check_output([sys.executable, "-c", script], text=True)
+    assert out.split() == []
+
+
+def test_lang_modules():
+    import repo2rocrate
+    from repo2rocrate import LANG_MODULES
+    assert list(LANG_MODULES) == ["nextflow", "snakemake", "galaxy"]
+    assert len(LANG_MODULES) == 3
+    for name, module in LANG_MODULES.items():
+        assert module.__name__ == f"repo2rocrate.{name}"
+        assert getattr(repo2rocrate, name) is module
+    with pytest.raises(KeyError):
+        LANG_MODULES["cwl"]
+    with pytest.raises(AttributeError):
+        repo2rocrate.cwl
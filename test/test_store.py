@@ -0,0 +1,82 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import os
+import shutil
+import stat
+
+from click.testing import CliRunner
+from repo2rocrate.cli import batch
+from repo2rocrate.snakemake import make_crate
+from repo2rocrate.store import ContentStore, OBJECTS_DIR
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def list_objects(store_dir):
+    return sorted(_ for _ in (store_dir / OBJECTS_DIR).rglob("*") if _.is_file())
+
+
+def test_link(tmpdir):
+    store = ContentStore(tmpdir / "store")
+    src_dir, out_dir = tmpdir / "src", tmpdir / "out"
+    src_dir.mkdir()
+    out_dir.mkdir()
+    for name in "a", "b", "script":
+        (src_dir / name).write_bytes(b"data")
+    (src_dir / "script").chmod(0o755)
+    assert store.link(src_dir / "a", out_dir / "a", sha256(b"data")) == (4, True)
+    assert store.link(src_dir / "b", out_dir / "b", sha256(b"data")) == (0, True)
+    assert store.link(src_dir / "b", out_dir / "b", sha256(b"data")) == (0, True)
+    assert store.link(src_dir / "script", out_dir / "script", sha256(b"data")) == (4, True)
+    assert len(list_objects(tmpdir / "store")) == 2
+    assert os.path.samefile(out_dir / "a", out_dir / "b")
+    assert (out_dir / "script").stat().st_mode & stat.S_IXUSR
+    assert not (out_dir / "a").stat().st_mode & (stat.S_IWUSR | stat.S_IXUSR)
+    assert not any((tmpdir / "store" / "tmp").iterdir())
+
+
+def test_write(data_dir, tmpdir):
+    roots = []
+    for name in "repo1", "repo2":
+        root = tmpdir / name
+        shutil.copytree(data_dir / "fair-crcc-send-data", root)
+        roots.append(root)
+    (roots[1] / "README.md").write_text("changed\n")
+    store_dir = tmpdir / "store"
+    stats = [make_crate(_, store=store_dir).write(tmpdir / "crates" / _.name) for _ in roots]
+    out1, out2 = (tmpdir / "crates" / _.name for _ in roots)
+    assert stats[0].files == stats[1].files == stats[0].linked == stats[1].linked
+    # only the changed file is stored again
+    assert stats[1].bytes == len("changed\n")
+    assert os.path.samefile(out1 / "LICENSE", out2 / "LICENSE")
+    assert not os.path.samefile(out1 / "README.md", out2 / "README.md")
+    assert (out2 / "README.md").read_text() == "changed\n"
+    assert len(list_objects(store_dir)) == stats[0].files + 1
+    assert (out1 / "ro-crate-metadata.json").stat().st_nlink == 1
+    # rewriting the same crate moves no data
+    assert make_crate(roots[0], store=store_dir).write(out1).bytes == 0
+
+
+def test_batch(data_dir, tmpdir):
+    out_dir = tmpdir / "crates"
+    runner = CliRunner()
+    args = ["-o", str(out_dir), "--store", str(tmpdir / "store"), "-j", "1"]
+    result = runner.invoke(batch, args + [str(data_dir / "fair-crcc-send-data")])
+    assert result.exit_code == 0, result.output
+    assert (out_dir / "fair-crcc-send-data" / "LICENSE").stat().st_nlink == 2
+    assert list_objects(tmpdir / "store")
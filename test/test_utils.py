@@ -13,7 +13,7 @@
 # limitations under the License.
 
 import pytest
-from repo2rocrate.utils import get_ci_wf_endpoint
+from repo2rocrate.utils import get_ci_wf_endpoint, get_raw_url, parse_size
 
 
 def test_get_ci_wf_endpoint():
@@ -22,3 +22,23 @@ def test_get_ci_wf_endpoint():
     for url in "https://github.com/crs4", "https://github.com", "":
         with pytest.raises(ValueError):
             get_ci_wf_endpoint("https://github.com/crs4", "main.yml")
+
+
+def test_parse_size():
+    assert parse_size("1024") == 1024
+    assert parse_size("500k") == 500 * 1024
+    assert parse_size("1.5G") == 3 << 29
+    assert parse_size("2MiB") == parse_size("2 MB") == 2 << 20
+    for value in "", "-1", "1X", "M":
+        with pytest.raises(ValueError):
+            parse_size(value)
+
+
+def test_get_raw_url():
+    assert get_raw_url("https://github.com/crs4/foo", "a b/c.txt") == (
+        "https://raw.githubusercontent.com/crs4/foo/HEAD/a%20b/c.txt"
+    )
+    assert get_raw_url("https://github.com/crs4/foo.git", "c.txt", ref="v1") == (
+        "https://raw.githubusercontent.com/crs4/foo/v1/c.txt"
+    )
+    assert get_raw_url("https://gitlab.com/crs4/foo", "c.txt") is None
@@ -0,0 +1,105 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import shutil
+
+import pytest
+from click.testing import CliRunner
+from rocrate.rocrate import ROCrate
+from repo2rocrate.cli import cli
+from repo2rocrate.snakemake import make_crate
+from repo2rocrate.watch import InotifyWatcher, PollingWatcher, WatchSession
+
+TIMEOUT = 5
+
+
+def get_watcher(kind):
+    if kind == "poll":
+        return PollingWatcher(interval=0.01)
+    try:
+        return InotifyWatcher()
+    except OSError:
+        pytest.skip("inotify not available")
+
+
+@pytest.mark.parametrize("kind", ["inotify", "poll"])
+def test_watch(data_dir, tmpdir, kind):
+    root = tmpdir / "fair-crcc-send-data"
+    shutil.copytree(data_dir / root.name, root)
+    builds, writes = [], []
+
+    def build(fs):
+        builds.append(fs)
+        return make_crate(root, fs=fs)
+
+    def write(crate, fs):
+        crate.metadata.write(root)
+        writes.append(crate)
+
+    session = WatchSession(root, build, write, watcher=get_watcher(kind), debounce=0.05)
+    try:
+        session.rebuild()
+        assert len(builds) == len(writes) == 1
+        assert session.step(timeout=0.1) is None  # nothing changed (metadata written)
+        # File entity contents: digests only
+        diagram = root / "images" / "rulegraph.svg"
+        diagram.write_bytes(diagram.read_bytes() + b"\n")
+        assert session.step(timeout=TIMEOUT) == "digests"
+        assert len(builds) == 1 and len(writes) == 2
+        e = ROCrate(root).get("images/rulegraph.svg")
+        assert e["sha256"] == hashlib.sha256(diagram.read_bytes()).hexdigest()
+        assert e["contentSize"] == str(diagram.stat().st_size)
+        # parsed file: full rebuild
+        wf_path = root / "workflow" / "Snakefile"
+        wf_path.write_text(wf_path.read_text().replace('min_version("6.5.0")', 'min_version("7.0.0")'))
+        assert session.step(timeout=TIMEOUT) == "rebuild"
+        assert ROCrate(root).mainEntity["programmingLanguage"]["version"] == "7.0.0"
+        # new data entity: full rebuild
+        (root / "resources").mkdir()
+        assert session.step(timeout=TIMEOUT) == "rebuild"
+        assert ROCrate(root).get("resources")
+        assert len(builds) == 3
+    finally:
+        session.close()
+
+
+def test_watch_not_in_place(data_dir, tmpdir):
+    root = data_dir / "fair-crcc-send-data"
+    result = CliRunner().invoke(cli, ["-r", str(root), "-o", str(tmpdir / "crate"), "--watch"])
+    assert result.exit_code != 0
+
+
+def test_watch_build_error(data_dir, tmpdir):
+    root = tmpdir / "fair-crcc-send-data"
+    shutil.copytree(data_dir / root.name, root)
+    session = WatchSession(
+        root, lambda fs: make_crate(root, fs=fs), lambda crate, fs: crate.metadata.write(root),
+        watcher=PollingWatcher(interval=0.01), debounce=0.05,
+    )
+    try:
+        session.rebuild()
+        crate, fs = session.crate, session.fs
+        wf_path = root / "workflow" / "Snakefile"
+        wf_path.rename(wf_path.with_suffix(".bak"))
+        with pytest.raises(RuntimeError):
+            session.step(timeout=TIMEOUT)
+        assert session.crate is crate and session.fs is fs
+        assert session.stale
+        wf_path.with_suffix(".bak").rename(wf_path)
+        assert session.step(timeout=TIMEOUT) == "rebuild"
+        assert not session.stale
+        assert ROCrate(root).mainEntity.id == "workflow/Snakefile"
+    finally:
+        session.close()
@@ -0,0 +1,95 @@
+# Copyright 2022-2025 CRS4.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import io
+import os
+import random
+import zipfile
+
+import pytest
+from rocrate.rocrate import ROCrate
+from repo2rocrate.nextflow import make_crate
+from repo2rocrate.zipwriter import ZipStreamWriter
+
+
+class NonSeekable(io.RawIOBase):
+
+    def __init__(self):
+        self.buf = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.buf.extend(b)
+        return len(b)
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_zip_stream_writer(tmpdir, jobs):
+    rng = random.Random(42)
+    contents = {
+        "empty.txt": b"",
+        "small.txt": b"hello\n",
+        "text.txt": b"".join(rng.choice([b"foo ", b"bar ", b"spam\n"]) for _ in range(200000)),
+        "random.bin": rng.randbytes(300000),
+        "sub/dir/deep.txt": b"deep\n" * 1000,
+    }
+    files = []
+    for name, data in contents.items():
+        path = tmpdir / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        files.append((path, name))
+    (tmpdir / "text.txt").chmod(0o755)
+    out = NonSeekable()
+    # small chunks and memory budget to exercise the chunk pipeline
+    with ZipStreamWriter(out) as zw:
+        zw.add_dir("sub")
+        zw.add_files(files, jobs=jobs, memory=64 * 1024, chunk_size=16 * 1024)
+        zw.add_stream("streamed.json", [b"{", b'"a": 1', b"}"])
+        with pytest.raises(ValueError):
+            zw.add_stream("small.txt", [b""])
+    with zipfile.ZipFile(io.BytesIO(bytes(out.buf))) as zf:
+        assert zf.testzip() is None
+        assert zf.getinfo("sub/").is_dir()
+        for name, data in contents.items():
+            assert zf.read(name) == data
+        assert zf.read("streamed.json") == b'{"a": 1}'
+        assert (zf.getinfo("text.txt").external_attr >> 16) & 0o777 == 0o755
+    assert len(out.buf) < sum(map(len, contents.values()))
+
+
+@pytest.mark.filterwarnings("ignore:Duplicate name")
+def test_crate_write_zip(data_dir, tmpdir):
+    root = data_dir / "nf-core-foobar"
+    crate = make_crate(root)
+    crate_zip = tmpdir / "crate.zip"
+    crate.write_zip(crate_zip)
+    with zipfile.ZipFile(crate_zip) as zf:
+        assert zf.testzip() is None
+        names = zf.namelist()
+        assert len(names) == len(set(names))
+        zf.extractall(tmpdir / "crate")
+    for relpath in "main.nf", "docs/images/nf-core-foobar_logo_light.png", "modules/local/samplesheet_check.nf":
+        assert (tmpdir / "crate" / relpath).read_bytes() == (root / relpath).read_bytes()
+    # same payload as the ro-crate library's writer
+    ROCrate.write_zip(crate, tmpdir / "ref.zip")
+    with zipfile.ZipFile(tmpdir / "ref.zip") as zf:
+        ref_names = set(zf.namelist())
+    assert {_ for _ in names if not _.endswith("/")} == ref_names
+    new_crate = ROCrate(tmpdir / "crate")
+    assert new_crate.mainEntity.id == "main.nf"
+    assert os.path.isdir(tmpdir / "crate" / "subworkflows" / "local")